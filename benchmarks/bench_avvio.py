@@ -0,0 +1,86 @@
+"""
+Tempo di avvio dei punti di ingresso di previdenza, con budget.
+
+Misura in processi separati (mediana di N avvii):
+  - interprete vuoto (riferimento)
+  - python -m previdenza --help
+  - import del solo calcolatore (from previdenza import CalcolatoreContributi)
+  - import di previdenza.core
+e verifica che gli import leggeri non carichino pdfplumber/openpyxl.
+Termina con codice 1 se un budget (in ms, al netto dell'interprete) e' superato.
+
+Uso:
+    python benchmarks/bench_avvio.py [--avvii 15]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RADICE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budget in millisecondi oltre l'avvio dell'interprete
+BUDGET_MS = {
+    "--help": 80,
+    "calcolatore": 30,
+    "core": 60,
+}
+
+CONTROLLO_MODULI = (
+    "import sys; {codice}; "
+    "print(','.join(m for m in ('pdfplumber', 'pdfminer', 'openpyxl') if m in sys.modules))"
+)
+
+
+def _avvia(argomenti):
+    inizio = time.perf_counter()
+    subprocess.run([sys.executable] + argomenti, cwd=RADICE, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - inizio
+
+
+def mediana_ms(argomenti, avvii):
+    _avvia(argomenti)  # riscalda la cache del filesystem e dei .pyc
+    return statistics.median(_avvia(argomenti) for _ in range(avvii)) * 1000
+
+
+def moduli_pesanti(codice):
+    uscita = subprocess.run([sys.executable, "-c", CONTROLLO_MODULI.format(codice=codice)],
+                            cwd=RADICE, check=True, capture_output=True, text=True)
+    return uscita.stdout.strip() or "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--avvii", type=int, default=15, help="Avvii per misura (default: 15)")
+    args = parser.parse_args()
+
+    base = mediana_ms(["-c", "pass"], args.avvii)
+    misure = {
+        "--help": (["-m", "previdenza", "--help"], None),
+        "calcolatore": (["-c", "from previdenza import CalcolatoreContributi"],
+                        "from previdenza import CalcolatoreContributi"),
+        "core": (["-c", "import previdenza.core"], "import previdenza.core"),
+    }
+
+    print(f"{'avvio':<14}{'totale ms':>11}{'netto ms':>10}{'budget':>8}  moduli pesanti")
+    print(f"{'interprete':<14}{base:>11.1f}{0:>10.1f}{'':>8}")
+    superati = []
+    for nome, (argomenti, codice) in misure.items():
+        totale = mediana_ms(argomenti, args.avvii)
+        netto = totale - base
+        pesanti = moduli_pesanti(codice) if codice else "-"
+        print(f"{nome:<14}{totale:>11.1f}{netto:>10.1f}{BUDGET_MS[nome]:>8}  {pesanti}")
+        if netto > BUDGET_MS[nome]:
+            superati.append(nome)
+
+    if superati:
+        print(f"Budget superato: {', '.join(superati)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
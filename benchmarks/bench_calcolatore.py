@@ -0,0 +1,61 @@
+"""
+Benchmark di CalcolatoreContributi.calcola() su carriere lunghe.
+
+Genera con previdenza.sintetico.genera_dati (seme fisso) carriere di N
+anni con periodi spettacolo sovrapposti, periodi a cavallo d'anno e
+disoccupazione nel regime generale, e riporta le carriere/secondo (tempo
+CPU). I record sono gia' in forma compatta: si misura il calcolo, non la
+conversione.
+
+Uso:
+    python benchmarks/bench_calcolatore.py [--anni 45] [--carriere 200] [--ripetizioni 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+RADICE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RADICE)
+
+from previdenza.calcolatore import CalcolatoreContributi  # noqa: E402
+from previdenza.record import compatta_dati  # noqa: E402
+from previdenza.sintetico import ANNI_MASSIMI, genera_dati  # noqa: E402
+
+RECORD_PER_ANNO = 15
+
+
+def genera_carriere(seme, numero, anni):
+    """Carriere sintetiche di previdenza.sintetico (circa 15 record per anno), in forma compatta"""
+    return [compatta_dati(genera_dati(seme + i, anni=anni, record=RECORD_PER_ANNO * anni, anno_inizio=1975))
+            for i in range(numero)]
+
+
+def misura(carriere, tempo_indeterminato_da):
+    inizio = time.process_time()
+    for dati in carriere:
+        CalcolatoreContributi(dati, sesso="M", tempo_indeterminato_da=tempo_indeterminato_da).calcola()
+    return time.process_time() - inizio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--anni", type=int, default=45, choices=range(1, ANNI_MASSIMI + 1), metavar="ANNI",
+                        help=f"Anni per carriera, da 1 a {ANNI_MASSIMI} (default: 45)")
+    parser.add_argument("--carriere", type=int, default=200, help="Carriere per misura (default: 200)")
+    parser.add_argument("--ripetizioni", type=int, default=5, help="Misure ripetute, si tiene la migliore")
+    parser.add_argument("--seme", type=int, default=1, help="Seme del generatore (default: 1)")
+    args = parser.parse_args()
+
+    carriere = genera_carriere(args.seme, args.carriere, args.anni)
+    record = sum(len(c["regime_generale"]) + len(c["spettacolo"]) for c in carriere)
+
+    print(f"carriere:     {len(carriere)} ({args.anni} anni, {record // len(carriere)} record ciascuna)")
+    for ti in (None, "01/08/1997"):
+        migliore = min(misura(carriere, ti) for _ in range(args.ripetizioni))
+        print(f"ti={str(ti):<11} {migliore:.3f} s   {len(carriere) / migliore:,.0f} carriere/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Throughput di EstrattorePDF su estratti conto sintetici (previdenza.sintetico.genera_pdf).
+
+Genera un PDF con il layout delle tabelle INPS (pagine e righe per pagina
+configurabili) e lo estrae con ogni modalita': backend pdfplumber, pdfium e
+parole, con e senza basso_consumo, e pdfplumber con i modelli di layout.
+Ogni modalita' gira in un processo separato, per misurare il suo picco di
+memoria residente (RSS), e riporta pagine/sec e righe/sec (tempo CPU,
+migliore di N estrazioni).
+
+I record estratti devono coincidere esattamente con quelli scritti nel PDF,
+e ogni modalita' deve terminare senza errori: altrimenti il benchmark termina
+con codice 1. Solo una modalita' con un backend opzionale non installato
+(pypdfium2) viene saltata.
+
+Uso:
+    python benchmarks/bench_estrazione.py [--pagine 30] [--righe-per-pagina 20] [--ripetizioni 3]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+RADICE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RADICE)
+
+from previdenza.cache import CacheLayout  # noqa: E402
+from previdenza.estrattore import EstrattorePDF  # noqa: E402
+from previdenza.sintetico import RIGHE_PER_PAGINA_MASSIME, genera_pdf  # noqa: E402
+
+# Modalita' di estrazione: nome -> opzioni di EstrattorePDF ("modelli": con CacheLayout)
+MODI = {
+    "pdfplumber": {"backend": "pdfplumber"},
+    "pdfplumber basso consumo": {"backend": "pdfplumber", "basso_consumo": True},
+    "pdfplumber modelli layout": {"backend": "pdfplumber", "modelli": True},
+    "pdfium": {"backend": "pdfium"},
+    "pdfium basso consumo": {"backend": "pdfium", "basso_consumo": True},
+    "parole": {"backend": "parole"},
+    "parole basso consumo": {"backend": "parole", "basso_consumo": True},
+}
+
+# Moduli dei backend opzionali: se mancano la modalita' e' "non disponibile", non un errore
+BACKEND_OPZIONALI = ("pypdfium2",)
+
+
+def _picco_rss_mb():
+    """Picco di memoria residente del processo in MB (None se non misurabile)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    picco = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KB su Linux, byte su macOS
+    return round(picco / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def misura_modo(modo, pdf_path, atteso_path, ripetizioni):
+    """Estrae il PDF nel processo corrente; restituisce tempo migliore, record, picco RSS e confronto"""
+    opzioni = dict(MODI[modo])
+    with open(atteso_path, "r", encoding="utf-8") as f:
+        atteso = json.load(f)
+
+    with tempfile.TemporaryDirectory() as cartella:
+        if opzioni.pop("modelli", False):
+            # I bordi di colonna si imparano una volta; le estrazioni misurate li riusano
+            opzioni["modelli_layout"] = CacheLayout(cartella)
+            EstrattorePDF(pdf_path, **opzioni).estrai()
+            opzioni["modelli_layout"].salva()
+
+        migliore = float("inf")
+        uguale = True
+        for _ in range(ripetizioni):
+            inizio = time.process_time()
+            dati = EstrattorePDF(pdf_path, **opzioni).estrai()
+            migliore = min(migliore, time.process_time() - inizio)
+            uguale = uguale and dati == atteso
+
+    return {
+        "secondi": migliore,
+        "pagine": dati["metadata"]["pagine"],
+        "righe": len(dati["regime_generale"]) + len(dati["spettacolo"]),
+        "picco_rss_mb": _picco_rss_mb(),
+        "uguale": uguale,
+    }
+
+
+def _esegui_in_processo(modo, pdf_path, atteso_path, ripetizioni):
+    uscita = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--modo", modo, "--pdf", pdf_path,
+         "--atteso", atteso_path, "--ripetizioni", str(ripetizioni)],
+        capture_output=True, text=True)
+    if uscita.returncode != 0:
+        ultima = (uscita.stderr.strip().splitlines() or ["errore sconosciuto"])[-1]
+        return {"errore": ultima}
+    return json.loads(uscita.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pagine", type=int, default=30, help="Pagine del PDF (default: 30)")
+    parser.add_argument("--righe-per-pagina", type=int, default=20,
+                        help=f"Record per pagina, da 1 a {RIGHE_PER_PAGINA_MASSIME} (default: 20)")
+    parser.add_argument("--seme", type=int, default=1, help="Seme del generatore (default: 1)")
+    parser.add_argument("--ripetizioni", type=int, default=3, help="Estrazioni per modalita', si tiene la migliore")
+    parser.add_argument("--modi", nargs="+", choices=list(MODI), default=list(MODI), metavar="MODO",
+                        help=f"Modalita' da misurare (default: tutte): {', '.join(MODI)}")
+    # Uso interno: misura di una modalita' nel processo figlio
+    parser.add_argument("--modo", choices=list(MODI), help=argparse.SUPPRESS)
+    parser.add_argument("--pdf", help=argparse.SUPPRESS)
+    parser.add_argument("--atteso", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.modo:
+        try:
+            risultato = misura_modo(args.modo, args.pdf, args.atteso, args.ripetizioni)
+        except ImportError as e:
+            # Solo il backend opzionale mancante rende la modalita' non disponibile
+            if not (e.name or "").startswith(BACKEND_OPZIONALI):
+                raise
+            risultato = {"non_disponibile": f"{type(e).__name__}: {e}"}
+        print(json.dumps(risultato))
+        return
+
+    with tempfile.TemporaryDirectory() as cartella:
+        pdf_path = os.path.join(cartella, "estratto.pdf")
+        atteso_path = os.path.join(cartella, "atteso.json")
+        atteso = genera_pdf(pdf_path, args.seme, pagine=args.pagine, righe_per_pagina=args.righe_per_pagina)
+        with open(atteso_path, "w", encoding="utf-8") as f:
+            json.dump(atteso, f)
+
+        righe = len(atteso["regime_generale"]) + len(atteso["spettacolo"])
+        print(f"PDF sintetico: {args.pagine} pagine, {righe} righe "
+              f"({len(atteso['spettacolo'])} Spettacolo), {os.path.getsize(pdf_path) / 1024:.0f} KB\n")
+        print(f"{'modalita':<28} {'pagine/s':>9} {'righe/s':>9} {'picco RSS':>10}  record")
+
+        errori = []
+        for modo in args.modi:
+            risultato = _esegui_in_processo(modo, pdf_path, atteso_path, args.ripetizioni)
+            if "non_disponibile" in risultato:
+                print(f"{modo:<28} non disponibile: {risultato['non_disponibile']}")
+                continue
+            if "errore" in risultato:
+                print(f"{modo:<28} ERRORE: {risultato['errore']}")
+                errori.append(modo)
+                continue
+            secondi = risultato["secondi"]
+            picco = "-" if risultato["picco_rss_mb"] is None else f"{risultato['picco_rss_mb']:.1f} MB"
+            esito = "identici" if risultato["uguale"] else "DIVERSI"
+            print(f"{modo:<28} {risultato['pagine'] / secondi:9.1f} {risultato['righe'] / secondi:9.0f} "
+                  f"{picco:>10}  {esito}")
+            if not risultato["uguale"]:
+                errori.append(modo)
+
+    if errori:
+        sys.exit(f"ERRORE: estrazione fallita o record diversi da quelli generati con {', '.join(errori)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Microbenchmark della classificazione delle righe di tabella (_processa_riga).
+
+Usa il corpus di righe grezze in tests/dati/righe_campione.json, ripetuto
+fino al numero di righe richiesto, e riporta le righe/secondo (tempo CPU).
+
+Uso:
+    python benchmarks/bench_righe.py [--righe 200000] [--ripetizioni 5]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+RADICE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RADICE)
+
+from previdenza.estrattore import EstrattorePDF  # noqa: E402
+
+CORPUS = os.path.join(RADICE, "tests", "dati", "righe_campione.json")
+
+
+def carica_corpus():
+    with open(CORPUS, encoding="utf-8") as f:
+        return [(voce["riga"], voce["intestazione"]) for voce in json.load(f)]
+
+
+def misura(righe):
+    estrattore = EstrattorePDF("benchmark")
+    processa = estrattore._processa_riga
+    inizio = time.process_time()
+    for riga, intestazione in righe:
+        processa(riga, intestazione)
+    return time.process_time() - inizio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--righe", type=int, default=200000, help="Righe per misura (default: 200000)")
+    parser.add_argument("--ripetizioni", type=int, default=5, help="Misure ripetute, si tiene la migliore")
+    args = parser.parse_args()
+
+    corpus = carica_corpus()
+    righe = (corpus * (args.righe // len(corpus) + 1))[:args.righe]
+
+    migliore = min(misura(righe) for _ in range(args.ripetizioni))
+    print(f"righe:        {len(righe)}")
+    print(f"tempo:        {migliore:.3f} s")
+    print(f"righe/sec:    {len(righe) / migliore:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
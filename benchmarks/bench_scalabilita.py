@@ -0,0 +1,197 @@
+"""
+Scalabilita' di CalcolatoreContributi su carriere sintetiche (previdenza.sintetico).
+
+Riporta:
+- i tempi per stadio del calcolo (costruzione dei record e gli stadi di
+  CalcolatoreContributi.STADI) su due carriere di riferimento
+- le curve di scalabilita' al variare di anni, numero di record, quota di
+  periodi Spettacolo sovrapposti e quota di note di disoccupazione
+
+Tempi CPU, migliore di N misure, con ripetizioni interne per misurare
+almeno 20 ms e garbage collector disattivato durante le misure (come timeit).
+
+Il file di baseline (JSON) conserva i tempi divisi per una calibrazione
+della CPU (un ciclo Python fisso), per confrontare versioni anche su
+macchine diverse:
+    --salva-baseline   scrive la baseline
+    --confronta        segnala i punti piu' lenti della baseline oltre la tolleranza (uscita 1)
+
+Uso:
+    python benchmarks/bench_scalabilita.py [--ripetizioni 3] [--confronta] [--salva-baseline]
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+RADICE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RADICE)
+
+from previdenza.calcolatore import CalcolatoreContributi  # noqa: E402
+from previdenza.sintetico import genera_dati  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_scalabilita.json")
+TEMPO_INDETERMINATO_DA = "01/08/1997"
+
+# Curve: nome -> lista di (etichetta del punto, parametri di genera_dati)
+CURVE = {
+    "anni": [(f"anni={n}", {"anni": n}) for n in (1, 5, 10, 20, 30, 45, 60)],
+    "record": [(f"record={n}", {"anni": 30, "record": n}) for n in (10, 100, 1000, 3000, 10000)],
+    "sovrapposizione": [(f"spettacolo={q}", {"anni": 30, "record": 3000, "quota_spettacolo": q})
+                        for q in (0.0, 0.25, 0.5, 0.75, 1.0)],
+    "disoccupazione": [(f"disoccupazione={q}", {"anni": 30, "record": 3000, "quota_spettacolo": 0.5,
+                                                 "quota_disoccupazione": q})
+                       for q in (0.0, 0.1, 0.25, 0.5)],
+}
+
+# Carriere per i tempi per stadio
+RIFERIMENTI = [("45 anni, 540 record", {"anni": 45, "record": 540}),
+               ("30 anni, 10000 record", {"anni": 30, "record": 10000})]
+
+
+def calibrazione(ripetizioni):
+    """Tempo CPU di un ciclo Python fisso, per normalizzare i tempi tra macchine"""
+    migliore = float("inf")
+    for _ in range(ripetizioni):
+        inizio = time.process_time()
+        sum(i * i for i in range(300000))
+        migliore = min(migliore, time.process_time() - inizio)
+    return migliore
+
+
+def _calcolatore(dati):
+    return CalcolatoreContributi(dati, sesso="M", tempo_indeterminato_da=TEMPO_INDETERMINATO_DA)
+
+
+def misura_calcolo(dati, ripetizioni):
+    """Tempo CPU di un calcolo completo (costruzione + calcola), in secondi"""
+    # Ripetizioni interne: almeno 20 ms per misura
+    inizio = time.process_time()
+    _calcolatore(dati).calcola()
+    interne = max(1, int(0.02 / max(time.process_time() - inizio, 1e-6)))
+
+    migliore = float("inf")
+    for _ in range(ripetizioni):
+        inizio = time.process_time()
+        for _ in range(interne):
+            _calcolatore(dati).calcola()
+        migliore = min(migliore, (time.process_time() - inizio) / interne)
+    return migliore
+
+
+def misura_stadi(dati, ripetizioni):
+    """Tempo CPU per stadio di calcola() (vedi CalcolatoreContributi.STADI), in secondi"""
+    migliori = {}
+    for _ in range(ripetizioni):
+        inizio = time.process_time()
+        calcolatore = _calcolatore(dati)
+        tempi = {"costruzione": time.process_time() - inizio}
+        calcolatore.calcola(tempi=tempi)
+        for nome, tempo in tempi.items():
+            migliori[nome] = min(migliori.get(nome, tempo), tempo)
+    return migliori
+
+
+def esegui(ripetizioni, seme):
+    """Misura stadi e curve; restituisce i tempi in secondi"""
+    stadi = {}
+    for etichetta, parametri in RIFERIMENTI:
+        stadi[etichetta] = misura_stadi(genera_dati(seme, **parametri), ripetizioni)
+
+    curve = {}
+    for nome, punti in CURVE.items():
+        curve[nome] = {}
+        for etichetta, parametri in punti:
+            dati = genera_dati(seme, **parametri)
+            record = len(dati["regime_generale"]) + len(dati["spettacolo"])
+            curve[nome][etichetta] = {"secondi": misura_calcolo(dati, ripetizioni), "record": record}
+    return stadi, curve
+
+
+def stampa(stadi, curve):
+    for etichetta, tempi in stadi.items():
+        totale = sum(tempi.values())
+        print(f"\nStadi ({etichetta}): {totale * 1e3:.2f} ms")
+        for nome, tempo in tempi.items():
+            print(f"  {nome:<16} {tempo * 1e3:8.3f} ms  {tempo / totale:6.1%}")
+
+    for nome, punti in curve.items():
+        print(f"\nCurva: {nome}")
+        for etichetta, punto in punti.items():
+            print(f"  {etichetta:<22} {punto['secondi'] * 1e3:8.3f} ms  {punto['record']:>6} record  "
+                  f"{punto['secondi'] / punto['record'] * 1e6:6.2f} us/record")
+
+
+def normalizza(curve, calibrazione_s):
+    """Tempi delle curve in unita' di calibrazione"""
+    return {f"{nome}/{etichetta}": punto["secondi"] / calibrazione_s
+            for nome, punti in curve.items() for etichetta, punto in punti.items()}
+
+
+def confronta(attuali, baseline, tolleranza):
+    """Stampa il confronto con la baseline; restituisce i punti oltre la tolleranza"""
+    peggiorati = []
+    print(f"\nConfronto con la baseline (tolleranza {tolleranza:.0%})")
+    for punto, valore in attuali.items():
+        riferimento = baseline.get(punto)
+        if riferimento is None:
+            continue
+        rapporto = valore / riferimento
+        segno = "  <-- PIU' LENTO" if rapporto > 1 + tolleranza else ""
+        print(f"  {punto:<36} {rapporto:6.2f}x{segno}")
+        if segno:
+            peggiorati.append(punto)
+    return peggiorati
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ripetizioni", type=int, default=3, help="Misure ripetute, si tiene la migliore")
+    parser.add_argument("--seme", type=int, default=1, help="Seme del generatore (default: 1)")
+    parser.add_argument("--salva-baseline", nargs="?", const=BASELINE, metavar="FILE",
+                        help=f"Scrive la baseline (default: {os.path.relpath(BASELINE, RADICE)})")
+    parser.add_argument("--confronta", nargs="?", const=BASELINE, metavar="FILE",
+                        help="Confronta con una baseline e esce con 1 se ci sono peggioramenti")
+    parser.add_argument("--tolleranza", type=float, default=0.5,
+                        help="Rallentamento ammesso rispetto alla baseline (default: 0.5 = 50%%)")
+    args = parser.parse_args()
+
+    gc.disable()
+    try:
+        # Calibrazione prima e dopo le misure: la CPU condivisa cambia velocita' nel tempo
+        calibrazione_s = calibrazione(max(args.ripetizioni, 5))
+        stadi, curve = esegui(args.ripetizioni, args.seme)
+        calibrazione_s = min(calibrazione_s, calibrazione(max(args.ripetizioni, 5)))
+    finally:
+        gc.enable()
+    print(f"Calibrazione CPU: {calibrazione_s * 1e3:.1f} ms")
+    stampa(stadi, curve)
+    attuali = normalizza(curve, calibrazione_s)
+
+    peggiorati = []
+    if args.confronta:
+        with open(args.confronta, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        peggiorati = confronta(attuali, baseline["punti"], args.tolleranza)
+
+    if args.salva_baseline:
+        with open(args.salva_baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "descrizione": "Tempi di calcolo per punto, in unita' di calibrazione CPU "
+                               "(vedi bench_scalabilita.py)",
+                "seme": args.seme,
+                "calibrazione_s": round(calibrazione_s, 6),
+                "punti": {punto: round(valore, 5) for punto, valore in attuali.items()},
+            }, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline scritta in {args.salva_baseline}")
+
+    if peggiorati:
+        sys.exit(f"ERRORE: {len(peggiorati)} punti oltre la tolleranza")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark di CalcolatoreVettoriale contro CalcolatoreContributi.
+
+Genera (con seme fisso) le carriere sintetiche di bench_calcolatore.py e le calcola
+con il calcolatore vettoriale: prima la conversione in colonne
+(ColonneRecord.da_dati), poi il calcolo, misurati separatamente. Il
+calcolatore scalare viene misurato su un campione delle stesse carriere e
+i risultati del campione devono coincidere. Tempi CPU, migliore di N
+misure.
+
+Uso:
+    python benchmarks/bench_vettoriale.py [--carriere 20000] [--anni 45] [--ripetizioni 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+RADICE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RADICE)
+
+from bench_calcolatore import genera_carriere  # noqa: E402
+from previdenza.calcolatore import CalcolatoreContributi, decodifica_sesso_da_cf  # noqa: E402
+from previdenza.vettoriale import CalcolatoreVettoriale, ColonneRecord  # noqa: E402
+
+
+def migliore(funzione, ripetizioni):
+    """Tempo CPU minimo e risultato dell'ultima esecuzione"""
+    tempi = []
+    for _ in range(ripetizioni):
+        inizio = time.process_time()
+        risultato = funzione()
+        tempi.append(time.process_time() - inizio)
+    return min(tempi), risultato
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--carriere", type=int, default=20000, help="Carriere (default: 20000)")
+    parser.add_argument("--anni", type=int, default=45, help="Anni per carriera (default: 45)")
+    parser.add_argument("--campione", type=int, default=500, help="Carriere per il calcolatore scalare")
+    parser.add_argument("--ripetizioni", type=int, default=3, help="Misure ripetute, si tiene la migliore")
+    parser.add_argument("--seme", type=int, default=1, help="Seme del generatore (default: 1)")
+    args = parser.parse_args()
+
+    carriere = genera_carriere(args.seme, args.carriere, args.anni)
+    sessi = [decodifica_sesso_da_cf(d["metadata"]["codice_fiscale"]) for d in carriere]
+    ti = "01/08/1997"
+    n = len(carriere)
+
+    t_colonne, colonne = migliore(lambda: ColonneRecord.da_dati(carriere), args.ripetizioni)
+    t_calcolo, risultati = migliore(lambda: CalcolatoreVettoriale(colonne, sessi, ti).calcola(),
+                                    args.ripetizioni)
+
+    campione = carriere[:args.campione]
+    t_scalare, attesi = migliore(
+        lambda: [CalcolatoreContributi(d, sesso=s, tempo_indeterminato_da=ti).calcola()
+                 for d, s in zip(campione, sessi)], args.ripetizioni)
+    if risultati[:len(attesi)] != attesi:
+        sys.exit("ERRORE: risultati diversi dal calcolatore scalare")
+
+    print(f"carriere:     {n} ({args.anni} anni, {len(colonne) // n} record ciascuna)")
+    print(f"colonne:      {t_colonne:.3f} s")
+    print(f"vettoriale:   {t_calcolo:.3f} s   {n / t_calcolo * 60:,.0f} carriere/min")
+    print(f"scalare:      {len(campione) / t_scalare * 60:,.0f} carriere/min "
+          f"(campione di {len(campione)}, risultati identici)")
+
+
+if __name__ == "__main__":
+    main()
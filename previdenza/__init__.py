@@ -10,14 +10,29 @@ Uso:
     python -m previdenza file.pdf                # CLI tempo determinato
     python -m previdenza file.pdf -ti            # CLI tempo indeterminato
     python -m previdenza file.pdf -ti DD/MM/YYYY # CLI tempo indet. da data
+
+I nomi pubblici vengono importati al primo accesso: chi usa solo il
+calcolatore non carica pdfplumber/pdfminer ne' openpyxl.
 """
 
+import importlib
+
 __version__ = "1.0.0"
 
-from .estrattore import EstrattorePDF
-from .calcolatore import CalcolatoreContributi, decodifica_sesso_da_cf
-from .generatore import GeneratoreExcel
-from .core import elabora_pdf
+# Nome pubblico -> modulo che lo definisce
+_EXPORT = {
+    "EstrattorePDF": ".estrattore",
+    "CalcolatoreContributi": ".calcolatore",
+    "GeneratoreExcel": ".generatore",
+    "decodifica_sesso_da_cf": ".calcolatore",
+    "elabora_pdf": ".core",
+    "calcola_dati": ".core",
+    "RecordGenerale": ".record",
+    "RecordSpettacolo": ".record",
+    "CalcolatoreVettoriale": ".vettoriale",
+    "ColonneRecord": ".vettoriale",
+    "IndiceCumulativo": ".indice",
+}
 
 __all__ = [
     "EstrattorePDF",
@@ -25,4 +40,23 @@ __all__ = [
     "GeneratoreExcel",
     "decodifica_sesso_da_cf",
     "elabora_pdf",
+    "calcola_dati",
+    "RecordGenerale",
+    "RecordSpettacolo",
+    "CalcolatoreVettoriale",
+    "ColonneRecord",
+    "IndiceCumulativo",
 ]
+
+
+def __getattr__(name):
+    modulo = _EXPORT.get(name)
+    if modulo is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    valore = getattr(importlib.import_module(modulo, __name__), name)
+    globals()[name] = valore  # Gli accessi successivi non passano di qui
+    return valore
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,729 @@
+"""
+Backend di estrazione: dalle pagine del PDF alle tabelle grezze
+
+Un backend apre il documento e, per ogni pagina, fornisce il testo e le
+tabelle come liste di righe (celle stringa o None), nella stessa forma di
+page.extract_tables() di pdfplumber: EstrattorePDF le passa a _processa_riga
+senza sapere da dove vengono.
+
+Interfaccia di un documento (usato come context manager):
+    num_pagine()           numero di pagine del PDF
+    pagine()               genera le pagine dell'intervallo richiesto
+
+Interfaccia di una pagina:
+    testo()                testo completo (intestazione della pagina 0)
+    testo_caratteri()      testo dei soli caratteri, per la pre-selezione
+    tabelle()              lista di tabelle, ognuna lista di righe
+    chiudi()               libera le strutture della pagina
+"""
+
+import re
+from bisect import bisect_left
+
+import pdfplumber
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdftypes import resolve1
+
+
+# Data di una cella "Dal"/"Al" (usata anche da EstrattorePDF per la pre-selezione)
+RE_DATA = re.compile(r'\d{2}/\d{2}/\d{4}')
+
+# Ritaglio: l'intestazione "Dal Al" delle tabelle ancora la regione da analizzare.
+# Sopra, la regione parte dalla linea orizzontale che apre la tabella (righe di
+# titolo comprese); sotto, arriva alla linea che chiude la riga dell'ultima data.
+_RE_INTESTAZIONE = re.compile(r'Dal\s*Al')
+
+# Tolleranze in punti, come i valori predefiniti di pdfplumber per le tabelle
+# (snap, join, intersezioni) e per il testo delle celle (x/y_tolerance)
+_TOLLERANZA = 3
+_LUNGHEZZA_MINIMA = 3
+
+
+def _bordi_colonne(tabelle):
+    """Bordi di colonna comuni a tutte le tabelle trovate, o None se differiscono"""
+    bordi = None
+    for tabella in tabelle:
+        xs = sorted({round(x, 1) for cella in tabella.cells for x in (cella[0], cella[2])})
+        if bordi is None:
+            bordi = xs
+        elif len(xs) != len(bordi) or any(abs(a - b) > _TOLLERANZA for a, b in zip(xs, bordi)):
+            return None
+    return bordi
+
+
+def _intestazioni(tabelle):
+    """Righe di intestazione distinte ("Dal" nella prima cella) delle tabelle"""
+    intestazioni = []
+    for tabella in tabelle:
+        for riga in tabella:
+            if riga and riga[0] and str(riga[0]).strip() == "Dal" and riga not in intestazioni:
+                intestazioni.append(list(riga))
+    return intestazioni
+
+
+def _separa_intestazioni(tabelle):
+    """Divide le tabelle a ogni riga di intestazione "Dal".
+
+    Con i bordi di colonna espliciti le linee verticali attraversano tutta la
+    fascia e unificano tabelle vicine: ogni tabella ricomincia dalla propria
+    intestazione, come con la griglia ricavata dal disegno.
+    """
+    separate = []
+    for tabella in tabelle:
+        inizio = 0
+        for i, riga in enumerate(tabella):
+            if i > inizio and riga and riga[0] and str(riga[0]).strip() == "Dal":
+                separate.append(tabella[inizio:i])
+                inizio = i
+        separate.append(tabella[inizio:])
+    return separate
+
+
+def _modello_valido(tabelle, modello):
+    """Verifica le tabelle lette con i bordi di un modello.
+
+    Ogni riga deve avere le colonne del modello e ogni intestazione deve
+    essere gia' stata vista con la griglia del disegno: con bordi sbagliati
+    le etichette finiscono in celle diverse.
+    """
+    colonne = len(modello["bordi"]) - 1
+    if any(len(riga) != colonne for tabella in tabelle for riga in tabella):
+        return False
+    intestazioni = _intestazioni(tabelle)
+    return bool(intestazioni) and all(riga in modello["intestazioni"] for riga in intestazioni)
+
+
+def conta_pagine(pdf):
+    """Numero di pagine dal catalogo del PDF, senza creare gli oggetti pagina"""
+    try:
+        return int(resolve1(pdf.doc.catalog["Pages"])["Count"])
+    except (KeyError, TypeError, ValueError):
+        return sum(1 for _ in PDFPage.create_pages(pdf.doc))
+
+
+# ---------------------------------------------------------------------------
+# pdfplumber
+# ---------------------------------------------------------------------------
+
+class PaginaPdfplumber:
+    """Pagina pdfplumber: tabelle con page.extract_tables() sulla fascia utile"""
+
+    def __init__(self, page, modelli=None):
+        self.page = page
+        self.modelli = modelli  # CacheLayout, o None per ricavare sempre la griglia
+        self._chars = None
+        self._testo = None
+
+    def testo(self):
+        return self.page.extract_text()
+
+    def testo_caratteri(self):
+        if self._testo is None:
+            self._chars = self.page.chars
+            self._testo = ''.join(c["text"] for c in self._chars)
+        return self._testo
+
+    def _regione_tabelle(self):
+        """
+        Calcola la fascia della pagina che contiene le tabelle contributive.
+
+        La fascia va dalla linea orizzontale che apre la prima tabella (quella
+        dell'intestazione "Dal Al", o della prima data se manca) fino alla
+        prima linea orizzontale sotto l'ultima data: titolo e intestazione
+        della tabella restano interi, come la riga dell'ultima data anche se
+        ha molte linee di testo. Contano solo le date dentro una tabella, quindi una data di
+        stampa nell'intestazione o nel pie' di pagina non sposta la fascia.
+        Intestazione e pie' di pagina, con loghi e linee decorative, restano
+        fuori dalla ricerca delle tabelle. Restituisce None se non c'e' nulla
+        da ritagliare.
+        """
+        testo = self.testo_caratteri()
+        chars = self._chars
+        # Il testo deve corrispondere carattere per carattere a page.chars
+        if len(testo) != len(chars):
+            return None
+
+        # page.edges ricalcola le linee a ogni accesso
+        linee = self.page.edges
+        verticali = [e for e in linee if e["orientation"] == "v"]
+
+        def attraversano(carattere):
+            """Verticali che attraversano la riga del carattere: nessuna fuori dalle tabelle"""
+            return [e for e in verticali if e["top"] <= carattere["top"] + _TOLLERANZA
+                    and e["bottom"] >= carattere["bottom"] - _TOLLERANZA]
+
+        prima = None
+        ultima = None
+        for m in RE_DATA.finditer(testo):
+            inizio, fine = chars[m.start()], chars[m.end() - 1]
+            if not attraversano(inizio):
+                continue
+            if prima is None or inizio["top"] < prima["top"]:
+                prima = inizio
+            if ultima is None or fine["bottom"] > ultima["bottom"]:
+                ultima = fine
+        if ultima is None:
+            return None
+        for m in _RE_INTESTAZIONE.finditer(testo):
+            carattere = chars[m.start()]
+            if carattere["top"] < prima["top"] and attraversano(carattere):
+                prima = carattere
+
+        x0, top, x1, bottom = self.page.bbox
+        # Linea che apre la tabella: la cima delle verticali che attraversano la prima riga
+        regione_top = max(top, min(e["top"] for e in attraversano(prima)) - _TOLLERANZA)
+        # Prima linea orizzontale sotto l'ultima data che attraversa la sua colonna
+        chiusure = [e["top"] for e in linee
+                    if e["orientation"] == "h" and e["top"] >= ultima["bottom"]
+                    and e["x0"] <= ultima["x0"] and e["x1"] >= ultima["x1"]]
+        regione_bottom = min(bottom, min(chiusure) + _TOLLERANZA) if chiusure else bottom
+        if regione_top <= top and regione_bottom >= bottom:
+            return None
+        return (x0, regione_top, x1, regione_bottom)
+
+    def _impronta(self):
+        """Impronta del layout: dimensioni della pagina e posizione di ogni parola della riga "Dal Al" """
+        testo = self.testo_caratteri()
+        m = _RE_INTESTAZIONE.search(testo)
+        if not m or len(testo) != len(self._chars):
+            return None
+        top = self._chars[m.start()]["top"]
+        riga = sorted((c for c in self._chars if abs(c["top"] - top) <= _TOLLERANZA and c["text"].strip()),
+                      key=lambda c: c["x0"])
+        # Una parola inizia dove lo spazio dal carattere precedente supera la tolleranza
+        inizi = []
+        fine = None
+        for c in riga:
+            if fine is None or c["x0"] - fine > _TOLLERANZA:
+                inizi.append(f"{c['x0']:.0f}")
+            fine = c["x1"]
+        return f"{self.page.width:.0f}x{self.page.height:.0f}|" + "|".join(inizi)
+
+    def tabelle(self):
+        page = self.page
+        regione = self._regione_tabelle()
+        if regione:
+            page = page.crop(regione)
+        impronta = self._impronta() if self.modelli is not None else None
+        if impronta is None:
+            return page.extract_tables()
+
+        # Layout gia' visto: linee verticali esplicite, niente ricerca delle verticali
+        modello = self.modelli.leggi(impronta)
+        if isinstance(modello, dict):
+            tabelle = page.extract_tables({"vertical_strategy": "explicit",
+                                           "explicit_vertical_lines": modello["bordi"]})
+            if _modello_valido(tabelle, modello):
+                return _separa_intestazioni(tabelle)
+
+        # Layout nuovo (o modello non valido per questa pagina): griglia dal disegno
+        trovate = page.find_tables()
+        tabelle = [tabella.extract() for tabella in trovate]
+        bordi = _bordi_colonne(trovate)
+        intestazioni = _intestazioni(tabelle)
+        if bordi and intestazioni:
+            if isinstance(modello, dict) and modello["bordi"] == bordi:
+                intestazioni = modello["intestazioni"] + [r for r in intestazioni if r not in modello["intestazioni"]]
+            self.modelli.impara(impronta, {"bordi": bordi, "intestazioni": intestazioni})
+        return tabelle
+
+    def chiudi(self):
+        self.page.close()
+
+
+class DocumentoPdfplumber:
+    """Documento aperto con pdfplumber (pagine [inizio, fine))"""
+
+    def __init__(self, pdf_path, inizio=0, fine=None, modelli=None):
+        # Senza fine il numero di pagine non e' noto prima dell'apertura: le prime si saltano in pagine()
+        pagine = range(inizio + 1, fine + 1) if fine is not None else None
+        self._pdf = pdfplumber.open(pdf_path, pages=pagine)
+        self._salta = inizio if fine is None else 0
+        self.modelli = modelli
+
+    def num_pagine(self):
+        return conta_pagine(self._pdf)
+
+    def pagine(self):
+        for page in self._pdf.pages[self._salta:]:
+            yield PaginaPdfplumber(page, self.modelli)
+
+    def close(self):
+        self._pdf.close()
+        if self.modelli is not None:
+            self.modelli.salva()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------------------------------------------------------------------------
+# Ricostruzione delle tabelle da linee e testo posizionato
+# ---------------------------------------------------------------------------
+
+def _raggruppa(valori, tolleranza):
+    """Raggruppa valori ordinati vicini entro la tolleranza: {valore: media del gruppo}"""
+    mappa = {}
+    gruppo = []
+    for v in sorted(set(valori)):
+        if gruppo and v - gruppo[-1] > tolleranza:
+            media = sum(gruppo) / len(gruppo)
+            mappa.update((g, media) for g in gruppo)
+            gruppo = []
+        gruppo.append(v)
+    if gruppo:
+        media = sum(gruppo) / len(gruppo)
+        mappa.update((g, media) for g in gruppo)
+    return mappa
+
+
+def _unisci_segmenti(segmenti):
+    """Allinea e unisce i segmenti (posizione, inizio, fine) collineari e contigui"""
+    allinea = _raggruppa([s[0] for s in segmenti], _TOLLERANZA)
+    per_posizione = {}
+    for pos, a, b in segmenti:
+        per_posizione.setdefault(allinea[pos], []).append((a, b))
+
+    uniti = []
+    for pos in sorted(per_posizione):
+        corrente = None
+        for a, b in sorted(per_posizione[pos]):
+            if corrente and a <= corrente[1] + _TOLLERANZA:
+                corrente[1] = max(corrente[1], b)
+            else:
+                if corrente:
+                    uniti.append(tuple(corrente))
+                corrente = [pos, a, b]
+        uniti.append(tuple(corrente))
+    return [s for s in uniti if s[2] - s[1] >= _LUNGHEZZA_MINIMA]
+
+
+def _celle(orizzontali, verticali):
+    """
+    Celle della griglia, con lo stesso criterio di pdfplumber: da ogni
+    incrocio si cerca la cella piu' piccola i cui quattro lati sono linee.
+
+    orizzontali: segmenti (top, x0, x1); verticali: segmenti (x, top, bottom).
+    Restituisce le celle (x0, top, x1, bottom).
+    """
+    orizzontali = _unisci_segmenti(orizzontali)
+    verticali = _unisci_segmenti(verticali)
+
+    # Incroci: punto -> (indice della verticale, indice dell'orizzontale)
+    incroci = {}
+    for iv, (x, v_top, v_bottom) in enumerate(verticali):
+        for io, (y, h_x0, h_x1) in enumerate(orizzontali):
+            if (v_top - _TOLLERANZA <= y <= v_bottom + _TOLLERANZA
+                    and h_x0 - _TOLLERANZA <= x <= h_x1 + _TOLLERANZA):
+                incroci[(x, y)] = (iv, io)
+
+    sotto = {}  # x -> ordinate degli incroci sulla verticale
+    destra = {}  # y -> ascisse degli incroci sull'orizzontale
+    for x, y in sorted(incroci):
+        sotto.setdefault(x, []).append(y)
+        destra.setdefault(y, []).append(x)
+
+    celle = []
+    for (x, y), (iv, io) in sorted(incroci.items()):
+        trovata = None
+        for y2 in sotto[x]:
+            if y2 <= y or incroci[(x, y2)][0] != iv:
+                continue
+            io_basso = incroci[(x, y2)][1]
+            for x2 in destra[y]:
+                if x2 <= x or incroci[(x2, y)][1] != io:
+                    continue
+                angolo = incroci.get((x2, y2))
+                if angolo and angolo[0] == incroci[(x2, y)][0] and angolo[1] == io_basso:
+                    trovata = (x, y, x2, y2)
+                    break
+            if trovata:
+                break
+        if trovata:
+            celle.append(trovata)
+    return celle
+
+
+def _tabelle_da_celle(celle):
+    """Raggruppa le celle che condividono un angolo; tabelle ordinate dall'alto"""
+    tabelle = []
+    angoli_tabella = []
+    for cella in celle:
+        x0, top, x1, bottom = cella
+        angoli = {(x0, top), (x0, bottom), (x1, top), (x1, bottom)}
+        unite = [i for i, a in enumerate(angoli_tabella) if a & angoli]
+        gruppo = [cella]
+        for i in reversed(unite):
+            gruppo.extend(tabelle.pop(i))
+            angoli |= angoli_tabella.pop(i)
+        tabelle.append(gruppo)
+        angoli_tabella.append(angoli)
+
+    tabelle = [t for t in tabelle if len(t) > 1]
+    return sorted(tabelle, key=lambda t: min((c[1], c[0]) for c in t))
+
+
+def _testo_cella(caratteri):
+    """Testo di una cella: caratteri (x0, top, x1, bottom, testo) in righe e parole"""
+    caratteri.sort(key=lambda c: c[1])
+    righe = []
+    for c in caratteri:
+        if righe and c[1] - righe[-1][-1][1] <= _TOLLERANZA:
+            righe[-1].append(c)
+        else:
+            righe.append([c])
+
+    linee = []
+    for riga in righe:
+        riga.sort(key=lambda c: c[0])
+        parti = []
+        fine = None
+        spazio = False
+        for x0, _, x1, _, testo in riga:
+            # Nuova parola dopo uno spazio o una distanza oltre la tolleranza
+            if testo.isspace():
+                spazio = True
+                continue
+            if parti and (spazio or x0 - fine > _TOLLERANZA):
+                parti.append(" ")
+            parti.append(testo)
+            fine = x1
+            spazio = False
+        if parti:
+            linee.append("".join(parti))
+    return "\n".join(linee)
+
+
+def ricostruisci_tabelle(caratteri, orizzontali, verticali):
+    """
+    Ricostruisce le tabelle della pagina dalle linee e dai caratteri.
+
+    caratteri: (x0, top, x1, bottom, testo), assegnati alla cella che
+    contiene il loro centro. Le tabelle hanno la forma di
+    page.extract_tables(): una riga per fascia di celle, None dove una
+    cella ne copre piu' colonne.
+    """
+    centri = sorted(((c[1] + c[3]) / 2, (c[0] + c[2]) / 2, c) for c in caratteri)
+    ordinate = [centro[0] for centro in centri]
+
+    risultato = []
+    for celle in _tabelle_da_celle(_celle(orizzontali, verticali)):
+        colonne = sorted({c[0] for c in celle})
+        righe = {}
+        for cella in celle:
+            righe.setdefault(cella[1], []).append(cella)
+
+        tabella = []
+        for top in sorted(righe):
+            per_colonna = {c[0]: c for c in righe[top]}
+            bottom = max(c[3] for c in righe[top])
+            contenuto = {}
+            for cy, cx, c in centri[bisect_left(ordinate, top):bisect_left(ordinate, bottom)]:
+                for cella in righe[top]:
+                    if cella[0] <= cx < cella[2] and cy < cella[3]:
+                        contenuto.setdefault(cella, []).append(c)
+                        break
+
+            tabella.append([
+                None if per_colonna.get(x) is None else _testo_cella(contenuto.get(per_colonna[x], []))
+                for x in colonne
+            ])
+        risultato.append(tabella)
+    return risultato
+
+
+def _colonne_tabelle(verticali):
+    """
+    Griglie delle tabelle dalle sole linee verticali (x, top, bottom).
+
+    Le verticali che si sovrappongono in altezza formano una tabella; le
+    colonne sono le verticali che arrivano in fondo alla tabella (quelle
+    presenti solo nell'intestazione non dividono le righe di dati).
+    Restituisce (top, bottom, ascisse dei bordi di colonna) per tabella.
+    """
+    gruppi = []
+    for x, top, bottom in sorted(_unisci_segmenti(verticali), key=lambda v: v[1]):
+        if gruppi and top <= gruppi[-1][1] + _TOLLERANZA:
+            gruppo = gruppi[-1]
+            gruppo[1] = max(gruppo[1], bottom)
+            gruppo[2].append((x, bottom))
+        else:
+            gruppi.append([top, bottom, [(x, bottom)]])
+
+    griglie = []
+    for top, bottom, bordi in gruppi:
+        ascisse = sorted({x for x, fine in bordi if fine >= bottom - _TOLLERANZA})
+        if len(ascisse) > 1:
+            griglie.append((top, bottom, ascisse))
+    return griglie
+
+
+def _linee(parole):
+    """Raggruppa le parole (x0, top, x1, bottom, testo) in linee con ordinata entro la tolleranza"""
+    linee = []
+    for p in sorted(parole, key=lambda p: p[1]):
+        if linee and p[1] - linee[-1][-1][1] <= _TOLLERANZA:
+            linee[-1].append(p)
+        else:
+            linee.append([p])
+    return linee
+
+
+def _fasce_righe(orizzontali, top, bottom, ascisse):
+    """
+    Fasce (top, bottom) delle righe di una tabella, tra linee orizzontali consecutive.
+
+    Contano solo le orizzontali che attraversano la prima colonna: quelle
+    interne all'intestazione non separano le righe. Restituisce [] se la
+    tabella non ha almeno due orizzontali.
+    """
+    ordinate = sorted(y for y, x0, x1 in _unisci_segmenti(orizzontali)
+                      if top - _TOLLERANZA <= y <= bottom + _TOLLERANZA
+                      and x0 <= ascisse[0] + _TOLLERANZA and x1 >= ascisse[1] - _TOLLERANZA)
+    return list(zip(ordinate, ordinate[1:]))
+
+
+def _fascia(parola, fasce, inizi):
+    """Indice della fascia con la massima sovrapposizione verticale con la parola"""
+    _, top, _, bottom, _ = parola
+    i = bisect_left(inizi, (top + bottom) / 2) - 1
+    candidate = [j for j in (i - 1, i, i + 1) if 0 <= j < len(fasce)]
+    return max(candidate, key=lambda j: min(bottom, fasce[j][1]) - max(top, fasce[j][0]))
+
+
+def ricostruisci_da_parole(parole, verticali, orizzontali=()):
+    """
+    Ricostruisce le tabelle dalle parole senza cercare celle e incroci.
+
+    Le parole (x0, top, x1, bottom, testo) dentro l'altezza di una tabella
+    vengono assegnate alla fascia di riga tra due linee orizzontali con cui
+    si sovrappongono di piu', e alla colonna che contiene il loro centro:
+    una cella su piu' linee resta nella sua riga anche se le altre celle
+    sono centrate o allineate in basso. Senza orizzontali ogni linea di
+    testo e' una fascia. Una fascia con testo nella prima colonna apre una
+    nuova riga; le fasce con la prima colonna vuota sono il seguito delle
+    celle su piu' linee. Le fasce prima della prima data formano
+    l'intestazione. Ogni tabella ha la forma usata da _estrai_tabelle:
+    intestazione, riga vuota, righe di dati.
+    """
+    risultato = []
+    for top, bottom, ascisse in _colonne_tabelle(verticali):
+        num_colonne = len(ascisse) - 1
+        dentro = [p for p in parole if top <= (p[1] + p[3]) / 2 < bottom]
+
+        fasce = _fasce_righe(orizzontali, top, bottom, ascisse)
+        if fasce:
+            inizi = [f[0] for f in fasce]
+            per_fascia = [[] for _ in fasce]
+            for p in dentro:
+                per_fascia[_fascia(p, fasce, inizi)].append(p)
+        else:
+            per_fascia = _linee(dentro)
+
+        intestazione = [[] for _ in range(num_colonne)]
+        righe = []
+        for fascia in per_fascia:
+            if not fascia:
+                continue
+            celle = [[] for _ in range(num_colonne)]
+            for p in fascia:
+                i = bisect_left(ascisse, (p[0] + p[2]) / 2) - 1
+                if 0 <= i < num_colonne:
+                    celle[i].append(p)
+            testi = ["\n".join(" ".join(p[4] for p in sorted(linea)) for linea in _linee(cella))
+                     for cella in celle]
+
+            if testi[0] and (righe or RE_DATA.match(testi[0])):
+                righe.append([[t] if t else [] for t in testi])
+                continue
+            corrente = righe[-1] if righe else intestazione
+            for cella, t in zip(corrente, testi):
+                if t:
+                    cella.append(t)
+
+        if not righe:
+            continue
+        tabella = [["\n".join(cella) for cella in intestazione], [""] * num_colonne]
+        tabella.extend(["\n".join(cella) for cella in riga] for riga in righe)
+        risultato.append(tabella)
+    return risultato
+
+
+class PaginaParole(PaginaPdfplumber):
+    """Pagina pdfplumber con righe ricostruite da page.extract_words()"""
+
+    def tabelle(self):
+        page = self.page
+        regione = self._regione_tabelle()
+        if regione:
+            page = page.crop(regione)
+        parole = [(w["x0"], w["top"], w["x1"], w["bottom"], w["text"]) for w in page.extract_words()]
+        verticali = []
+        orizzontali = []
+        for e in page.edges:
+            if e["orientation"] == "v" and e["x0"] == e["x1"]:
+                verticali.append((e["x0"], e["top"], e["bottom"]))
+            elif e["orientation"] == "h" and e["top"] == e["bottom"]:
+                orizzontali.append((e["top"], e["x0"], e["x1"]))
+        return ricostruisci_da_parole(parole, verticali, orizzontali)
+
+
+class DocumentoParole(DocumentoPdfplumber):
+    """Documento pdfplumber letto parola per parola, senza extract_tables()"""
+
+    def pagine(self):
+        for page in self._pdf.pages[self._salta:]:
+            yield PaginaParole(page, self.modelli)
+
+
+# ---------------------------------------------------------------------------
+# pypdfium2
+# ---------------------------------------------------------------------------
+
+def _segmenti_pdfium(page, altezza):
+    """Linee orizzontali e verticali dei tracciati della pagina (coordinate dall'alto)"""
+    import ctypes
+    import pypdfium2.raw as pdfium_c
+
+    orizzontali = []
+    verticali = []
+    x = ctypes.c_float()
+    y = ctypes.c_float()
+    for obj in page.get_objects(filter=(pdfium_c.FPDF_PAGEOBJ_PATH,)):
+        # Matrice del tracciato composta con quelle degli eventuali form XObject
+        matrici = [obj.get_matrix()]
+        contenitore = obj.container
+        while contenitore is not None:
+            matrici.append(contenitore.get_matrix())
+            contenitore = contenitore.container
+
+        punti = []  # sottotracciati: liste di punti in coordinate di pagina
+        for i in range(pdfium_c.FPDFPath_CountSegments(obj.raw)):
+            segmento = pdfium_c.FPDFPath_GetPathSegment(obj.raw, i)
+            pdfium_c.FPDFPathSegment_GetPoint(segmento, x, y)
+            punto = (x.value, y.value)
+            for matrice in matrici:
+                punto = matrice.on_point(*punto)
+            tipo = pdfium_c.FPDFPathSegment_GetType(segmento)
+            if tipo == pdfium_c.FPDF_SEGMENT_MOVETO or not punti:
+                punti.append([punto])
+            elif tipo == pdfium_c.FPDF_SEGMENT_LINETO:
+                punti[-1].append(punto)
+            else:
+                # Curve: interrompono il sottotracciato, come per le tabelle non contano
+                punti.append([punto])
+            if pdfium_c.FPDFPathSegment_GetClose(segmento) and len(punti[-1]) > 1:
+                punti[-1].append(punti[-1][0])
+
+        for sottotracciato in punti:
+            for (x0, y0), (x1, y1) in zip(sottotracciato, sottotracciato[1:]):
+                if abs(y0 - y1) < 0.5 and x0 != x1:
+                    orizzontali.append((altezza - y0, min(x0, x1), max(x0, x1)))
+                elif abs(x0 - x1) < 0.5 and y0 != y1:
+                    verticali.append((x0, altezza - max(y0, y1), altezza - min(y0, y1)))
+    return orizzontali, verticali
+
+
+class PaginaPdfium:
+    """Pagina pypdfium2: testo e linee letti in C, tabelle ricostruite dalla griglia"""
+
+    def __init__(self, page):
+        self.page = page
+        self._textpage = None
+        self._testo = None
+
+    def _pagina_testo(self):
+        if self._textpage is None:
+            self._textpage = self.page.get_textpage()
+        return self._textpage
+
+    def testo(self):
+        return self.testo_caratteri()
+
+    def testo_caratteri(self):
+        if self._testo is None:
+            self._testo = self._pagina_testo().get_text_range()
+        return self._testo
+
+    def _caratteri(self, altezza):
+        """Caratteri (x0, top, x1, bottom, testo) con il riquadro del font"""
+        import pypdfium2.raw as pdfium_c
+
+        textpage = self._pagina_testo()
+        testo = self.testo_caratteri()
+        n = textpage.count_chars()
+        caratteri = []
+        for i in range(n):
+            # Spazi e a capo aggiunti da pdfium non sono nel PDF
+            if pdfium_c.FPDFText_IsGenerated(textpage.raw, i) == 1:
+                continue
+            carattere = testo[i] if len(testo) == n else chr(pdfium_c.FPDFText_GetUnicode(textpage.raw, i))
+            left, bottom, right, top = textpage.get_charbox(i, loose=True)
+            caratteri.append((left, altezza - top, right, altezza - bottom, carattere))
+        return caratteri
+
+    def tabelle(self):
+        altezza = self.page.get_height()
+        orizzontali, verticali = _segmenti_pdfium(self.page, altezza)
+        if not orizzontali or not verticali:
+            return []
+        return ricostruisci_tabelle(self._caratteri(altezza), orizzontali, verticali)
+
+    def chiudi(self):
+        if self._textpage is not None:
+            self._textpage.close()
+            self._textpage = None
+        self.page.close()
+
+
+class DocumentoPdfium:
+    """Documento aperto con pypdfium2 (pagine [inizio, fine))"""
+
+    def __init__(self, pdf_path, inizio=0, fine=None, modelli=None):
+        import pypdfium2
+
+        self._pdf = pypdfium2.PdfDocument(pdf_path)
+        self._inizio = inizio
+        self._fine = fine
+
+    def num_pagine(self):
+        return len(self._pdf)
+
+    def pagine(self):
+        fine = len(self._pdf) if self._fine is None else self._fine
+        for i in range(self._inizio, fine):
+            yield PaginaPdfium(self._pdf[i])
+
+    def close(self):
+        self._pdf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Backend disponibili per EstrattorePDF(..., backend=...) e per la CLI
+BACKEND = {
+    "pdfplumber": DocumentoPdfplumber,
+    "pdfium": DocumentoPdfium,
+    "parole": DocumentoParole,
+}
+BACKEND_PREDEFINITO = "pdfplumber"
+
+
+def apri_documento(pdf_path, backend=BACKEND_PREDEFINITO, inizio=0, fine=None, modelli=None):
+    """
+    Apre il PDF con il backend indicato, limitato alle pagine [inizio, fine).
+
+    modelli: CacheLayout con i bordi di colonna gia' appresi (solo pdfplumber).
+    """
+    try:
+        classe = BACKEND[backend]
+    except KeyError:
+        raise ValueError(f"Backend sconosciuto: {backend} (disponibili: {', '.join(BACKEND)})")
+    return classe(pdf_path, inizio, fine, modelli)
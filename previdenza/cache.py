@@ -0,0 +1,279 @@
+"""
+Cache su disco dei dati estratti dai PDF INPS, e cache in memoria dei risultati di calcolo
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from collections import OrderedDict
+
+
+def cartella_cache_predefinita():
+    """Cartella di cache dell'utente (XDG su Linux, LOCALAPPDATA su Windows)"""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "previdenza")
+
+
+def _scrivi_json_atomico(cartella, percorso, dati):
+    """Scrive un file JSON con un rename atomico: piu' processi possono usare la stessa cartella"""
+    os.makedirs(cartella, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=cartella, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(dati, f, ensure_ascii=False)
+        os.replace(temp_path, percorso)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class CacheEstrazioni:
+    """Cache dei dati estratti, indirizzata dal contenuto del PDF.
+
+    La chiave e' l'hash SHA-256 dei byte del PDF piu' la versione
+    dell'estrattore: rinominare o spostare il file non invalida la cache,
+    cambiare le regole di estrazione si'. Ogni voce e' un file JSON; oltre
+    il limite di spazio vengono eliminate le voci usate meno di recente.
+    """
+
+    LIMITE_PREDEFINITO = 256 * 1024 * 1024  # 256 MB
+
+    def __init__(self, cartella=None, limite_byte=LIMITE_PREDEFINITO):
+        self.cartella = cartella or cartella_cache_predefinita()
+        self.limite_byte = limite_byte
+
+    def chiave(self, pdf_path, versione):
+        """Calcola la chiave di cache per un PDF"""
+        h = hashlib.sha256()
+        with open(pdf_path, "rb") as f:
+            for blocco in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(blocco)
+        h.update(f"\0{versione}".encode())
+        return h.hexdigest()
+
+    def _percorso(self, chiave):
+        return os.path.join(self.cartella, f"{chiave}.json")
+
+    def leggi(self, chiave):
+        """Restituisce i dati in cache, o None se assenti"""
+        percorso = self._percorso(chiave)
+        try:
+            with open(percorso, "r", encoding="utf-8") as f:
+                dati = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # Aggiorna la data di ultimo utilizzo per l'eliminazione LRU
+        try:
+            os.utime(percorso)
+        except OSError:
+            pass
+        return dati
+
+    def scrivi(self, chiave, dati):
+        """Salva i dati in cache e rispetta il limite di spazio"""
+        _scrivi_json_atomico(self.cartella, self._percorso(chiave), dati)
+        self._rispetta_limite()
+
+    def _rispetta_limite(self):
+        """Elimina le voci meno recenti finche' la cache supera il limite"""
+        voci = []
+        totale = 0
+        with os.scandir(self.cartella) as it:
+            for entry in it:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                voci.append((stat.st_mtime, stat.st_size, entry.path))
+                totale += stat.st_size
+
+        if totale <= self.limite_byte:
+            return
+
+        voci.sort()
+        for _, dimensione, percorso in voci:
+            if totale <= self.limite_byte:
+                break
+            try:
+                os.remove(percorso)
+            except OSError:
+                continue
+            totale -= dimensione
+
+    def svuota(self):
+        """Elimina tutte le voci della cache"""
+        if not os.path.isdir(self.cartella):
+            return
+        for nome in os.listdir(self.cartella):
+            if nome.endswith(".json"):
+                try:
+                    os.remove(os.path.join(self.cartella, nome))
+                except OSError:
+                    pass
+
+
+class CacheLayout:
+    """Modelli di layout delle tabelle, condivisi tra pagine, documenti ed esecuzioni.
+
+    Un modello sono i bordi di colonna delle tabelle e le righe di
+    intestazione lette con quei bordi ({"bordi": [...], "intestazioni":
+    [...]}), indicizzati da un'impronta della geometria della pagina
+    (dimensioni e posizione di ogni parola dell'intestazione "Dal Al"). Le
+    pagine con la stessa impronta usano i bordi salvati come linee verticali
+    esplicite invece di ricavarle dal disegno, se le tabelle ottenute
+    corrispondono al modello. I modelli stanno in un solo file JSON nella
+    cartella di cache (il suffisso .layout lo tiene fuori dall'eliminazione
+    LRU dei dati).
+    """
+
+    NOME_FILE = "modelli.layout"
+
+    def __init__(self, cartella=None):
+        self.cartella = cartella or cartella_cache_predefinita()
+        self._modelli = None
+        self._nuovi = {}
+
+    def _percorso(self):
+        return os.path.join(self.cartella, self.NOME_FILE)
+
+    def _leggi_file(self):
+        try:
+            with open(self._percorso(), "r", encoding="utf-8") as f:
+                modelli = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return modelli if isinstance(modelli, dict) else {}
+
+    def leggi(self, impronta):
+        """Restituisce il modello (bordi di colonna e intestazioni) per l'impronta, o None"""
+        if self._modelli is None:
+            self._modelli = self._leggi_file()
+        return self._modelli.get(impronta)
+
+    def impara(self, impronta, modello):
+        """Registra il modello appreso da una pagina"""
+        if self._modelli is None:
+            self._modelli = self._leggi_file()
+        self._modelli[impronta] = modello
+        self._nuovi[impronta] = modello
+
+    def salva(self):
+        """Salva i modelli appresi, unendoli a quelli scritti nel frattempo da altri processi"""
+        if not self._nuovi:
+            return
+        modelli = self._leggi_file()
+        modelli.update(self._nuovi)
+        try:
+            _scrivi_json_atomico(self.cartella, self._percorso(), modelli)
+        except OSError:
+            return  # Cartella non scrivibile: i modelli restano validi per questa esecuzione
+        self._nuovi = {}
+
+
+# Campi dei record letti dal calcolatore: solo questi entrano nell'impronta dei risultati
+_CAMPI_CALCOLO = {
+    "regime_generale": ("dal", "al", "settimane", "note"),
+    "spettacolo": ("dal", "al", "giorni", "gruppo"),
+}
+
+
+def _valori(record, campi):
+    if isinstance(record, dict):
+        return tuple(record.get(campo) for campo in campi)
+    return tuple(getattr(record, campo) for campo in campi)
+
+
+class CacheRisultati:
+    """Cache in memoria dei risultati di CalcolatoreContributi.calcola().
+
+    La chiave e' un'impronta SHA-256 dei campi dei record usati dal calcolo
+    (dizionari e record compatti danno la stessa impronta; il metadata non
+    conta) piu' sesso e tempo_indeterminato_da. Le voci sono limitate in
+    numero e in byte (stima della memoria dei dizionari per anno): oltre i
+    limiti si eliminano quelle usate meno di recente. successi e mancati
+    contano le letture.
+    """
+
+    VOCI_PREDEFINITE = 4096
+    LIMITE_PREDEFINITO = 64 * 1024 * 1024  # 64 MB
+
+    def __init__(self, max_voci=VOCI_PREDEFINITE, limite_byte=LIMITE_PREDEFINITO):
+        self.max_voci = max_voci
+        self.limite_byte = limite_byte
+        self._voci = OrderedDict()  # chiave -> (risultati, byte), dalla meno recente
+        self.byte = 0
+        self.successi = 0
+        self.mancati = 0
+
+    def __len__(self):
+        return len(self._voci)
+
+    @staticmethod
+    def chiave(dati, sesso, tempo_indeterminato_da):
+        """Impronta stabile dei record e dei parametri di calcolo"""
+        sezioni = tuple(
+            tuple(_valori(record, campi) for record in dati.get(sezione, []))
+            for sezione, campi in _CAMPI_CALCOLO.items()
+        )
+        return hashlib.sha256(repr((sezioni, sesso, tempo_indeterminato_da)).encode()).hexdigest()
+
+    @staticmethod
+    def _dimensione(risultati):
+        """Stima in byte di un risultato: dizionari per anno con chiavi e valori interi"""
+        totale = sys.getsizeof(risultati)
+        for valore in risultati.values():
+            totale += sys.getsizeof(valore)
+            if isinstance(valore, dict):
+                totale += len(valore) * 2 * sys.getsizeof(2 ** 20)
+        return totale
+
+    @staticmethod
+    def _copia(risultati):
+        """Copia dei dizionari per anno: chi modifica il risultato non altera la cache"""
+        return {k: dict(v) if isinstance(v, dict) else v for k, v in risultati.items()}
+
+    def leggi(self, chiave):
+        """Restituisce una copia dei risultati in cache, o None se assenti"""
+        voce = self._voci.get(chiave)
+        if voce is None:
+            self.mancati += 1
+            return None
+        self._voci.move_to_end(chiave)
+        self.successi += 1
+        return self._copia(voce[0])
+
+    def scrivi(self, chiave, risultati):
+        """Salva una copia dei risultati e rispetta i limiti di voci e byte"""
+        dimensione = self._dimensione(risultati)
+        if dimensione > self.limite_byte or self.max_voci < 1:
+            return
+        vecchia = self._voci.pop(chiave, None)
+        if vecchia is not None:
+            self.byte -= vecchia[1]
+        self._voci[chiave] = (self._copia(risultati), dimensione)
+        self.byte += dimensione
+        while len(self._voci) > self.max_voci or self.byte > self.limite_byte:
+            _, (_, liberati) = self._voci.popitem(last=False)
+            self.byte -= liberati
+
+    def svuota(self):
+        """Elimina tutte le voci e azzera i contatori"""
+        self._voci.clear()
+        self.byte = 0
+        self.successi = 0
+        self.mancati = 0
+
+    def statistiche(self):
+        """Voci, byte, successi e mancati"""
+        return {"voci": len(self._voci), "byte": self.byte, "successi": self.successi, "mancati": self.mancati}
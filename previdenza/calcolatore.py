@@ -2,7 +2,25 @@
 Calcolo contributi previdenziali INPS
 """
 
+import time
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
+from itertools import accumulate
+
+from . import mesi
+from .indice import IndiceCumulativo
+from .record import compatta
+
+
+# Ere normative dei Lavoratori dello Spettacolo, in ordine: dal (anno, mese),
+# giorni/anno a tempo determinato per il gruppo 1 e per gli altri gruppi,
+# giorni/anno a tempo indeterminato (None: il contratto non conta, come determinato).
+# Una nuova era e' una nuova riga.
+ERE_SPETTACOLO = (
+    ((1, 1), 60, 180, None),        # Fino al 1992
+    ((1993, 1), 120, 260, None),    # 1993 - luglio 1997
+    ((1997, 8), 120, 260, 312),     # Dal 1 agosto 1997
+)
 
 
 def decodifica_sesso_da_cf(codice_fiscale):
@@ -33,8 +51,21 @@ class CalcolatoreContributi:
     OBIETTIVO_DONNA = 41 * 12 + 10  # 41 anni e 10 mesi = 502 mesi
     OBIETTIVO_UOMO = 42 * 12 + 10   # 42 anni e 10 mesi = 514 mesi
 
+    # Stadi di calcola(), nell'ordine: (nome, metodo)
+    STADI = (
+        ("regime_generale", "_calcola_regime_generale"),
+        ("spettacolo", "_calcola_spettacolo"),
+        ("cap", "_applica_cap_giorni_reali"),
+        ("range", "_determina_range_anni"),
+        ("completamento", "_completa_ultimo_anno"),
+        ("proiezione", "_estendi_a_obiettivo"),
+    )
+
     def __init__(self, dati_estratti, sesso=None, tempo_indeterminato_da=None):
         self.dati = dati_estratti
+        # Record in forma compatta (accetta sia dizionari sia RecordGenerale/RecordSpettacolo)
+        self.regime_generale = compatta("regime_generale", dati_estratti["regime_generale"])
+        self.spettacolo = compatta("spettacolo", dati_estratti["spettacolo"])
         self.sesso = sesso  # 'M' o 'F'
         self.tempo_indeterminato_da = tempo_indeterminato_da  # None, "sempre", o "DD/MM/YYYY"
         self.reale_per_anno = defaultdict(int)
@@ -42,9 +73,18 @@ class CalcolatoreContributi:
         self.mesi_per_anno = defaultdict(int)  # Mesi teorici per anno
         self.ultimo_regime = None  # Per estensione anni futuri
         self.ultimo_gruppo = None  # Gruppo spettacolo se applicabile
-        self.mesi_esclusi = defaultdict(set)  # Mesi esclusi per disoccupazione (note "3"/"O")
+        self.mesi_esclusi = defaultdict(int)  # Maschere dei mesi esclusi per disoccupazione (note "3"/"O")
         self.anno_min = None
         self.anno_max = None
+        self.anno_proiezione = None  # Primo anno della proiezione verso l'obiettivo (None se non serve)
+        # Passaggio a tempo indeterminato come (anno, mese), risolto una volta sola
+        self._inizio_ti = self._risolvi_inizio_ti(tempo_indeterminato_da)
+        self._tariffe = {}  # (anno, gruppo 1?, inizio TI) -> [(maschera mesi, giorni/anno)]
+        # Anno -> (maschera mesi, gruppo) dei giorni teorici spettacolo, i soli che dipendono
+        # dal tempo indeterminato: mesi coperti gia' uniti e senza gli esclusi, compresi
+        # completamento e proiezione (vedi aggiorna e scenari_tempo_indeterminato).
+        # None prima di calcola()
+        self._termini_spettacolo = None
 
         # Determina obiettivo in base al sesso
         if sesso == 'F':
@@ -54,20 +94,63 @@ class CalcolatoreContributi:
             self.obiettivo_mesi = self.OBIETTIVO_UOMO
             self.obiettivo_label = "42a 10m"
 
-    def calcola(self):
-        """Esegue tutti i calcoli"""
-        self._calcola_regime_generale()
-        self._calcola_spettacolo()
-        self._applica_cap_giorni_reali()
-        self._determina_range_anni()
-        self._estendi_a_obiettivo()
+    def calcola(self, tempi=None):
+        """
+        Esegue tutti i calcoli, uno stadio di STADI dopo l'altro.
+
+        tempi: dizionario facoltativo in cui scrivere il tempo CPU in secondi
+        di ogni stadio (per nome), per i benchmark.
+        """
+        self._termini_spettacolo = {}
+        for nome, metodo in self.STADI:
+            if tempi is None:
+                getattr(self, metodo)()
+            else:
+                inizio = time.process_time()
+                getattr(self, metodo)()
+                tempi[nome] = time.process_time() - inizio
+        return self._risultati()
+
+    def aggiorna(self, tempo_indeterminato_da):
+        """
+        Ricalcola dopo un cambio di tempo_indeterminato_da, senza rifare tutto.
+
+        I mesi (quindi anche completamento e lunghezza della proiezione) non
+        dipendono dal contratto: cambiano solo i giorni teorici spettacolo degli
+        anni dal primo passaggio a tempo indeterminato (vecchio o nuovo) in poi.
+        Per quegli anni si ricalcola il termine spettacolo conservato da
+        calcola() e si corregge il teorico della differenza.
 
+        Returns:
+            Lo stesso dizionario di calcola(), uguale a un calcolo da zero.
+        """
+        vecchio_inizio = self._inizio_ti
+        self.tempo_indeterminato_da = tempo_indeterminato_da
+        self._inizio_ti = self._risolvi_inizio_ti(tempo_indeterminato_da)
+        if self._termini_spettacolo is None:
+            return self.calcola()
+
+        # Prima di entrambi i passaggi il contratto e' determinato in tutti e due i casi
+        inizi = [inizio[0] for inizio in (vecchio_inizio, self._inizio_ti) if inizio is not None]
+        if not inizi:
+            return self._risultati()
+        primo_anno = min(inizi)
+        for anno, (maschera, gruppo) in self._termini_spettacolo.items():
+            if anno >= primo_anno:
+                self.teorico_per_anno[anno] += (
+                    self._teorico_spettacolo(anno, maschera, gruppo, self._inizio_ti)
+                    - self._teorico_spettacolo(anno, maschera, gruppo, vecchio_inizio))
+        return self._risultati()
+
+    def _risultati(self):
+        """Dizionario dei risultati (vedi calcola)"""
         return {
             "reale": dict(self.reale_per_anno),
             "teorico": dict(self.teorico_per_anno),
             "mesi": dict(self.mesi_per_anno),
             "anno_min": self.anno_min,
             "anno_max": self.anno_max,
+            "anno_proiezione": self.anno_proiezione,
             "sesso": self.sesso,
             "obiettivo_mesi": self.obiettivo_mesi,
             "obiettivo_label": self.obiettivo_label
@@ -79,31 +162,25 @@ class CalcolatoreContributi:
             if reale_per_anno > 312:
                 self.reale_per_anno[anno] = 312
 
-    def _parse_data(self, data_str):
-        """Converte stringa data in (anno, mese, giorno)"""
-        giorno, mese, anno = map(int, data_str.split('/'))
-        return anno, mese, giorno
-
-    def _conta_mesi(self, dal, al):
-        """Conta i mesi tra due date (arrotondato per eccesso)"""
-        y1, m1, _ = self._parse_data(dal)
-        y2, m2, _ = self._parse_data(al)
-        return (y2 - y1) * 12 + (m2 - m1) + 1
+    @staticmethod
+    def _conta_mesi(record):
+        """Conta i mesi del periodo di un record (arrotondato per eccesso)"""
+        return (record.anno_al - record.anno_dal) * 12 + (record.mese_al - record.mese_dal) + 1
 
     def _calcola_regime_generale(self):
         """Calcola contributi Regime Generale"""
-        for record in self.dati["regime_generale"]:
-            anno = self._parse_data(record["dal"])[0]
-            settimane = record["settimane"]
+        for record in self.regime_generale:
+            anno = record.anno_dal
+            settimane = record.settimane
 
             # REALE: settimane * 6
             giorni_reali = settimane * 6
             self.reale_per_anno[anno] += giorni_reali
 
             # TEORICO: mesi * 26 (escludi record con note "3" o O")
-            nota = record.get("note", "")
+            nota = record.note
             if nota not in ("3", "O"):
-                mesi = self._conta_mesi(record["dal"], record["al"])
+                mesi = self._conta_mesi(record)
                 giorni_teorici = mesi * 26
                 self.teorico_per_anno[anno] += giorni_teorici
                 self.mesi_per_anno[anno] += mesi
@@ -115,24 +192,14 @@ class CalcolatoreContributi:
 
         I record del regime generale con note '3' o '0' (disoccupazione)
         generano mesi che vanno sottratti dal calcolo teorico spettacolo.
+        Restituisce una maschera di mesi per anno.
         """
-        mesi_esclusi = defaultdict(set)
-        for record in self.dati["regime_generale"]:
-            nota = record.get("note", "")
-            if nota in ("3", "O"):
-                anno_inizio, mese_inizio, _ = self._parse_data(record["dal"])
-                anno_fine, mese_fine, _ = self._parse_data(record["al"])
-                if anno_inizio == anno_fine:
-                    for m in range(mese_inizio, mese_fine + 1):
-                        mesi_esclusi[anno_inizio].add(m)
-                else:
-                    for m in range(mese_inizio, 13):
-                        mesi_esclusi[anno_inizio].add(m)
-                    for anno in range(anno_inizio + 1, anno_fine):
-                        for m in range(1, 13):
-                            mesi_esclusi[anno].add(m)
-                    for m in range(1, mese_fine + 1):
-                        mesi_esclusi[anno_fine].add(m)
+        mesi_esclusi = defaultdict(int)
+        for record in self.regime_generale:
+            if record.note in ("3", "O"):
+                for anno, maschera in mesi.per_anno(record.anno_dal, record.mese_dal,
+                                                    record.anno_al, record.mese_al):
+                    mesi_esclusi[anno] |= maschera
         return mesi_esclusi
 
     def _calcola_spettacolo(self):
@@ -141,16 +208,17 @@ class CalcolatoreContributi:
         self.mesi_esclusi = self._raccogli_mesi_esclusi()
         mesi_esclusi = self.mesi_esclusi
 
-        # Raccogli periodi per anno: con gruppo e senza gruppo separatamente
-        periodi_con_gruppo = defaultdict(list)  # anno -> [(mese_inizio, mese_fine, gruppo)]
-        periodi_senza_gruppo = defaultdict(list)  # anno -> [(mese_inizio, mese_fine, giorni)]
+        # Raccogli i mesi coperti per anno: con gruppo e senza gruppo separatamente
+        mesi_con_gruppo = defaultdict(int)  # anno -> maschera dei mesi
+        gruppo_per_anno = {}  # anno -> gruppo dell'ultimo periodo dell'anno
+        mesi_senza_gruppo = defaultdict(int)  # anno -> maschera dei mesi
         giorni_senza_gruppo_per_anno = defaultdict(int)  # anno -> giorni totali (per record senza gruppo)
 
-        for record in self.dati["spettacolo"]:
-            anno_inizio, mese_inizio, _ = self._parse_data(record["dal"])
-            anno_fine, mese_fine, _ = self._parse_data(record["al"])
-            giorni = record.get("giorni")
-            gruppo = record.get("gruppo")
+        for record in self.spettacolo:
+            anno_inizio, mese_inizio = record.anno_dal, record.mese_dal
+            anno_fine, mese_fine = record.anno_al, record.mese_al
+            giorni = record.giorni
+            gruppo = record.gruppo
 
             # REALE: somma tutti i giorni (inclusi malattia, maternita', ecc.)
             if giorni:
@@ -159,13 +227,13 @@ class CalcolatoreContributi:
             if gruppo:
                 # Record CON gruppo: calcola in base alle regole spettacolo
                 if anno_inizio == anno_fine:
-                    periodi_con_gruppo[anno_inizio].append((mese_inizio, mese_fine, gruppo))
+                    mesi_con_gruppo[anno_inizio] |= mesi.intervallo(mese_inizio, mese_fine)
+                    gruppo_per_anno[anno_inizio] = gruppo
                 else:
                     # Periodo che attraversa anni: spezza per anno
-                    periodi_con_gruppo[anno_inizio].append((mese_inizio, 12, gruppo))
-                    for anno in range(anno_inizio + 1, anno_fine):
-                        periodi_con_gruppo[anno].append((1, 12, gruppo))
-                    periodi_con_gruppo[anno_fine].append((1, mese_fine, gruppo))
+                    for anno, maschera in mesi.per_anno(anno_inizio, mese_inizio, anno_fine, mese_fine):
+                        mesi_con_gruppo[anno] |= maschera
+                        gruppo_per_anno[anno] = gruppo
 
                 self.ultimo_regime = "spettacolo"
                 self.ultimo_gruppo = gruppo
@@ -173,125 +241,101 @@ class CalcolatoreContributi:
             elif giorni:
                 # Record SENZA gruppo (es. Servizio Militare): raccogli periodi
                 if anno_inizio == anno_fine:
-                    periodi_senza_gruppo[anno_inizio].append((mese_inizio, mese_fine))
+                    mesi_senza_gruppo[anno_inizio] |= mesi.intervallo(mese_inizio, mese_fine)
                     giorni_senza_gruppo_per_anno[anno_inizio] += giorni
                 else:
                     # Periodo che attraversa anni: spezza per anno
-                    periodi_senza_gruppo[anno_inizio].append((mese_inizio, 12))
-                    periodi_senza_gruppo[anno_fine].append((1, mese_fine))
+                    mesi_senza_gruppo[anno_inizio] |= mesi.intervallo(mese_inizio, 12)
+                    mesi_senza_gruppo[anno_fine] |= mesi.intervallo(1, mese_fine)
                     # Dividi giorni proporzionalmente (semplificato: tutto al primo anno)
                     giorni_senza_gruppo_per_anno[anno_inizio] += giorni
 
         # Calcola TEORICO per record CON gruppo (regole spettacolo)
-        for anno, periodi in periodi_con_gruppo.items():
-            # Unifica i mesi coperti (evita duplicati)
-            mesi_coperti = set()
-            gruppo_anno = None
-            for mese_inizio, mese_fine, gruppo in periodi:
-                for m in range(mese_inizio, mese_fine + 1):
-                    mesi_coperti.add(m)
-                gruppo_anno = gruppo
-
+        for anno, mesi_coperti in mesi_con_gruppo.items():
             # Unifica anche con eventuali periodi senza gruppo dello stesso anno
-            if anno in periodi_senza_gruppo:
-                for mese_inizio, mese_fine in periodi_senza_gruppo[anno]:
-                    for m in range(mese_inizio, mese_fine + 1):
-                        mesi_coperti.add(m)
-                # Rimuovi da periodi_senza_gruppo perche' gia' conteggiato
-                del periodi_senza_gruppo[anno]
+            # (e li rimuove, perche' gia' conteggiati)
+            mesi_coperti |= mesi_senza_gruppo.pop(anno, 0)
 
             # Sottrai mesi esclusi per disoccupazione (note "3"/O")
-            mesi_coperti -= mesi_esclusi.get(anno, set())
+            mesi_coperti &= ~mesi_esclusi.get(anno, 0)
 
-            mesi = len(mesi_coperti)
-            if mesi > 0 and gruppo_anno:
-                giorni_teorici = self._calcola_teorico_spettacolo_con_mesi(anno, mesi_coperti, gruppo_anno)
+            num_mesi = mesi.conta(mesi_coperti)
+            if num_mesi > 0:
+                giorni_teorici = self._calcola_teorico_spettacolo_con_mesi(
+                    anno, mesi_coperti, gruppo_per_anno[anno])
+                self._termini_spettacolo[anno] = (mesi_coperti, gruppo_per_anno[anno])
                 self.teorico_per_anno[anno] += giorni_teorici
-                self.mesi_per_anno[anno] += mesi
+                self.mesi_per_anno[anno] += num_mesi
 
         # Calcola TEORICO per record SENZA gruppo rimasti (non sovrapposti con gruppo)
         # Es. Servizio Militare: giorni reali = giorni teorici
-        for anno, periodi in periodi_senza_gruppo.items():
-            mesi_coperti = set()
-            for mese_inizio, mese_fine in periodi:
-                for m in range(mese_inizio, mese_fine + 1):
-                    mesi_coperti.add(m)
-
-            mesi = len(mesi_coperti)
-            if mesi > 0:
+        for anno, mesi_coperti in mesi_senza_gruppo.items():
+            num_mesi = mesi.conta(mesi_coperti)
+            if num_mesi > 0:
                 # Usa i giorni reali come teorici
                 self.teorico_per_anno[anno] += giorni_senza_gruppo_per_anno[anno]
-                self.mesi_per_anno[anno] += mesi
-
-    def _conta_mesi_per_contratto(self, anno, mesi_coperti):
-        """
-        Conta quanti mesi sono a tempo determinato e quanti a tempo indeterminato.
-        Restituisce (mesi_determinato, mesi_indeterminato).
+                self.mesi_per_anno[anno] += num_mesi
+
+    @staticmethod
+    def _risolvi_inizio_ti(tempo_indeterminato_da):
+        """(anno, mese) da cui il contratto e' a tempo indeterminato, o None se mai"""
+        if tempo_indeterminato_da is None:
+            return None
+        if tempo_indeterminato_da == "sempre":
+            return (0, 0)
+        _, mese, anno = map(int, tempo_indeterminato_da.split('/'))
+        return (anno, mese)
+
+    def _tariffe_anno(self, anno, gruppo, inizio_ti):
         """
-        if self.tempo_indeterminato_da is None:
-            return len(mesi_coperti), 0  # Tutti tempo determinato
-        if self.tempo_indeterminato_da == "sempre":
-            return 0, len(mesi_coperti)  # Tutti tempo indeterminato
+        Tariffe spettacolo di un anno: lista di (maschera dei mesi, giorni/anno).
 
-        # Trova il mese di passaggio a tempo indeterminato
-        _, m_ti, a_ti = map(int, self.tempo_indeterminato_da.split('/'))
-
-        if anno < a_ti:
-            return len(mesi_coperti), 0  # Tutto tempo determinato
-        if anno > a_ti:
-            return 0, len(mesi_coperti)  # Tutto tempo indeterminato
-
-        # anno == a_ti: conta i mesi prima e dopo la data
-        mesi_det = len([m for m in mesi_coperti if m < m_ti])
-        mesi_indet = len([m for m in mesi_coperti if m >= m_ti])
-        return mesi_det, mesi_indet
+        Per ogni mese si sceglie l'era di ERE_SPETTACOLO in vigore e il tipo di
+        contratto (tempo indeterminato da inizio_ti, vedi _risolvi_inizio_ti); i
+        mesi con la stessa tariffa sono raccolti in una maschera. Il risultato e'
+        memorizzato per (anno, gruppo 1 o altro, inizio_ti).
+        """
+        chiave = (anno, gruppo == 1, inizio_ti)
+        tariffe = self._tariffe.get(chiave)
+        if tariffe is not None:
+            return tariffe
+
+        per_tariffa = {}
+        for mese in range(1, 13):
+            era = None
+            for voce in ERE_SPETTACOLO:
+                if (anno, mese) >= voce[0]:
+                    era = voce
+            _, giorni_gruppo1, giorni_altri, giorni_indet = era
+            giorni = giorni_gruppo1 if gruppo == 1 else giorni_altri
+            if giorni_indet is not None and inizio_ti is not None and (anno, mese) >= inizio_ti:
+                giorni = giorni_indet
+            per_tariffa[giorni] = per_tariffa.get(giorni, 0) | mesi.intervallo(mese, mese)
+
+        tariffe = [(maschera, giorni) for giorni, maschera in per_tariffa.items()]
+        self._tariffe[chiave] = tariffe
+        return tariffe
 
     def _calcola_teorico_spettacolo_con_mesi(self, anno, mesi_coperti, gruppo):
         """
-        Calcola giorni teorici per Spettacolo considerando i mesi effettivi.
+        Calcola giorni teorici per Spettacolo considerando i mesi effettivi
+        (mesi_coperti: maschera di mesi, vedi mesi.py).
 
-        Regole:
+        Ogni mese vale 1/12 della tariffa annua della sua era (ERE_SPETTACOLO):
         - Fino al 1992: Gruppo 1 = 60 gg/anno, Gruppo 2 = 180 gg/anno
         - 1993 - luglio 1997: Gruppo 1 = 120 gg/anno, Gruppo 2 = 260 gg/anno
         - Dal 1 agosto 1997 in poi:
           - Tempo determinato: Gruppo 1 = 120 gg/anno, Gruppo 2 = 260 gg/anno
           - Tempo indeterminato: sempre 312 gg/anno (indipendente dal gruppo)
         """
-        giorni_det = 120 if gruppo == 1 else 260  # Giorni/anno tempo determinato
-        giorni_indet = 312  # Giorni/anno tempo indeterminato
-
-        if anno <= 1992:
-            giorni_anno = 60 if gruppo == 1 else 180
-            return round((giorni_anno / 12) * len(mesi_coperti))
-
-        if anno >= 1993 and anno < 1997:
-            return round((giorni_det / 12) * len(mesi_coperti))
-
-        if anno == 1997:
-            # Anno di transizione: Gen-Lug regole vecchie, Ago-Dic nuove regole
-            mesi_prima_agosto = [m for m in mesi_coperti if m <= 7]
-            mesi_da_agosto = [m for m in mesi_coperti if m >= 8]
+        return self._teorico_spettacolo(anno, mesi_coperti, gruppo, self._inizio_ti)
 
-            # Prima di agosto: sempre regole 1993-1997 (tempo determinato)
-            totale_prima = (giorni_det / 12) * len(mesi_prima_agosto)
-
-            # Da agosto: dipende dal tipo contratto
-            mesi_det, mesi_indet = self._conta_mesi_per_contratto(anno, mesi_da_agosto)
-            totale_dopo = (giorni_det / 12) * mesi_det + (giorni_indet / 12) * mesi_indet
-
-            return round(totale_prima + totale_dopo)
-
-        # anno >= 1998: calcola direttamente senza iterare
-        mesi_det, mesi_indet = self._conta_mesi_per_contratto(anno, mesi_coperti)
-        return round((giorni_det / 12) * mesi_det + (giorni_indet / 12) * mesi_indet)
-
-    def _calcola_teorico_spettacolo(self, anno, mese_inizio, mesi, gruppo):
-        """
-        Versione per estensione anni futuri.
-        Usa le regole post-1997 con gestione tempo indeterminato.
-        """
-        mesi_coperti = set(range(mese_inizio, mese_inizio + mesi))
-        return self._calcola_teorico_spettacolo_con_mesi(anno, mesi_coperti, gruppo)
+    def _teorico_spettacolo(self, anno, mesi_coperti, gruppo, inizio_ti):
+        """Giorni teorici spettacolo con un inizio del tempo indeterminato qualsiasi"""
+        totale = 0
+        for maschera, giorni_anno in self._tariffe_anno(anno, gruppo, inizio_ti):
+            totale += giorni_anno * mesi.conta(mesi_coperti & maschera)
+        return round(totale / 12)
 
     def _determina_range_anni(self):
         """Determina anno minimo e massimo dai dati"""
@@ -301,38 +345,37 @@ class CalcolatoreContributi:
             self.anno_max = max(tutti_anni)
 
     def _estendi_a_obiettivo(self):
-        """Estende il calcolo fino a raggiungere l'obiettivo contributivo (basato sul sesso)"""
-        # Prima: completa l'ultimo anno lavorato a 12 mesi
-        self._completa_ultimo_anno()
-
+        """Estende il calcolo fino a raggiungere l'obiettivo contributivo (basato sul sesso),
+        dopo il completamento dell'ultimo anno lavorato (_completa_ultimo_anno)"""
         # Calcola mesi gia' accumulati
         mesi_accumulati = sum(self.mesi_per_anno.values())
 
         if mesi_accumulati >= self.obiettivo_mesi:
             return  # Gia' raggiunto obiettivo
 
-        mesi_mancanti = self.obiettivo_mesi - mesi_accumulati
-        anno_corrente = self.anno_max + 1
-
-        while mesi_mancanti > 0:
-            mesi_anno = min(12, mesi_mancanti)
-            self.mesi_per_anno[anno_corrente] = mesi_anno
-
-            # Calcola giorni teorici in base all'ultimo regime
-            if self.ultimo_regime == "generale":
-                giorni_teorici = mesi_anno * 26
-            else:  # spettacolo
-                giorni_teorici = self._calcola_teorico_spettacolo(
-                    anno_corrente, 1, mesi_anno, self.ultimo_gruppo or 2
-                )
-
-            self.teorico_per_anno[anno_corrente] = giorni_teorici
-            self.reale_per_anno[anno_corrente] = 0  # Nessun contributo reale
-
-            mesi_mancanti -= mesi_anno
-            anno_corrente += 1
-
-        self.anno_max = anno_corrente - 1
+        # Forma chiusa: anni interi da 12 mesi, piu' un anno con i mesi rimanenti
+        anni_pieni, resto = divmod(self.obiettivo_mesi - mesi_accumulati, 12)
+        anno_inizio = self.anno_max + 1
+        anni = range(anno_inizio, anno_inizio + anni_pieni + (1 if resto else 0))
+        mesi_estesi = dict.fromkeys(anni, 12)
+        if resto:
+            mesi_estesi[anni[-1]] = resto
+
+        # Giorni teorici in base all'ultimo regime
+        if self.ultimo_regime == "generale":
+            teorico_esteso = {anno: mesi_anno * 26 for anno, mesi_anno in mesi_estesi.items()}
+        else:  # spettacolo
+            gruppo = self.ultimo_gruppo or 2
+            termini = {anno: (mesi.intervallo(1, mesi_anno), gruppo) for anno, mesi_anno in mesi_estesi.items()}
+            teorico_esteso = {anno: self._calcola_teorico_spettacolo_con_mesi(anno, maschera, gruppo)
+                              for anno, (maschera, gruppo) in termini.items()}
+            self._termini_spettacolo.update(termini)
+
+        self.mesi_per_anno.update(mesi_estesi)
+        self.teorico_per_anno.update(teorico_esteso)
+        self.reale_per_anno.update(dict.fromkeys(anni, 0))  # Nessun contributo reale
+        self.anno_max = anni[-1]
+        self.anno_proiezione = anno_inizio
 
     def _completa_ultimo_anno(self):
         """Completa l'ultimo anno lavorato a 12 mesi nel TEORICO,
@@ -342,7 +385,7 @@ class CalcolatoreContributi:
 
         mesi_ultimo_anno = self.mesi_per_anno.get(self.anno_max, 0)
         # max_mesi tiene conto dei mesi esclusi per disoccupazione
-        mesi_esclusi_count = len(self.mesi_esclusi.get(self.anno_max, set()))
+        mesi_esclusi_count = mesi.conta(self.mesi_esclusi.get(self.anno_max, 0))
         max_mesi = 12 - mesi_esclusi_count
         if mesi_ultimo_anno > 0 and mesi_ultimo_anno < max_mesi:
             # Completa al massimo possibile
@@ -351,10 +394,85 @@ class CalcolatoreContributi:
             # Ricalcola giorni teorici per l'anno completo
             if self.ultimo_regime == "generale":
                 self.teorico_per_anno[self.anno_max] = max_mesi * 26
+                self._termini_spettacolo.pop(self.anno_max, None)
             else:  # spettacolo
                 gruppo = self.ultimo_gruppo or 2
                 # Costruisci i mesi coperti escludendo quelli di disoccupazione
-                mesi_coperti = set(range(1, 13)) - self.mesi_esclusi.get(self.anno_max, set())
+                mesi_coperti = mesi.ANNO_INTERO & ~self.mesi_esclusi.get(self.anno_max, 0)
                 self.teorico_per_anno[self.anno_max] = self._calcola_teorico_spettacolo_con_mesi(
                     self.anno_max, mesi_coperti, gruppo
                 )
+                self._termini_spettacolo[self.anno_max] = (mesi_coperti, gruppo)
+
+    def indice(self):
+        """IndiceCumulativo dei risultati (dopo calcola())"""
+        return IndiceCumulativo({
+            "reale": self.reale_per_anno,
+            "teorico": self.teorico_per_anno,
+            "mesi": self.mesi_per_anno,
+            "anno_min": self.anno_min,
+            "anno_max": self.anno_max,
+            "anno_proiezione": self.anno_proiezione,
+        })
+
+    def anno_obiettivo(self):
+        """Anno in cui i mesi teorici cumulati raggiungono l'obiettivo (dopo calcola())"""
+        raggiungimento = self.indice().raggiungimento(self.obiettivo_mesi)
+        return raggiungimento[0] if raggiungimento else None
+
+    def scenari_tempo_indeterminato(self, date):
+        """
+        Totali per ogni possibile inizio del tempo indeterminato, in una sola passata.
+
+        La copertura dei mesi non dipende dal contratto: il calcolo completo
+        si fa una volta (con il tempo_indeterminato_da del calcolatore) e si
+        conservano i termini spettacolo di ogni anno (maschera dei mesi, gruppo).
+        Per una data di passaggio (anno A, mese M) gli anni prima di A valgono
+        come tempo determinato e quelli dopo A come sempre indeterminato, cioe'
+        somme cumulative calcolate una volta; solo l'anno A si ricalcola.
+
+        Args:
+            date: sequenza di None, "sempre" o "DD/MM/YYYY"
+
+        Returns:
+            Lista di dizionari, uno per data, con tempo_indeterminato_da,
+            totale_teorico, totale_mesi e anno_obiettivo.
+        """
+        if self._termini_spettacolo is None:
+            self.calcola()
+
+        anni = sorted(self._termini_spettacolo)
+        termini = [self._termini_spettacolo[anno] for anno in anni]
+        determinato = list(accumulate(
+            (self._teorico_spettacolo(anno, maschera, gruppo, None)
+             for anno, (maschera, gruppo) in zip(anni, termini)), initial=0))
+        indeterminato = list(accumulate(
+            (self._teorico_spettacolo(anno, maschera, gruppo, (0, 0))
+             for anno, (maschera, gruppo) in zip(anni, termini)), initial=0))
+        # Parte del teorico che non dipende dal contratto (Regime Generale, senza gruppo)
+        attuale = sum(self._teorico_spettacolo(anno, maschera, gruppo, self._inizio_ti)
+                      for anno, (maschera, gruppo) in zip(anni, termini))
+        fisso = sum(self.teorico_per_anno.values()) - attuale
+
+        totale_mesi = sum(self.mesi_per_anno.values())
+        anno_obiettivo = self.anno_obiettivo()
+
+        righe = []
+        for data in date:
+            inizio_ti = self._risolvi_inizio_ti(data)
+            if inizio_ti is None:
+                spettacolo = determinato[-1]
+            else:
+                prima = bisect_left(anni, inizio_ti[0])
+                dopo = bisect_right(anni, inizio_ti[0])
+                spettacolo = determinato[prima] + indeterminato[-1] - indeterminato[dopo]
+                if prima < dopo:  # Anno del passaggio
+                    maschera, gruppo = termini[prima]
+                    spettacolo += self._teorico_spettacolo(anni[prima], maschera, gruppo, inizio_ti)
+            righe.append({
+                "tempo_indeterminato_da": data,
+                "totale_teorico": fisso + spettacolo,
+                "totale_mesi": totale_mesi,
+                "anno_obiettivo": anno_obiettivo,
+            })
+        return righe
@@ -3,11 +3,120 @@ Interfaccia linea di comando per calcolo contributi INPS
 """
 
 import argparse
+import json
 import sys
 import os
 import re
+from datetime import date
 
-from .core import elabora_pdf
+# core (e con esso pdfplumber/openpyxl) viene importato solo dopo il parsing
+# degli argomenti: --help e gli errori di sintassi restano immediati
+
+
+def _e_cartella(sorgente):
+    """True se la sorgente e' una cartella o un pattern glob invece di un singolo PDF"""
+    return os.path.isdir(sorgente) or any(c in sorgente for c in "*?[")
+
+
+def _esegui_cartella(sorgente, tempo_indeterminato_da, workers, usa_cache, cartella_cache, basso_consumo,
+                     backend, modelli_layout):
+    """Elabora tutti i PDF della sorgente e stampa una riga per file"""
+    from .core import elabora_cartella
+
+    print("=" * 60)
+    print("CALCOLO CONTRIBUTI PREVIDENZIALI INPS - ELABORAZIONE CARTELLA")
+    print("=" * 60)
+
+    elaborati = 0
+    errori = 0
+    for risultato in elabora_cartella(sorgente, workers=workers,
+                                      tempo_indeterminato_da=tempo_indeterminato_da,
+                                      salva_json=True, usa_cache=usa_cache,
+                                      cartella_cache=cartella_cache,
+                                      basso_consumo=basso_consumo, backend=backend,
+                                      modelli_layout=modelli_layout):
+        if "errore" in risultato:
+            errori += 1
+            print(f"ERRORE  {risultato['pdf_path']}: {risultato['errore']}")
+        else:
+            elaborati += 1
+            print(f"OK      {risultato['pdf_path']} -> {risultato['excel_path']} ({risultato['totale_label']})")
+
+    print("=" * 60)
+    print(f"Elaborati: {elaborati}   Errori: {errori}")
+    print("=" * 60)
+
+    if elaborati + errori == 0:
+        print(f"Errore: Nessun PDF trovato in: {sorgente}")
+        sys.exit(1)
+    if errori:
+        sys.exit(1)
+
+
+def _esegui_sonda(sorgente, workers):
+    """Stampa una riga JSON per PDF con l'intestazione letta dalla pagina 0"""
+    from .core import sonda_cartella
+
+    trovati = 0
+    for info in sonda_cartella(sorgente, workers=workers):
+        trovati += 1
+        print(json.dumps(info, ensure_ascii=False))
+
+    if trovati == 0:
+        print(f"Errore: Nessun PDF trovato in: {sorgente}", file=sys.stderr)
+        sys.exit(1)
+
+
+def _esegui_scenari(pdf_path, intervallo, workers, usa_cache, cartella_cache, basso_consumo, backend,
+                    modelli_layout):
+    """Stampa i totali per ogni mese di passaggio a tempo indeterminato nell'intervallo di anni"""
+    from .core import scenari_pdf
+
+    anno_inizio, anno_fine = intervallo
+    date = [None, "sempre"] + [f"01/{mese:02d}/{anno}"
+                               for anno in range(anno_inizio, anno_fine + 1) for mese in range(1, 13)]
+    righe = scenari_pdf(pdf_path, date, workers=workers, usa_cache=usa_cache, cartella_cache=cartella_cache,
+                        basso_consumo=basso_consumo, backend=backend, modelli_layout=modelli_layout)
+
+    print(f"{'Tempo indet. da':<16} {'Giorni teorici':>14} {'Mesi':>6} {'Obiettivo':>10}")
+    for riga in righe:
+        etichetta = riga["tempo_indeterminato_da"] or "mai"
+        print(f"{etichetta:<16} {riga['totale_teorico']:>14} {riga['totale_mesi']:>6} "
+              f"{riga['anno_obiettivo'] or '-':>10}")
+
+
+def _esegui_calcolo_json(sorgente, tempo_indeterminato_da, workers, output):
+    """Ricalcola dai JSON dei dati estratti e scrive una riga JSON per persona"""
+    from .core import calcola_archivio
+
+    calcolati = 0
+    errori = 0
+    destinazione = open(output, "w", encoding="utf-8") if output else sys.stdout
+    try:
+        for risultato in calcola_archivio(sorgente, workers=workers, tempo_indeterminato_da=tempo_indeterminato_da):
+            destinazione.write(json.dumps(risultato, ensure_ascii=False) + "\n")
+            if "errore" in risultato:
+                errori += 1
+            else:
+                calcolati += 1
+    finally:
+        if output:
+            destinazione.close()
+
+    print(f"Calcolati: {calcolati}   Errori: {errori}", file=sys.stderr)
+    if calcolati + errori == 0:
+        print(f"Errore: Nessun dato trovato in: {sorgente}", file=sys.stderr)
+        sys.exit(1)
+    if errori:
+        sys.exit(1)
+
+
+def _intervallo_anni(testo):
+    """Converte "AAAA-AAAA" in (anno_inizio, anno_fine)"""
+    m = re.fullmatch(r'(\d{4})-(\d{4})', testo)
+    if not m or int(m.group(1)) > int(m.group(2)):
+        raise argparse.ArgumentTypeError(f"intervallo di anni non valido: {testo} (formato AAAA-AAAA)")
+    return int(m.group(1)), int(m.group(2))
 
 
 def main():
@@ -21,12 +130,48 @@ Esempio:
     python -m previdenza certificazione.pdf                    # Tempo determinato
     python -m previdenza certificazione.pdf -ti                # Sempre tempo indeterminato
     python -m previdenza certificazione.pdf -ti 01/08/1997     # Tempo indeterminato dal 1/8/1997
+    python -m previdenza certificazione.pdf -j 8               # Estrazione su 8 processi
+    python -m previdenza archivio/                             # Tutti i PDF della cartella
+    python -m previdenza "archivio/2024_*.pdf" -j 16           # Pattern glob su 16 processi
+    python -m previdenza --sonda archivio/                     # Solo intestazione, una riga JSON per PDF
+    python -m previdenza certificazione.pdf --backend pdfium   # Lettura veloce con pypdfium2
+    python -m previdenza certificazione.pdf --scenari-ti 1997-2025  # Totali per ogni mese di passaggio a TI
+    python -m previdenza --calcola-json archivio.jsonl -o risultati.jsonl  # Ricalcolo dai JSON, senza PDF
         """
     )
-    parser.add_argument("pdf", help="Percorso del file PDF INPS")
+    parser.add_argument("pdf", help="Percorso del file PDF INPS, di una cartella o pattern glob "
+                                    "(con --calcola-json: file JSONL, file JSON o cartella di JSON)")
     parser.add_argument("-ti", "--tempo-indeterminato", nargs="?", const="sempre",
                         metavar="DD/MM/YYYY",
                         help="Tempo indeterminato: senza data = sempre, con data = da quella data")
+    parser.add_argument("-j", "--workers", nargs="?", type=int, const=os.cpu_count() or 1, default=None,
+                        metavar="N",
+                        help="Processi paralleli (pagine di un PDF, o file di una cartella): "
+                             "senza numero = tutti i core")
+    parser.add_argument("--cache-dir", metavar="CARTELLA",
+                        help="Cartella della cache dei dati estratti (default: cache dell'utente)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Non usare la cache: rilegge sempre il PDF")
+    parser.add_argument("--sonda", action="store_true",
+                        help="Legge solo l'intestazione (codice fiscale, nome, sesso, pagine, tipo) "
+                             "e stampa una riga JSON per PDF, senza calcoli")
+    parser.add_argument("--basso-consumo", action="store_true",
+                        help="Libera ogni pagina appena elaborata: memoria indipendente dal numero di pagine")
+    parser.add_argument("--backend", choices=("pdfplumber", "pdfium", "parole"), default="pdfplumber",
+                        help="Lettura del PDF: pdfplumber (predefinito), pdfium (piu' veloce) "
+                             "o parole (righe ricostruite dalle parole, senza extract_tables)")
+    parser.add_argument("--modelli-layout", action="store_true",
+                        help="Con il backend pdfplumber riusa i bordi di colonna gia' appresi per ogni "
+                             "layout di pagina (file modelli.layout nella cartella della cache)")
+    parser.add_argument("--scenari-ti", nargs="?", type=_intervallo_anni,
+                        const=(1997, date.today().year), metavar="AAAA-AAAA",
+                        help="Totali per ogni mese di passaggio a tempo indeterminato nell'intervallo "
+                             "(default: dal 1997 a oggi), senza generare file")
+    parser.add_argument("--calcola-json", action="store_true",
+                        help="Ricalcola dai dati gia' estratti (JSON scritti dalla CLI o JSONL, una persona "
+                             "per riga) su piu' processi, senza leggere PDF: una riga JSON per persona")
+    parser.add_argument("-o", "--output", metavar="FILE",
+                        help="Con --calcola-json: file dei risultati (default: standard output)")
 
     args = parser.parse_args()
 
@@ -42,6 +187,42 @@ Esempio:
                 sys.exit(1)
             tempo_indeterminato_da = args.tempo_indeterminato
 
+    if args.workers is not None and args.workers < 1:
+        print(f"Errore: Numero di processi non valido: {args.workers}")
+        sys.exit(1)
+
+    if args.sonda:
+        _esegui_sonda(args.pdf, args.workers)
+        return
+
+    if args.calcola_json:
+        if not os.path.exists(args.pdf):
+            print(f"Errore: File non trovato: {args.pdf}", file=sys.stderr)
+            sys.exit(1)
+        _esegui_calcolo_json(args.pdf, tempo_indeterminato_da, args.workers, args.output)
+        return
+
+    if args.scenari_ti:
+        if args.tempo_indeterminato:
+            print("Errore: --scenari-ti calcola gia' ogni data di passaggio a tempo indeterminato: "
+                  "non usare anche -ti")
+            sys.exit(1)
+        if _e_cartella(args.pdf):
+            print(f"Errore: --scenari-ti richiede un singolo PDF, non una cartella o un pattern: {args.pdf}")
+            sys.exit(1)
+        if not os.path.exists(args.pdf):
+            print(f"Errore: File non trovato: {args.pdf}")
+            sys.exit(1)
+        _esegui_scenari(args.pdf, args.scenari_ti, args.workers or 1, not args.no_cache, args.cache_dir,
+                        args.basso_consumo, args.backend, args.modelli_layout)
+        return
+
+    if _e_cartella(args.pdf):
+        _esegui_cartella(args.pdf, tempo_indeterminato_da, args.workers,
+                         not args.no_cache, args.cache_dir, args.basso_consumo, args.backend,
+                         args.modelli_layout)
+        return
+
     # Verifica esistenza PDF
     if not os.path.exists(args.pdf):
         print(f"Errore: File non trovato: {args.pdf}")
@@ -51,8 +232,13 @@ Esempio:
     print("CALCOLO CONTRIBUTI PREVIDENZIALI INPS")
     print("=" * 60)
 
+    from .core import elabora_pdf
+
     try:
-        risultato = elabora_pdf(args.pdf, tempo_indeterminato_da, salva_json=True)
+        risultato = elabora_pdf(args.pdf, tempo_indeterminato_da, salva_json=True,
+                                workers=args.workers or 1, usa_cache=not args.no_cache,
+                                cartella_cache=args.cache_dir, basso_consumo=args.basso_consumo,
+                                backend=args.backend, modelli_layout=args.modelli_layout)
 
         print("\n" + "=" * 60)
         print("RIEPILOGO")
@@ -62,11 +248,17 @@ Esempio:
         print(f"Codice Fiscale:      {risultato['codice_fiscale']}")
         print(f"Sesso:               {risultato['sesso_label']}")
         print(f"Obiettivo:           {risultato['obiettivo_label']}")
+        if risultato['pagine'] is not None:
+            print(f"Pagine PDF:          {risultato['pagine']} ({risultato['pagine_saltate']} senza tabelle)")
+        if risultato['memoria_picco_mb'] is not None:
+            print(f"Memoria di picco:    {risultato['memoria_picco_mb']} MB")
         num_anni = risultato['anno_max'] - risultato['anno_min'] + 1 if risultato['anno_min'] else 0
         print(f"Anni elaborati:      {num_anni} ({risultato['anno_min']} - {risultato['anno_max']})")
         print(f"Totale giorni REALI: {risultato['totale_reale']}")
         print(f"Totale giorni TEORICI: {risultato['totale_teorico']}")
         print(f"Totale mesi teorici: {risultato['totale_mesi']} ({risultato['totale_label']})")
+        if risultato['obiettivo_raggiunto']:
+            print(f"Obiettivo raggiunto: {risultato['obiettivo_raggiunto']}")
         print(f"\nFile generati:")
         print(f"  - {risultato['json_path']}")
         print(f"  - {risultato['excel_path']}")
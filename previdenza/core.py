@@ -3,14 +3,90 @@ Orchestrazione elaborazione PDF INPS
 """
 
 import os
+import glob
 import json
+from collections import deque
 
-from .estrattore import EstrattorePDF
+from .cache import CacheEstrazioni, CacheLayout, CacheRisultati
 from .calcolatore import CalcolatoreContributi, decodifica_sesso_da_cf
-from .generatore import GeneratoreExcel
+from .indice import IndiceCumulativo, etichetta_mesi
 
+# estrattore (pdfplumber), generatore (openpyxl) e il pool di processi sono
+# importati solo quando servono: l'import di core resta leggero per la CLI
+# e per i calcoli su dati gia' estratti
 
-def elabora_pdf(pdf_path, tempo_indeterminato_da=None, salva_json=False):
+# Risultati di calcolo gia' ottenuti in questo processo (vedi calcola_dati)
+CACHE_RISULTATI = CacheRisultati()
+
+
+def calcola_dati(dati, sesso=None, tempo_indeterminato_da=None, usa_cache=True):
+    """
+    Calcola i contributi da dati gia' estratti, senza leggere PDF ne' scrivere file.
+
+    Con la cache attiva lo stesso calcolo (stessi record, sesso e
+    tempo_indeterminato_da) viene rifatto una volta sola per processo:
+    vedi CACHE_RISULTATI (statistiche() per successi e mancati).
+
+    Returns:
+        Il dizionario di CalcolatoreContributi.calcola().
+    """
+    if not usa_cache:
+        return CalcolatoreContributi(dati, sesso=sesso, tempo_indeterminato_da=tempo_indeterminato_da).calcola()
+
+    chiave = CACHE_RISULTATI.chiave(dati, sesso, tempo_indeterminato_da)
+    risultati = CACHE_RISULTATI.leggi(chiave)
+    if risultati is None:
+        risultati = CalcolatoreContributi(dati, sesso=sesso, tempo_indeterminato_da=tempo_indeterminato_da).calcola()
+        CACHE_RISULTATI.scrivi(chiave, risultati)
+    return risultati
+
+
+def estrai_dati(pdf_path, workers=1, usa_cache=True, cartella_cache=None, basso_consumo=False,
+                backend="pdfplumber", modelli_layout=False):
+    """
+    Estrae i dati dal PDF passando per la cache su disco.
+
+    Con la cache attiva un PDF gia' elaborato (stesso contenuto, stessa
+    versione dell'estrattore, stesso backend) non viene riletto. Con
+    modelli_layout=True i PDF nuovi riusano i modelli di layout (bordi di
+    colonna) gia' appresi nella cartella della cache.
+    """
+    return _estrai(pdf_path, workers, usa_cache, cartella_cache, basso_consumo, backend, modelli_layout)[0]
+
+
+def _estrai(pdf_path, workers, usa_cache, cartella_cache, basso_consumo, backend, modelli_layout):
+    """Come estrai_dati; restituisce anche il picco di memoria dell'estrazione (None se i dati vengono dalla cache)"""
+    from .estrattore import EstrattorePDF
+
+    modelli = CacheLayout(cartella_cache) if modelli_layout else None
+    if not usa_cache:
+        estrattore = EstrattorePDF(pdf_path, workers=workers, basso_consumo=basso_consumo, backend=backend,
+                                   modelli_layout=modelli)
+        return estrattore.estrai(), estrattore.memoria_picco_mb
+
+    cache = CacheEstrazioni(cartella_cache)
+    # I dati letti con i modelli di layout non prendono il posto di quelli letti dal disegno
+    versione = f"{EstrattorePDF.VERSIONE}/{backend}" + ("/modelli" if modelli_layout else "")
+    chiave = cache.chiave(pdf_path, versione)
+    dati = cache.leggi(chiave)
+    if dati is not None:
+        # Lo stesso contenuto puo' trovarsi in un file diverso
+        dati["metadata"]["file"] = pdf_path
+        return dati, None
+
+    estrattore = EstrattorePDF(pdf_path, workers=workers, basso_consumo=basso_consumo, backend=backend,
+                               modelli_layout=modelli)
+    dati = estrattore.estrai()
+    try:
+        cache.scrivi(chiave, dati)
+    except OSError:
+        pass  # Cache non scrivibile: si prosegue senza
+    return dati, estrattore.memoria_picco_mb
+
+
+def elabora_pdf(pdf_path, tempo_indeterminato_da=None, salva_json=False, workers=1,
+                usa_cache=True, cartella_cache=None, basso_consumo=False, backend="pdfplumber",
+                modelli_layout=False):
     """
     Elabora un PDF INPS e genera i file di output.
     I file vengono salvati nella STESSA cartella del PDF di input.
@@ -19,24 +95,48 @@ def elabora_pdf(pdf_path, tempo_indeterminato_da=None, salva_json=False):
         pdf_path: Percorso del file PDF INPS
         tempo_indeterminato_da: None, "sempre", o "DD/MM/YYYY"
         salva_json: Se True, salva anche il file JSON (default: False)
+        workers: Processi per l'estrazione parallela delle pagine (default: 1)
+        usa_cache: Se True, riusa i dati gia' estratti dallo stesso PDF e i risultati
+            gia' calcolati in questo processo (default: True)
+        cartella_cache: Cartella della cache (default: cartella cache dell'utente)
+        basso_consumo: Se True, libera ogni pagina appena elaborata (default: False)
+        backend: Lettura del PDF, "pdfplumber", "pdfium" o "parole" (vedi backend.py) (default: "pdfplumber")
+        modelli_layout: Se True, riusa i bordi di colonna appresi nella cartella della cache
+            (solo pdfplumber, default: False)
 
     Returns:
-        Dizionario con i risultati e i path dei file generati.
+        Dizionario con i risultati e i path dei file generati. memoria_picco_mb
+        e' None se i dati vengono dalla cache (nessuna estrazione in questa esecuzione).
     """
-    # Output nella stessa cartella del PDF
-    output_dir = os.path.dirname(os.path.abspath(pdf_path))
-
     # 1. Estrazione PDF
-    estrattore = EstrattorePDF(pdf_path)
-    dati = estrattore.estrai()
+    dati, memoria_picco_mb = _estrai(pdf_path, workers, usa_cache, cartella_cache, basso_consumo, backend,
+                                     modelli_layout)
 
     # Decodifica sesso dal codice fiscale
-    codice_fiscale = dati["metadata"].get("codice_fiscale")
-    cognome = dati["metadata"].get("cognome")
-    nome = dati["metadata"].get("nome")
-    sesso = decodifica_sesso_da_cf(codice_fiscale)
+    sesso = decodifica_sesso_da_cf(dati["metadata"].get("codice_fiscale"))
+
+    # 2. Salvataggio JSON (solo se richiesto)
+    if salva_json:
+        _, json_path, _ = _percorsi_output(pdf_path, dati["metadata"])
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(dati, f, indent=2, ensure_ascii=False)
+
+    # 3. Calcolo contributi
+    risultati = calcola_dati(dati, sesso=sesso, tempo_indeterminato_da=tempo_indeterminato_da,
+                             usa_cache=usa_cache)
+
+    # 4. Generazione Excel
+    return scrivi_risultati(pdf_path, dati, sesso, risultati, memoria_picco_mb)
+
+
+def _percorsi_output(pdf_path, metadata):
+    """Cartella di output (quella del PDF) e percorsi di JSON ed Excel"""
+    output_dir = os.path.dirname(os.path.abspath(pdf_path))
 
     # Nome file basato su Cognome Nome, fallback a codice fiscale
+    cognome = metadata.get("cognome")
+    nome = metadata.get("nome")
+    codice_fiscale = metadata.get("codice_fiscale")
     if cognome and nome:
         nome_file = f"{cognome} {nome}"
     elif codice_fiscale:
@@ -44,39 +144,339 @@ def elabora_pdf(pdf_path, tempo_indeterminato_da=None, salva_json=False):
     else:
         nome_file = os.path.splitext(os.path.basename(pdf_path))[0]
 
-    json_path = os.path.join(output_dir, f"{nome_file}.json")
-    excel_path = os.path.join(output_dir, f"{nome_file}.xlsx")
+    return (output_dir, os.path.join(output_dir, f"{nome_file}.json"),
+            os.path.join(output_dir, f"{nome_file}.xlsx"))
 
-    # 2. Salvataggio JSON (solo se richiesto)
-    if salva_json:
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(dati, f, indent=2, ensure_ascii=False)
 
-    # 3. Calcolo contributi
-    calcolatore = CalcolatoreContributi(dati, sesso=sesso, tempo_indeterminato_da=tempo_indeterminato_da)
-    risultati = calcolatore.calcola()
+def scrivi_risultati(pdf_path, dati, sesso, risultati, memoria_picco_mb=None):
+    """
+    Genera l'Excel di un calcolo gia' fatto, accanto al PDF.
 
-    # 4. Generazione Excel
-    generatore = GeneratoreExcel(risultati)
+    Usata da elabora_pdf e dalla GUI, che dopo il primo calcolo cambia la
+    data di tempo indeterminato con CalcolatoreContributi.aggiorna.
+    memoria_picco_mb: picco di memoria dell'estrazione, se c'e' stata.
+
+    Returns:
+        Lo stesso dizionario di elabora_pdf.
+    """
+    output_dir, json_path, excel_path = _percorsi_output(pdf_path, dati["metadata"])
+    indice = IndiceCumulativo(risultati)
+
+    from .generatore import GeneratoreExcel
+    generatore = GeneratoreExcel(risultati, indice)
     generatore.genera(excel_path)
 
-    # Riepilogo
-    totale_mesi = sum(risultati["mesi"].values())
+    return {
+        **_riepilogo(dati["metadata"], sesso, risultati, indice),
+        "pagine": dati["metadata"].get("pagine"),
+        "pagine_saltate": dati["metadata"].get("pagine_saltate"),
+        "memoria_picco_mb": memoria_picco_mb,
+        "json_path": json_path,
+        "excel_path": excel_path,
+        "output_dir": output_dir
+    }
+
+
+def _etichetta_raggiungimento(raggiungimento):
+    """Mese e anno dell'obiettivo ("05/2031") se cade nella proiezione, altrimenti solo l'anno; None se mai"""
+    if not raggiungimento:
+        return None
+    anno, mese = raggiungimento
+    return f"{anno}" if mese is None else f"{mese:02d}/{anno}"
+
 
+def _riepilogo(metadata, sesso, risultati, indice):
+    """Riepilogo di un calcolo (dall'indice cumulativo), comune a elabora_pdf e calcola_archivio"""
+    totale_mesi = indice.totale_mesi
+    raggiungimento = indice.raggiungimento(risultati["obiettivo_mesi"])
     return {
-        "cognome": cognome,
-        "nome": nome,
-        "codice_fiscale": codice_fiscale,
+        "cognome": metadata.get("cognome"),
+        "nome": metadata.get("nome"),
+        "codice_fiscale": metadata.get("codice_fiscale"),
         "sesso": sesso,
         "sesso_label": "Donna" if sesso == 'F' else "Uomo" if sesso == 'M' else "Non determinato",
-        "totale_reale": sum(risultati["reale"].values()),
-        "totale_teorico": sum(risultati["teorico"].values()),
+        "totale_reale": indice.totale_reale,
+        "totale_teorico": indice.totale_teorico,
         "totale_mesi": totale_mesi,
-        "totale_label": f"{totale_mesi // 12}a {totale_mesi % 12}m",
+        "totale_label": etichetta_mesi(totale_mesi),
         "obiettivo_label": risultati.get("obiettivo_label", "42a 10m"),
+        "obiettivo_raggiunto": _etichetta_raggiungimento(raggiungimento),
         "anno_min": risultati["anno_min"],
         "anno_max": risultati["anno_max"],
-        "json_path": json_path,
-        "excel_path": excel_path,
-        "output_dir": output_dir
     }
+
+
+def scenari_pdf(pdf_path, date, workers=1, usa_cache=True, cartella_cache=None, basso_consumo=False,
+                backend="pdfplumber", modelli_layout=False):
+    """
+    Totali per ogni data di passaggio a tempo indeterminato, con una sola estrazione
+    e un solo calcolo (vedi CalcolatoreContributi.scenari_tempo_indeterminato).
+
+    Args:
+        pdf_path: Percorso del file PDF INPS
+        date: Sequenza di None, "sempre" o "DD/MM/YYYY"
+        (gli altri argomenti come in elabora_pdf)
+
+    Returns:
+        Lista di dizionari con tempo_indeterminato_da, totale_teorico, totale_mesi e anno_obiettivo.
+    """
+    dati = estrai_dati(pdf_path, workers=workers, usa_cache=usa_cache, cartella_cache=cartella_cache,
+                       basso_consumo=basso_consumo, backend=backend, modelli_layout=modelli_layout)
+    sesso = decodifica_sesso_da_cf(dati["metadata"].get("codice_fiscale"))
+    return CalcolatoreContributi(dati, sesso=sesso).scenari_tempo_indeterminato(date)
+
+
+def _elenca_pdf(sorgente):
+    """Restituisce i PDF di una cartella o di un pattern glob, ordinati"""
+    if os.path.isdir(sorgente):
+        pdf_paths = [
+            os.path.join(sorgente, nome)
+            for nome in os.listdir(sorgente)
+            if nome.lower().endswith(".pdf")
+        ]
+    else:
+        pdf_paths = glob.glob(sorgente)
+    return sorted(pdf_paths)
+
+
+def _inizializza_worker():
+    """Pre-importa estrazione e generazione Excel nel processo worker"""
+    from . import estrattore, generatore  # noqa: F401
+
+
+def _elabora_file(pdf_path, tempo_indeterminato_da, salva_json, usa_cache, cartella_cache, basso_consumo,
+                  backend, modelli_layout):
+    """Elabora un singolo PDF nel worker: un errore diventa un risultato"""
+    try:
+        risultato = elabora_pdf(pdf_path, tempo_indeterminato_da, salva_json=salva_json,
+                                usa_cache=usa_cache, cartella_cache=cartella_cache,
+                                basso_consumo=basso_consumo, backend=backend, modelli_layout=modelli_layout)
+    except Exception as e:
+        return {"pdf_path": pdf_path, "errore": f"{type(e).__name__}: {e}"}
+    risultato["pdf_path"] = pdf_path
+    return risultato
+
+
+def _pool_worker(workers):
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=workers, initializer=_inizializza_worker)
+
+
+def _elabora_isolato(pdf_path, argomenti):
+    """Elabora un PDF in un processo tutto suo: se il processo termina, l'errore e' di quel file"""
+    executor = _pool_worker(1)
+    try:
+        return executor.submit(_elabora_file, pdf_path, *argomenti).result()
+    except Exception as e:
+        return {"pdf_path": pdf_path, "errore": f"{type(e).__name__}: {e}"}
+    finally:
+        executor.shutdown(wait=True)
+
+
+def elabora_cartella(sorgente, workers=None, tempo_indeterminato_da=None, salva_json=False,
+                     usa_cache=True, cartella_cache=None, basso_consumo=False, backend="pdfplumber",
+                     modelli_layout=False):
+    """
+    Elabora tutti i PDF di una cartella (o di un pattern glob) su un pool di processi.
+
+    I worker vengono avviati una sola volta e importano pdfplumber/openpyxl
+    in anticipo, quindi il costo di avvio non si ripete per ogni file.
+
+    Args:
+        sorgente: Cartella contenente i PDF, oppure pattern glob (es. "archivio/*.pdf")
+        workers: Numero di processi (default: numero di core)
+        tempo_indeterminato_da: None, "sempre", o "DD/MM/YYYY"
+        salva_json: Se True, salva anche i file JSON
+        usa_cache: Se True, riusa i dati gia' estratti (vedi elabora_pdf)
+        cartella_cache: Cartella della cache (default: cartella cache dell'utente)
+        basso_consumo: Se True, ogni worker libera le pagine appena elaborate
+        backend: Lettura dei PDF, "pdfplumber", "pdfium" o "parole"
+        modelli_layout: Se True, riusa i bordi di colonna appresi (vedi elabora_pdf)
+
+    Returns:
+        Iteratore dei risultati di elabora_pdf, nell'ordine di completamento.
+        Ogni risultato ha la chiave "pdf_path"; un PDF che non si riesce a
+        elaborare produce {"pdf_path": ..., "errore": ...} senza fermare gli
+        altri, anche se fa terminare il processo worker.
+    """
+    from concurrent.futures import FIRST_COMPLETED, wait
+    from concurrent.futures.process import BrokenProcessPool
+
+    pdf_paths = _elenca_pdf(sorgente)
+    if not pdf_paths:
+        return
+
+    workers = min(workers or os.cpu_count() or 1, len(pdf_paths))
+    argomenti = (tempo_indeterminato_da, salva_json, usa_cache, cartella_cache, basso_consumo, backend,
+                 modelli_layout)
+    coda = deque(pdf_paths)
+    in_corso = {}
+    executor = _pool_worker(workers)
+    try:
+        while coda or in_corso:
+            # Al piu' un file per worker: se un worker muore, i file coinvolti sono solo quelli in corso
+            while coda and len(in_corso) < workers:
+                pdf_path = coda.popleft()
+                in_corso[executor.submit(_elabora_file, pdf_path, *argomenti)] = pdf_path
+            completati, _ = wait(in_corso, return_when=FIRST_COMPLETED)
+
+            sospetti = []
+            for future in completati:
+                pdf_path = in_corso.pop(future)
+                try:
+                    yield future.result()
+                except BrokenProcessPool:
+                    sospetti.append(pdf_path)
+                except Exception as e:
+                    yield {"pdf_path": pdf_path, "errore": f"{type(e).__name__}: {e}"}
+            if not sospetti:
+                continue
+
+            # Un worker e' terminato (memoria esaurita, crash nel codice C): il pool non e'
+            # piu' utilizzabile. I file in corso si rielaborano uno alla volta per trovare
+            # quello che fa terminare il processo; gli altri continuano in un pool nuovo.
+            sospetti.extend(in_corso.pop(future) for future in list(wait(in_corso)[0]))
+            executor.shutdown(wait=True, cancel_futures=True)
+            for pdf_path in sospetti:
+                yield _elabora_isolato(pdf_path, argomenti)
+            executor = _pool_worker(workers)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def sonda_pdf(pdf_path):
+    """
+    Legge solo l'intestazione di un PDF INPS (pagina 0), senza tabelle ne' calcoli.
+
+    Returns:
+        Dizionario con pdf_path, codice_fiscale, cognome, nome, sesso, pagine e
+        tipo_documento ("estratto_inps" o "sconosciuto").
+    """
+    from .estrattore import EstrattorePDF
+
+    info = EstrattorePDF(pdf_path).sonda()
+    info["sesso"] = decodifica_sesso_da_cf(info["codice_fiscale"])
+    return info
+
+
+def _sonda_file(pdf_path):
+    """Sonda un singolo PDF nel worker: un errore diventa un risultato"""
+    try:
+        return sonda_pdf(pdf_path)
+    except Exception as e:
+        return {"pdf_path": pdf_path, "errore": f"{type(e).__name__}: {e}"}
+
+
+def sonda_cartella(sorgente, workers=None):
+    """
+    Sonda tutti i PDF di una cartella, di un pattern glob o un singolo file.
+
+    Returns:
+        Iteratore dei risultati di sonda_pdf, nell'ordine dei file. Un PDF
+        illeggibile produce {"pdf_path": ..., "errore": ...}, come in elabora_cartella.
+    """
+    pdf_paths = _elenca_pdf(sorgente)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(pdf_paths) < 2:
+        for pdf_path in pdf_paths:
+            yield _sonda_file(pdf_path)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Lavori brevi: si inviano a blocchi per ridurre il costo di comunicazione
+    with ProcessPoolExecutor(max_workers=min(workers, len(pdf_paths)),
+                             initializer=_inizializza_worker) as executor:
+        yield from executor.map(_sonda_file, pdf_paths, chunksize=16)
+
+
+def _leggi_json(sorgente):
+    """
+    Genera (etichetta, testo JSON) dei dati estratti da:
+    - una cartella: ogni file .json (come quelli scritti dalla CLI)
+    - un file .jsonl: una riga per persona (etichetta "file:riga")
+    - un file .json: un solo documento
+    """
+    if os.path.isdir(sorgente):
+        for nome in sorted(os.listdir(sorgente)):
+            if nome.lower().endswith(".json"):
+                path = os.path.join(sorgente, nome)
+                with open(path, "r", encoding="utf-8") as f:
+                    yield path, f.read()
+    elif sorgente.lower().endswith(".json"):
+        with open(sorgente, "r", encoding="utf-8") as f:
+            yield sorgente, f.read()
+    else:
+        with open(sorgente, "r", encoding="utf-8") as f:
+            for numero, riga in enumerate(f, 1):
+                if riga.strip():
+                    yield f"{sorgente}:{numero}", riga
+
+
+def _calcola_json(etichetta, testo, tempo_indeterminato_da):
+    """Calcola una persona dal JSON dei dati estratti e restituisce il dizionario del risultato"""
+    try:
+        dati = json.loads(testo)
+        metadata = dati.get("metadata") or {}
+        sesso = decodifica_sesso_da_cf(metadata.get("codice_fiscale"))
+        risultati = calcola_dati(dati, sesso=sesso, tempo_indeterminato_da=tempo_indeterminato_da)
+        return {
+            "sorgente": etichetta,
+            **_riepilogo(metadata, sesso, risultati, IndiceCumulativo(risultati)),
+            "reale": risultati["reale"],
+            "teorico": risultati["teorico"],
+            "mesi": risultati["mesi"],
+        }
+    except Exception as e:
+        return {"sorgente": etichetta, "errore": f"{type(e).__name__}: {e}"}
+
+
+def _calcola_lotto(lotto, tempo_indeterminato_da):
+    return [_calcola_json(etichetta, testo, tempo_indeterminato_da) for etichetta, testo in lotto]
+
+
+def calcola_archivio(sorgente, workers=None, tempo_indeterminato_da=None, dimensione_lotto=256):
+    """
+    Ricalcola i contributi dai dati gia' estratti (JSON), senza leggere PDF.
+
+    Non importa pdfplumber ne' openpyxl: dopo un cambio di regole si ricalcola
+    l'intero archivio senza riestrarre. Le persone vengono inviate ai processi a
+    lotti, con al piu' due lotti in attesa per processo: la memoria non dipende
+    dalla dimensione dell'archivio. Ogni persona viene calcolata con calcola_dati,
+    quindi persone con gli stessi record riusano la cache dei risultati del processo.
+
+    Args:
+        sorgente: File JSONL (una persona per riga), file JSON o cartella di file JSON
+        workers: Numero di processi (default: numero di core)
+        tempo_indeterminato_da: None, "sempre", o "DD/MM/YYYY"
+        dimensione_lotto: Persone per invio a un processo
+
+    Returns:
+        Iteratore di dizionari, uno per persona, nell'ordine della sorgente:
+        "sorgente", il riepilogo (come elabora_pdf) e i valori per anno
+        "reale", "teorico", "mesi"; un input non valido produce
+        {"sorgente": ..., "errore": ...} senza fermare gli altri.
+    """
+    from collections import deque
+    from itertools import islice
+
+    voci = _leggi_json(sorgente)
+    lotti = iter(lambda: list(islice(voci, dimensione_lotto)), [])
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        for lotto in lotti:
+            yield from _calcola_lotto(lotto, tempo_indeterminato_da)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_attesa = deque()
+        for lotto in lotti:
+            in_attesa.append(executor.submit(_calcola_lotto, lotto, tempo_indeterminato_da))
+            if len(in_attesa) >= 2 * workers:
+                yield from in_attesa.popleft().result()
+        while in_attesa:
+            yield from in_attesa.popleft().result()
@@ -2,15 +2,144 @@
 Estrazione dati contributivi da PDF INPS
 """
 
+import sys
 import pdfplumber
 import re
+from concurrent.futures import ProcessPoolExecutor
+
+from .backend import BACKEND, BACKEND_PREDEFINITO, RE_DATA, apri_documento, conta_pagine
+from .record import CLASSI
+
+
+# Pre-selezione pagine: una riga utile ha una data in "Dal" e, nella stessa
+# pagina, l'unita' "sett." oppure l'intestazione "Giorni" o un tipo spettacolo
+_RE_TOKEN_TABELLA = re.compile(r'sett\.|Giorni|P\.A\.L\.S\.|Malattia')
+
+# Intestazione della prima pagina
+_RE_CODICE_FISCALE = re.compile(r'([A-Z]{6}\d{2}[A-Z]\d{2}[A-Z]\d{3}[A-Z])')
+_RE_NOME = re.compile(r'Estratto\s+conto\s+di\s+([A-Z][A-Z\s]+?)\s+([A-Z]{6}\d{2}[A-Z]\d{2}[A-Z]\d{3}[A-Z])')
+_RE_ESTRATTO = re.compile(r'Estratto\s+conto', re.IGNORECASE)
+
+# Classificazione righe: pattern compilati una volta sola
+_RE_INTERO = re.compile(r'\d+$')
+# Importo: cifre con separatori "." e ","; equivale a verificare "\d+$"
+# sulla cella dopo aver tolto i separatori, senza le sostituzioni
+_RE_IMPORTO = re.compile(r'[\d.,]*\d[\d.,]*(?:\n[.,]*)?\Z')
+_NUM_COLONNE = 9  # dal, al, tipo, sett./giorni, retribuzione, -, gruppo, qualifica, note
+
+
+def _classifica_riga(celle, header_str):
+    """Restituisce la sezione della riga ("regime_generale", "spettacolo") o None"""
+    # Regime Generale (settimane)
+    if 'sett.' in celle[3]:
+        return "regime_generale"
+
+    # Spettacolo (giorni)
+    tipo = celle[2]
+    if 'Giorni' in header_str or 'P.A.L.S.' in tipo or 'Malattia' in tipo:
+        return "spettacolo"
+    return None
+
+
+def _picco_memoria_mb():
+    """Picco di memoria residente del processo in MB (None se non misurabile, es. su Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    picco = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KB su Linux, byte su macOS
+    return round(picco / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _tipo_documento(text, codice_fiscale):
+    """Stima il tipo di documento dal testo della prima pagina"""
+    if _RE_ESTRATTO.search(text) and (codice_fiscale or "INPS" in text):
+        return "estratto_inps"
+    return "sconosciuto"
+
+
+def _leggi_prima_pagina(pdf_path):
+    """Numero di pagine e testo della pagina 0, senza creare gli oggetti delle altre pagine.
+
+    pdfplumber.open/close scorrono tutte le pagine del documento, quindi la
+    pagina 0 viene costruita direttamente con le classi interne di pdfplumber
+    (pdfplumber.PDF, page.Page) e di pdfminer (PDFPage), con le firme di
+    pdfplumber 0.11. Se cambiano in una versione successiva si ripiega su
+    pdfplumber.open(pages=[1]), piu' lento ma con la sola API pubblica.
+    """
+    try:
+        from pdfminer.pdfpage import PDFPage
+        from pdfplumber.page import Page
+
+        with open(pdf_path, "rb") as stream:
+            pdf = pdfplumber.PDF(stream)
+            num_pagine = conta_pagine(pdf)
+            page_obj = next(PDFPage.create_pages(pdf.doc), None)
+            text = ""
+            if page_obj is not None:
+                text = Page(pdf, page_obj, page_number=1, initial_doctop=0).extract_text()
+        return num_pagine, text
+    except Exception:
+        pass
+
+    with pdfplumber.open(pdf_path, pages=[1]) as pdf:
+        text = pdf.pages[0].extract_text() if pdf.pages else ""
+        return conta_pagine(pdf), text
+
+
+def _intervalli_pagine(num_pagine, parti):
+    """Divide le pagine in intervalli contigui [inizio, fine), uno per processo"""
+    parti = max(1, min(parti, num_pagine))
+    base, resto = divmod(num_pagine, parti)
+    intervalli = []
+    inizio = 0
+    for i in range(parti):
+        fine = inizio + base + (1 if i < resto else 0)
+        intervalli.append((inizio, fine))
+        inizio = fine
+    return intervalli
+
+
+def _estrai_intervallo(pdf_path, inizio, fine, basso_consumo, backend, modelli_layout):
+    """Estrae le pagine [inizio, fine) in un processo separato.
+
+    Ogni processo apre il documento per conto proprio e restituisce il
+    metadata, i record (sezione, record) del proprio intervallo, nell'ordine
+    delle pagine, e il proprio picco di memoria.
+    """
+    estrattore = EstrattorePDF(pdf_path, basso_consumo=basso_consumo, backend=backend,
+                               modelli_layout=modelli_layout)
+    with apri_documento(pdf_path, backend, inizio, fine, modelli_layout) as documento:
+        records = [
+            record
+            for pagina in estrattore._estrai_pagine(documento.pagine(), inizio)
+            for record in pagina
+        ]
+    return estrattore.dati["metadata"], records, _picco_memoria_mb()
 
 
 class EstrattorePDF:
     """Classe per estrarre i dati contributivi da PDF INPS"""
 
-    def __init__(self, pdf_path):
+    # Da incrementare quando cambiano i dati prodotti: invalida la cache su disco
+    VERSIONE = "8"
+
+    def __init__(self, pdf_path, workers=1, basso_consumo=False, backend=BACKEND_PREDEFINITO,
+                 modelli_layout=None):
+        if backend not in BACKEND:
+            raise ValueError(f"Backend sconosciuto: {backend} (disponibili: {', '.join(BACKEND)})")
         self.pdf_path = pdf_path
+        self.backend = backend  # Lettura di pagine e tabelle: "pdfplumber", "pdfium" o "parole"
+        # CacheLayout: bordi di colonna gia' appresi, riusati al posto della ricerca delle verticali
+        self.modelli_layout = modelli_layout
+        self.workers = workers  # Processi per l'estrazione parallela delle pagine
+        # Libera gli oggetti di layout di ogni pagina appena elaborata: la memoria
+        # dipende dalla pagina piu' pesante e non dal numero di pagine
+        self.basso_consumo = basso_consumo
+        # Picco di memoria residente in MB dopo estrai()/iter_records() (massimo tra i processi),
+        # None se non misurabile. Non fa parte dei dati: dipende dall'esecuzione, non dal PDF
+        self.memoria_picco_mb = None
         self.dati = {
             "regime_generale": [],
             "spettacolo": [],
@@ -18,41 +147,156 @@ class EstrattorePDF:
                 "file": pdf_path,
                 "codice_fiscale": None,
                 "cognome": None,
-                "nome": None
+                "nome": None,
+                "pagine": 0,
+                "pagine_saltate": 0  # Pagine senza tabelle contributive
             }
         }
 
-    def estrai(self):
-        """Estrae tutti i dati dal PDF"""
-        with pdfplumber.open(self.pdf_path) as pdf:
-            for page_num, page in enumerate(pdf.pages):
-                self._estrai_metadata(page, page_num)
-                self._estrai_tabelle(page)
+    def estrai(self, compatto=False):
+        """
+        Estrae tutti i dati dal PDF.
+
+        Con compatto=True le sezioni contengono RecordGenerale/RecordSpettacolo
+        invece di dizionari (vedi record.esporta_dati per tornare al JSON).
+        """
+        for sezione, record in self.iter_records():
+            if compatto:
+                record = CLASSI[sezione].da_dict(record)
+            self.dati[sezione].append(record)
 
         return self.dati
 
-    def _estrai_metadata(self, page, page_num):
+    def iter_records(self):
+        """
+        Estrae i record man mano che le pagine vengono elaborate.
+
+        Genera coppie (sezione, record) con sezione "regime_generale" o
+        "spettacolo", nell'ordine del documento. I record non vengono
+        conservati in self.dati; il metadata e' disponibile in
+        self.dati["metadata"] appena elaborata la pagina 0.
+        """
+        if self.workers and self.workers > 1:
+            return self._iter_parallelo()
+        return self._iter_seriale()
+
+    def _iter_seriale(self):
+        """Estrae le pagine una dopo l'altra nel processo corrente"""
+        with apri_documento(self.pdf_path, self.backend, modelli=self.modelli_layout) as documento:
+            for records in self._estrai_pagine(documento.pagine(), 0):
+                yield from records
+        self._aggiorna_picco(_picco_memoria_mb())
+
+    def _iter_parallelo(self):
+        """Distribuisce le pagine su un pool di processi.
+
+        I record di ogni intervallo vengono restituiti nell'ordine delle pagine,
+        quindi il risultato e' identico all'estrazione seriale.
+        """
+        with apri_documento(self.pdf_path, self.backend) as documento:
+            num_pagine = documento.num_pagine()
+
+        intervalli = _intervalli_pagine(num_pagine, self.workers)
+        if len(intervalli) < 2:
+            # Documento di una sola pagina: non serve il pool
+            yield from self._iter_seriale()
+            return
+
+        with ProcessPoolExecutor(max_workers=len(intervalli)) as executor:
+            parziali = executor.map(
+                _estrai_intervallo,
+                [self.pdf_path] * len(intervalli),
+                [inizio for inizio, _ in intervalli],
+                [fine for _, fine in intervalli],
+                [self.basso_consumo] * len(intervalli),
+                [self.backend] * len(intervalli),
+                [self.modelli_layout] * len(intervalli),
+            )
+            for indice, (metadata, records, picco) in enumerate(parziali):
+                # Il metadata viene dalla pagina 0, cioe' dal primo intervallo
+                if indice == 0:
+                    for chiave in ("codice_fiscale", "cognome", "nome"):
+                        self.dati["metadata"][chiave] = metadata[chiave]
+                self.dati["metadata"]["pagine"] += metadata["pagine"]
+                self.dati["metadata"]["pagine_saltate"] += metadata["pagine_saltate"]
+                self._aggiorna_picco(picco)
+                yield from records
+        self._aggiorna_picco(_picco_memoria_mb())
+
+    def _estrai_pagine(self, pagine, primo_indice):
+        """Genera, per ogni pagina del backend, la lista dei record (sezione, record)"""
+        for page_num, pagina in enumerate(pagine, primo_indice):
+            self._estrai_metadata(pagina, page_num)
+            records = self._estrai_tabelle(pagina)
+            if self.basso_consumo:
+                pagina.chiudi()
+
+            yield records
+
+    def _aggiorna_picco(self, memoria_mb):
+        """Aggiorna il picco di memoria dell'estrazione (massimo tra i processi)"""
+        if memoria_mb is not None and (self.memoria_picco_mb is None or memoria_mb > self.memoria_picco_mb):
+            self.memoria_picco_mb = memoria_mb
+
+    def sonda(self):
+        """
+        Legge solo l'intestazione del PDF, senza analizzare le tabelle.
+
+        Apre soltanto la pagina 0 e restituisce il metadata (codice fiscale,
+        cognome, nome), il numero di pagine e il tipo di documento stimato:
+        "estratto_inps" o "sconosciuto".
+        """
+        num_pagine, text = _leggi_prima_pagina(self.pdf_path)
+        self._analizza_intestazione(text)
+        metadata = self.dati["metadata"]
+        return {
+            "pdf_path": self.pdf_path,
+            "codice_fiscale": metadata["codice_fiscale"],
+            "cognome": metadata["cognome"],
+            "nome": metadata["nome"],
+            "pagine": num_pagine,
+            "tipo_documento": _tipo_documento(text, metadata["codice_fiscale"]),
+        }
+
+    def _estrai_metadata(self, pagina, page_num):
         """Estrae metadata dalla prima pagina"""
         if page_num == 0:
-            text = page.extract_text()
-
-            # Estrai codice fiscale
-            cf_match = re.search(r'([A-Z]{6}\d{2}[A-Z]\d{2}[A-Z]\d{3}[A-Z])', text)
-            if cf_match:
-                self.dati["metadata"]["codice_fiscale"] = cf_match.group(1)
-
-            # Estrai cognome e nome da "Estratto conto di COGNOME NOME CODICEFISCALE"
-            nome_match = re.search(r'Estratto\s+conto\s+di\s+([A-Z][A-Z\s]+?)\s+([A-Z]{6}\d{2}[A-Z]\d{2}[A-Z]\d{3}[A-Z])', text)
-            if nome_match:
-                nome_completo = nome_match.group(1).strip()
-                parti = nome_completo.split()
-                if len(parti) >= 2:
-                    self.dati["metadata"]["cognome"] = parti[0]
-                    self.dati["metadata"]["nome"] = ' '.join(parti[1:])
-
-    def _estrai_tabelle(self, page):
-        """Estrae le tabelle dalla pagina"""
-        tables = page.extract_tables()
+            self._analizza_intestazione(pagina.testo())
+
+    def _analizza_intestazione(self, text):
+        """Estrae codice fiscale, cognome e nome dal testo della prima pagina"""
+        # Estrai codice fiscale
+        cf_match = _RE_CODICE_FISCALE.search(text)
+        if cf_match:
+            self.dati["metadata"]["codice_fiscale"] = cf_match.group(1)
+
+        # Estrai cognome e nome da "Estratto conto di COGNOME NOME CODICEFISCALE"
+        nome_match = _RE_NOME.search(text)
+        if nome_match:
+            nome_completo = nome_match.group(1).strip()
+            parti = nome_completo.split()
+            if len(parti) >= 2:
+                self.dati["metadata"]["cognome"] = parti[0]
+                self.dati["metadata"]["nome"] = ' '.join(parti[1:])
+
+    def _pagina_con_tabelle(self, testo):
+        """Verifica a basso costo se la pagina puo' contenere tabelle contributive.
+
+        Usa solo il testo dei caratteri, gia' disponibile dopo il parsing della
+        pagina, senza la ricerca delle tabelle (linee, intersezioni, celle).
+        """
+        return bool(RE_DATA.search(testo)) and bool(_RE_TOKEN_TABELLA.search(testo))
+
+    def _estrai_tabelle(self, pagina):
+        """Estrae le tabelle dalla pagina e restituisce i record (sezione, record)"""
+        records = []
+        self.dati["metadata"]["pagine"] += 1
+
+        if not self._pagina_con_tabelle(pagina.testo_caratteri()):
+            self.dati["metadata"]["pagine_saltate"] += 1
+            return records
+
+        tables = pagina.tabelle()
 
         for table in tables:
             if not table or len(table) < 3:
@@ -63,111 +307,118 @@ class EstrattorePDF:
             data_rows = table[2:] if len(table) > 2 else []
 
             for row in data_rows:
-                self._processa_riga(row, header_str)
+                risultato = self._processa_riga(row, header_str)
+                if risultato:
+                    records.append(risultato)
+
+        return records
 
     def _processa_riga(self, row, header_str):
-        """Processa una singola riga della tabella"""
+        """Processa una singola riga della tabella: restituisce (sezione, record) o None"""
         if not row or not row[0]:
-            return
-
-        dal = row[0]
-        al = row[1]
-        tipo = row[2]
+            return None
 
         # Verifica data valida
-        if not re.match(r'\d{2}/\d{2}/\d{4}', str(dal)):
-            return
-
-        # Regime Generale (settimane)
-        if 'sett.' in str(row[3]) or row[3] == 'sett.':
-            self._processa_regime_generale(row, dal, al, tipo)
-
-        # Spettacolo (giorni)
-        elif 'Giorni' in header_str or 'P.A.L.S.' in str(tipo) or 'Malattia' in str(tipo):
-            self._processa_spettacolo(row, dal, al, tipo)
-
-    def _processa_regime_generale(self, row, dal, al, tipo):
-        """Processa record Regime Generale"""
+        if not RE_DATA.match(str(row[0])):
+            return None
+
+        if len(row) < _NUM_COLONNE:
+            row = list(row) + [None] * (_NUM_COLONNE - len(row))
+
+        # Ogni cella viene convertita in stringa una sola volta
+        celle = [str(c) if c else '' for c in row]
+        sezione = _classifica_riga(celle, header_str)
+        if sezione:
+            record = self._GESTORI[sezione](self, row, celle)
+            if record:
+                return sezione, record
+        return None
+
+    def _processa_regime_generale(self, row, celle):
+        """Processa record Regime Generale: restituisce il record o None"""
         settimane = None
-        for val in row[3:]:
-            if val and re.match(r'^\d+$', str(val)):
+        for val in celle[3:]:
+            if val and _RE_INTERO.match(val):
                 settimane = int(val)
                 break
 
         if settimane:
             record = {
-                "dal": dal,
-                "al": al,
-                "tipo": tipo,
+                "dal": row[0],
+                "al": row[1],
+                "tipo": row[2],
                 "settimane": settimane,
                 "unita": "settimane"
             }
-            self._aggiungi_retribuzione(record, row)
+            self._aggiungi_retribuzione(record, row, celle)
 
             # Note in posizione 8
-            if len(row) > 8 and row[8] and str(row[8]).strip():
-                record["note"] = str(row[8]).strip()
+            nota = celle[8].strip()
+            if nota:
+                record["note"] = nota
 
-            self.dati["regime_generale"].append(record)
+            return record
+        return None
 
-    def _processa_spettacolo(self, row, dal, al, tipo):
-        """Processa record Lavoratori Spettacolo"""
+    def _processa_spettacolo(self, row, celle):
+        """Processa record Lavoratori Spettacolo: restituisce il record"""
         giorni = None
         gruppo = None
-        codice_qualifica = None
-        retribuzione = None
 
         # Giorni in posizione 3
-        if row[3] and str(row[3]).strip():
+        if celle[3].strip():
             try:
-                giorni = int(row[3])
-            except:
+                giorni = int(celle[3])
+            except ValueError:
                 pass
 
-        # Retribuzione in posizione 4
-        if len(row) > 4 and row[4]:
-            retribuzione = row[4]
-
         # Gruppo in posizione 6
-        if len(row) > 6 and row[6]:
+        if celle[6]:
             try:
-                gruppo = int(row[6])
-            except:
+                gruppo = int(celle[6])
+            except ValueError:
                 pass
 
-        # Codice qualifica in posizione 7
-        if len(row) > 7 and row[7]:
-            codice_qualifica = str(row[7]).replace('\n', '')
-
         record = {
-            "dal": dal,
-            "al": al,
-            "tipo": tipo,
+            "dal": row[0],
+            "al": row[1],
+            "tipo": row[2],
             "giorni": giorni,
             "unita": "giorni"
         }
 
         if gruppo:
             record["gruppo"] = gruppo
-        if codice_qualifica:
-            record["codice_qualifica"] = codice_qualifica
-        if retribuzione:
-            record["retribuzione"] = retribuzione
+        # Codice qualifica in posizione 7
+        if celle[7]:
+            codice_qualifica = celle[7].replace('\n', '')
+            if codice_qualifica:
+                record["codice_qualifica"] = codice_qualifica
+        # Retribuzione in posizione 4
+        if celle[4]:
+            record["retribuzione"] = row[4]
 
         # Note in posizione 8
-        if len(row) > 8 and row[8] and str(row[8]).strip():
-            record["note"] = str(row[8]).strip()
+        nota = celle[8].strip()
+        if nota:
+            record["note"] = nota
 
-        self.dati["spettacolo"].append(record)
+        return record
 
-    def _aggiungi_retribuzione(self, record, row):
+    def _aggiungi_retribuzione(self, record, row, celle):
         """Aggiunge la retribuzione al record se presente"""
-        for val in row:
-            if val and re.match(r'[\d.,]+$', str(val).replace('.', '').replace(',', '')):
+        for i, val in enumerate(celle):
+            if val and _RE_IMPORTO.match(val):
                 try:
-                    ret = float(str(val).replace('.', '').replace(',', '.'))
-                    if ret > 100:
-                        record["retribuzione"] = val
-                        break
-                except:
-                    pass
+                    ret = float(val.replace('.', '').replace(',', '.'))
+                except ValueError:
+                    continue
+                if ret > 100:
+                    record["retribuzione"] = row[i]
+                    break
+
+    # Dispatch delle righe classificate verso il gestore della sezione
+    _GESTORI = {
+        "regime_generale": _processa_regime_generale,
+        "spettacolo": _processa_spettacolo,
+    }
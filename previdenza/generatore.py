@@ -5,12 +5,16 @@ Generazione file Excel con risultati calcolo contributi
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 
+from .indice import IndiceCumulativo, etichetta_mesi
+
 
 class GeneratoreExcel:
     """Classe per generare il file Excel con i risultati"""
 
-    def __init__(self, risultati_calcolo):
+    def __init__(self, risultati_calcolo, indice=None):
         self.risultati = risultati_calcolo
+        # Somme cumulative per anno (costruite qui se non passate)
+        self.indice = indice if indice is not None else IndiceCumulativo(risultati_calcolo)
         self.wb = Workbook()
         self.ws = self.wb.active
         self.ws.title = "Contributi Previdenziali"
@@ -55,8 +59,6 @@ class GeneratoreExcel:
         if not anno_min or not anno_max:
             return
 
-        mesi_cumulativi = 0
-
         for i, anno in enumerate(range(anno_min, anno_max + 1), 2):
             reale = self.risultati["reale"].get(anno, 0)
             teorico = self.risultati["teorico"].get(anno, 0)
@@ -79,10 +81,7 @@ class GeneratoreExcel:
             self.ws.cell(row=i, column=6).alignment = self.center
 
             # Anni e Mesi Cumulativi (G)
-            mesi_cumulativi += mesi
-            anni_cum = mesi_cumulativi // 12
-            mesi_cum = mesi_cumulativi % 12
-            formato_cumulativo = f"{anni_cum}a {mesi_cum}m"
+            formato_cumulativo = etichetta_mesi(self.indice.mesi_fino_a(anno))
             self.ws.cell(row=i, column=7, value=formato_cumulativo).border = self.border
             self.ws.cell(row=i, column=7).alignment = self.center
 
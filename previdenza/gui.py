@@ -8,7 +8,8 @@ import re
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 
-from .core import elabora_pdf
+from .calcolatore import CalcolatoreContributi, decodifica_sesso_da_cf
+from .core import estrai_dati, scrivi_risultati
 
 
 class App:
@@ -17,10 +18,14 @@ class App:
     def __init__(self, root):
         self.root = root
         self.root.title("Contributi INPS")
-        self.root.geometry("500x420")
+        self.root.geometry("500x470")
         self.root.resizable(False, False)
 
         self.pdf_path = None
+        self.cartella_cache = None  # None = cartella cache predefinita
+        # Ultimo calcolo: (pdf_path, usa_cache, cartella_cache), dati, sesso e calcolatore.
+        # Se cambia solo la data di tempo indeterminato si aggiorna il calcolatore
+        self._calcolo = None
 
         # Frame principale
         frame = ttk.Frame(root, padding=20)
@@ -45,6 +50,15 @@ class App:
         self.entry_data.insert(0, "GG/MM/AAAA")
         self.entry_data.config(state=tk.DISABLED)
 
+        # Cache dei dati estratti
+        frame_cache = ttk.Frame(frame)
+        frame_cache.pack(anchor=tk.W, pady=(0, 5))
+        self.var_cache = tk.BooleanVar(value=True)
+        ttk.Checkbutton(frame_cache, text="Usa cache estrazione", variable=self.var_cache).pack(side=tk.LEFT)
+        ttk.Button(frame_cache, text="Cartella cache...", command=self.seleziona_cache).pack(side=tk.LEFT, padx=10)
+        self.label_cache = ttk.Label(frame, text="Cache: cartella predefinita", foreground="gray", wraplength=450)
+        self.label_cache.pack(anchor=tk.W)
+
         # Pulsante calcola
         self.btn_calcola = ttk.Button(frame, text="CALCOLA", command=self.calcola, width=20, state=tk.DISABLED)
         self.btn_calcola.pack(pady=10)
@@ -65,9 +79,17 @@ class App:
         path = filedialog.askopenfilename(filetypes=[("PDF", "*.pdf")])
         if path:
             self.pdf_path = path
+            self._calcolo = None
             self.label_pdf.config(text=path, foreground="black")
             self.btn_calcola.config(state=tk.NORMAL)
 
+    def seleziona_cache(self):
+        """Apre dialogo per scegliere la cartella della cache"""
+        path = filedialog.askdirectory()
+        if path:
+            self.cartella_cache = path
+            self.label_cache.config(text=f"Cache: {path}", foreground="black")
+
     def toggle_data(self):
         """Abilita/disabilita campo data"""
         if self.var_ti.get():
@@ -97,7 +119,7 @@ class App:
             self.btn_calcola.config(state=tk.DISABLED, text="Elaborazione...")
             self.root.update()
 
-            risultato = elabora_pdf(self.pdf_path, tempo_indeterminato_da)
+            risultato = self._elabora(tempo_indeterminato_da)
 
             # Mostra output
             self.text_output.config(state=tk.NORMAL)
@@ -108,6 +130,8 @@ class App:
             output += f"Sesso: {risultato['sesso_label']}\n"
             output += f"Obiettivo: {risultato['obiettivo_label']}\n"
             output += f"Totale mesi: {risultato['totale_mesi']} ({risultato['totale_label']})\n"
+            if risultato['obiettivo_raggiunto']:
+                output += f"Obiettivo raggiunto: {risultato['obiettivo_raggiunto']}\n"
             output += f"Giorni REALI: {risultato['totale_reale']}\n"
             output += f"Giorni TEORICI: {risultato['totale_teorico']}\n"
             output += f"\nFile generato:\n{risultato['excel_path']}"
@@ -123,6 +147,24 @@ class App:
         finally:
             self.btn_calcola.config(state=tk.NORMAL, text="CALCOLA")
 
+    def _elabora(self, tempo_indeterminato_da):
+        """Come elabora_pdf, ma ricalcola solo cio' che cambia con la data di tempo indeterminato"""
+        chiave = (self.pdf_path, self.var_cache.get(), self.cartella_cache)
+        if self._calcolo and self._calcolo[0] == chiave:
+            _, dati, sesso, calcolatore = self._calcolo
+            try:
+                risultati = calcolatore.aggiorna(tempo_indeterminato_da)
+            except Exception:
+                self._calcolo = None  # Calcolatore in uno stato incompleto: al prossimo giro si riparte
+                raise
+        else:
+            dati = estrai_dati(self.pdf_path, usa_cache=chiave[1], cartella_cache=self.cartella_cache)
+            sesso = decodifica_sesso_da_cf(dati["metadata"].get("codice_fiscale"))
+            calcolatore = CalcolatoreContributi(dati, sesso=sesso, tempo_indeterminato_da=tempo_indeterminato_da)
+            risultati = calcolatore.calcola()
+            self._calcolo = (chiave, dati, sesso, calcolatore)
+        return scrivi_risultati(self.pdf_path, dati, sesso, risultati)
+
     def apri_cartella(self):
         """Apre la cartella di output nel file manager"""
         if self.output_dir:
@@ -0,0 +1,83 @@
+"""
+Indice cumulativo dei risultati di calcolo
+
+Somme prefisse per anno di mesi, giorni teorici e giorni reali, costruite
+una volta dal risultato di CalcolatoreContributi.calcola(). Le domande
+"quanti mesi entro l'anno Y", "giorni tra gli anni A e B" e "quando si
+raggiunge l'obiettivo" si risolvono con una differenza di due somme o con
+una ricerca binaria, senza risommare gli anni.
+"""
+
+from bisect import bisect_left
+from itertools import accumulate
+
+
+def etichetta_mesi(mesi):
+    """Mesi nel formato "Xa Ym" """
+    return f"{mesi // 12}a {mesi % 12}m"
+
+
+class IndiceCumulativo:
+    """Somme cumulative per anno (da anno_min ad anno_max inclusi) di un risultato di calcolo"""
+
+    def __init__(self, risultati):
+        self.anno_min = risultati["anno_min"]
+        self.anno_max = risultati["anno_max"]
+        # Dal primo anno della proiezione i mesi sono consecutivi da gennaio
+        self.anno_proiezione = risultati.get("anno_proiezione")
+        if self.anno_min and self.anno_max:
+            self.anni = range(self.anno_min, self.anno_max + 1)
+        else:
+            self.anni = range(0)
+        # Elemento i: somma dei primi i anni dell'intervallo
+        self._mesi = list(accumulate((risultati["mesi"].get(a, 0) for a in self.anni), initial=0))
+        self._teorico = list(accumulate((risultati["teorico"].get(a, 0) for a in self.anni), initial=0))
+        self._reale = list(accumulate((risultati["reale"].get(a, 0) for a in self.anni), initial=0))
+
+    def _posizione(self, anno):
+        """Numero di anni dell'intervallo fino ad anno incluso"""
+        if not self.anni:
+            return 0
+        return min(max(anno - self.anno_min + 1, 0), len(self.anni))
+
+    @property
+    def totale_mesi(self):
+        return self._mesi[-1]
+
+    @property
+    def totale_teorico(self):
+        return self._teorico[-1]
+
+    @property
+    def totale_reale(self):
+        return self._reale[-1]
+
+    def mesi_fino_a(self, anno):
+        """Mesi teorici maturati fino alla fine di anno"""
+        return self._mesi[self._posizione(anno)]
+
+    def mesi_tra(self, anno_da, anno_a):
+        """Mesi teorici degli anni da anno_da ad anno_a inclusi"""
+        return self._mesi[self._posizione(anno_a)] - self._mesi[self._posizione(anno_da - 1)]
+
+    def giorni_tra(self, anno_da, anno_a, reali=False):
+        """Giorni teorici (o reali) degli anni da anno_da ad anno_a inclusi"""
+        somme = self._reale if reali else self._teorico
+        return somme[self._posizione(anno_a)] - somme[self._posizione(anno_da - 1)]
+
+    def raggiungimento(self, obiettivo_mesi):
+        """
+        Anno e mese (1-12) in cui i mesi cumulati raggiungono obiettivo_mesi, o None.
+
+        Il mese di calendario esiste solo negli anni della proiezione, dove i
+        mesi vanno da gennaio in poi; negli anni con contributi i mesi
+        conteggiati possono non essere consecutivi o superare 12, e il mese
+        e' None.
+        """
+        i = max(bisect_left(self._mesi, obiettivo_mesi), 1)
+        if i >= len(self._mesi):
+            return None
+        anno = self.anno_min + i - 1
+        if self.anno_proiezione is None or anno < self.anno_proiezione:
+            return anno, None
+        return anno, obiettivo_mesi - self._mesi[i - 1]
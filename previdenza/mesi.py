@@ -0,0 +1,36 @@
+"""
+Insiemi di mesi come maschere di bit
+
+I mesi coperti di un anno sono un intero a 12 bit: il bit 0 e' gennaio,
+il bit 11 dicembre. Unione, esclusione e conteggio diventano OR, AND-NOT
+e conteggio dei bit, senza costruire set di numeri di mese.
+"""
+
+ANNO_INTERO = 0xFFF  # Tutti i 12 mesi
+
+# Conteggio dei bit: int.bit_count da Python 3.10
+try:
+    conta = int.bit_count
+except AttributeError:
+    def conta(maschera):
+        """Numero di mesi nella maschera"""
+        return bin(maschera).count("1")
+
+
+def intervallo(mese_inizio, mese_fine):
+    """Maschera dei mesi da mese_inizio a mese_fine inclusi (1-12); vuota se invertiti"""
+    if mese_fine < mese_inizio:
+        return 0
+    return ((1 << (mese_fine - mese_inizio + 1)) - 1) << (mese_inizio - 1)
+
+
+def per_anno(anno_inizio, mese_inizio, anno_fine, mese_fine):
+    """Genera (anno, maschera) per un periodo che puo' attraversare piu' anni"""
+    if anno_inizio == anno_fine:
+        yield anno_inizio, intervallo(mese_inizio, mese_fine)
+        return
+    yield anno_inizio, intervallo(mese_inizio, 12)
+    for anno in range(anno_inizio + 1, anno_fine):
+        yield anno, ANNO_INTERO
+    yield anno_fine, intervallo(1, mese_fine)
+
@@ -0,0 +1,149 @@
+"""
+Record contributivi compatti
+
+Un record e' un oggetto con __slots__ invece di un dizionario: occupa
+circa un quarto della memoria e gli attributi si leggono senza cercare
+chiavi stringa. I dizionari restano il formato di scambio (JSON, cache):
+da_dict/a_dict convertono nei due sensi con le stesse chiavi prodotte
+dall'estrattore.
+
+Le date restano stringhe "DD/MM/YYYY" (come nel JSON), ma anno e mese di
+inizio e fine vengono letti una volta sola alla costruzione del record:
+il calcolatore lavora solo sugli interi.
+"""
+
+
+def anno_mese(data):
+    """Anno e mese (interi) di una data in formato DD/MM/YYYY"""
+    _, mese, anno = data.split('/')
+    return int(anno), int(mese)
+
+
+class RecordGenerale:
+    """Periodo del Regime Generale (unita': settimane)"""
+
+    __slots__ = ("dal", "al", "tipo", "settimane", "retribuzione", "note",
+                 "anno_dal", "mese_dal", "anno_al", "mese_al")
+
+    unita = "settimane"
+
+    def __init__(self, dal, al, tipo=None, settimane=0, retribuzione=None, note=None):
+        self.dal = dal
+        self.al = al
+        self.tipo = tipo
+        self.settimane = settimane
+        self.retribuzione = retribuzione
+        self.note = note
+        self.anno_dal, self.mese_dal = anno_mese(dal)
+        self.anno_al, self.mese_al = anno_mese(al)
+
+    @classmethod
+    def da_dict(cls, d):
+        return cls(d["dal"], d["al"], d.get("tipo"), d["settimane"],
+                   d.get("retribuzione"), d.get("note"))
+
+    def a_dict(self):
+        d = {
+            "dal": self.dal,
+            "al": self.al,
+            "tipo": self.tipo,
+            "settimane": self.settimane,
+            "unita": self.unita
+        }
+        if self.retribuzione is not None:
+            d["retribuzione"] = self.retribuzione
+        if self.note is not None:
+            d["note"] = self.note
+        return d
+
+    def __eq__(self, altro):
+        if type(altro) is not type(self):
+            return NotImplemented
+        return all(getattr(self, a) == getattr(altro, a) for a in self.__slots__)
+
+    def __repr__(self):
+        return f"RecordGenerale({self.dal!r}, {self.al!r}, settimane={self.settimane!r})"
+
+
+class RecordSpettacolo:
+    """Periodo dei Lavoratori dello Spettacolo (unita': giorni)"""
+
+    __slots__ = ("dal", "al", "tipo", "giorni", "gruppo", "codice_qualifica", "retribuzione", "note",
+                 "anno_dal", "mese_dal", "anno_al", "mese_al")
+
+    unita = "giorni"
+
+    def __init__(self, dal, al, tipo=None, giorni=None, gruppo=None, codice_qualifica=None,
+                 retribuzione=None, note=None):
+        self.dal = dal
+        self.al = al
+        self.tipo = tipo
+        self.giorni = giorni
+        self.gruppo = gruppo
+        self.codice_qualifica = codice_qualifica
+        self.retribuzione = retribuzione
+        self.note = note
+        self.anno_dal, self.mese_dal = anno_mese(dal)
+        self.anno_al, self.mese_al = anno_mese(al)
+
+    @classmethod
+    def da_dict(cls, d):
+        return cls(d["dal"], d["al"], d.get("tipo"), d.get("giorni"), d.get("gruppo"),
+                   d.get("codice_qualifica"), d.get("retribuzione"), d.get("note"))
+
+    def a_dict(self):
+        d = {
+            "dal": self.dal,
+            "al": self.al,
+            "tipo": self.tipo,
+            "giorni": self.giorni,
+            "unita": self.unita
+        }
+        if self.gruppo is not None:
+            d["gruppo"] = self.gruppo
+        if self.codice_qualifica is not None:
+            d["codice_qualifica"] = self.codice_qualifica
+        if self.retribuzione is not None:
+            d["retribuzione"] = self.retribuzione
+        if self.note is not None:
+            d["note"] = self.note
+        return d
+
+    def __eq__(self, altro):
+        if type(altro) is not type(self):
+            return NotImplemented
+        return all(getattr(self, a) == getattr(altro, a) for a in self.__slots__)
+
+    def __repr__(self):
+        return (f"RecordSpettacolo({self.dal!r}, {self.al!r}, giorni={self.giorni!r}, "
+                f"gruppo={self.gruppo!r})")
+
+
+# Classe del record per sezione dei dati estratti
+CLASSI = {
+    "regime_generale": RecordGenerale,
+    "spettacolo": RecordSpettacolo,
+}
+
+
+def compatta(sezione, records):
+    """Converte i record di una sezione in forma compatta (quelli gia' compatti restano)"""
+    classe = CLASSI[sezione]
+    return [r if isinstance(r, classe) else classe.da_dict(r) for r in records]
+
+
+def compatta_dati(dati):
+    """Dati estratti con le sezioni in forma compatta; il metadata resta invariato"""
+    compatti = dict(dati)
+    for sezione in CLASSI:
+        compatti[sezione] = compatta(sezione, dati.get(sezione, []))
+    return compatti
+
+
+def esporta_dati(dati):
+    """Dati estratti con le sezioni come dizionari (per JSON e cache)"""
+    esportati = dict(dati)
+    for sezione in CLASSI:
+        esportati[sezione] = [r.a_dict() if isinstance(r, CLASSI[sezione]) else r
+                              for r in dati.get(sezione, [])]
+    return esportati
@@ -0,0 +1,273 @@
+"""
+Dati ed estratti conto PDF sintetici per test e benchmark
+
+genera_dati() produce, da un seme, un dizionario con la forma di
+EstrattorePDF.estrai(). Chiavi e formati sono gli stessi: date "DD/MM/YYYY",
+importi "12.345,67", campi opzionali solo se presenti.
+
+I dati contengono i casi che il calcolatore deve gestire:
+- Regime Generale e Spettacolo nello stesso anno
+- periodi a cavallo d'anno e sovrapposti
+- gruppi 1 e 2 e periodi senza gruppo (servizio militare)
+- note "3"/"O" di disoccupazione
+
+genera_pdf() scrive un estratto conto PDF con il layout delle tabelle INPS
+letto da EstrattorePDF e restituisce i dati che l'estrazione deve produrre.
+
+Stesso seme e stessi parametri danno gli stessi dati, quindi i benchmark
+sono confrontabili tra versioni.
+"""
+
+import calendar
+import random
+
+from .record import RecordGenerale, RecordSpettacolo
+
+ANNI_MASSIMI = 60
+RECORD_MASSIMI = 10000
+
+_COGNOMI = ("ROSSI", "BIANCHI", "ESPOSITO", "COLOMBO", "RICCI", "MARINO", "GRECO", "BRUNO", "GALLO", "CONTI")
+_NOMI = {
+    "M": ("MARIO", "LUIGI", "GIUSEPPE", "ANTONIO", "MARCO", "ANDREA"),
+    "F": ("MARIA", "ANNA", "GIULIA", "FRANCESCA", "LAURA", "CHIARA"),
+}
+_CONSONANTI = "BCDFGHLMNPRSTVZ"
+_MESI_CF = "ABCDEHLMPRST"
+
+
+def _data(giorno, mese, anno):
+    return f"{giorno:02d}/{mese:02d}/{anno}"
+
+
+def _importo(valore):
+    """Importo nel formato dell'estratto: 12.345,67"""
+    return f"{valore:,.2f}".replace(",", " ").replace(".", ",").replace(" ", ".")
+
+
+def codice_fiscale(rng, sesso):
+    """Codice fiscale con formato plausibile (senza carattere di controllo valido) e il sesso nel giorno"""
+    giorno = rng.randint(1, 28) + (40 if sesso == "F" else 0)
+    return ("".join(rng.choice(_CONSONANTI) for _ in range(6))
+            + f"{rng.randint(40, 99):02d}{rng.choice(_MESI_CF)}{giorno:02d}"
+            + f"H{rng.randint(100, 999)}{rng.choice(_CONSONANTI)}")
+
+
+def _genera_record(rng, anni, record, anno_inizio, quota_spettacolo, quota_disoccupazione,
+                   quota_cavallo_anno):
+    """Coppie (sezione, record) distribuite sugli anni in ordine"""
+    records = []
+
+    for i in range(record):
+        # Record distribuiti sugli anni in ordine, come nell'estratto
+        anno = anno_inizio + i * anni // record
+        if rng.random() < quota_cavallo_anno:
+            mese, anno_fine, mese_fine = rng.randint(7, 12), anno + 1, rng.randint(1, 6)
+        else:
+            mese = rng.randint(1, 12)
+            anno_fine, mese_fine = anno, min(12, mese + rng.randint(0, 3))
+        num_mesi = (anno_fine - anno) * 12 + mese_fine - mese + 1
+        dal = _data(1, mese, anno)
+        al = _data(calendar.monthrange(anno_fine, mese_fine)[1], mese_fine, anno_fine)
+
+        if rng.random() < quota_spettacolo:
+            if rng.random() < 0.02:
+                records.append(("spettacolo", RecordSpettacolo(dal, al, "Servizio militare",
+                                                               giorni=26 * num_mesi)))
+                continue
+            gruppo = rng.choice((1, 2, 2))
+            giorni = rng.randint(1, 26 * num_mesi)
+            records.append(("spettacolo", RecordSpettacolo(
+                dal, al, "P.A.L.S. Obbligatoria", giorni=giorni, gruppo=gruppo,
+                codice_qualifica="113" if gruppo == 1 else "201",
+                retribuzione=_importo(giorni * rng.uniform(60, 200)))))
+        else:
+            settimane = min(52, max(1, round(num_mesi * 4.33)))
+            if rng.random() < quota_disoccupazione:
+                records.append(("regime_generale", RecordGenerale(dal, al, "Disoccupazione", settimane,
+                                                                  note=rng.choice(("3", "O")))))
+            else:
+                records.append(("regime_generale", RecordGenerale(
+                    dal, al, "Lavoro dipendente", settimane,
+                    retribuzione=_importo(settimane * rng.uniform(300, 800)))))
+
+    return records
+
+
+def genera_dati(seme=0, anni=30, record=None, anno_inizio=1980, quota_spettacolo=0.6,
+                quota_disoccupazione=0.05, quota_cavallo_anno=0.1, sesso=None):
+    """
+    Genera i dati estratti di una carriera sintetica.
+
+    Args:
+        seme: Seme del generatore casuale
+        anni: Durata della carriera (1-60)
+        record: Numero di record, da 10 a 10000 (default: 12 per anno); piu'
+            record per anno significano piu' periodi sovrapposti
+        anno_inizio: Primo anno della carriera
+        quota_spettacolo: Frazione dei record dello Spettacolo (il resto e' Regime Generale)
+        quota_disoccupazione: Frazione dei record del Regime Generale con nota "3"/"O"
+        quota_cavallo_anno: Frazione dei periodi a cavallo d'anno
+        sesso: 'M' o 'F' (default: casuale); determina il codice fiscale
+
+    Returns:
+        Dizionario con "regime_generale", "spettacolo" e "metadata", come EstrattorePDF.estrai().
+    """
+    if not 1 <= anni <= ANNI_MASSIMI:
+        raise ValueError(f"anni deve essere tra 1 e {ANNI_MASSIMI}: {anni}")
+    if record is None:
+        record = max(10, 12 * anni)
+    if not 10 <= record <= RECORD_MASSIMI:
+        raise ValueError(f"record deve essere tra 10 e {RECORD_MASSIMI}: {record}")
+
+    rng = random.Random(seme)
+    sesso = sesso or rng.choice("MF")
+    records = _genera_record(rng, anni, record, anno_inizio, quota_spettacolo, quota_disoccupazione,
+                             quota_cavallo_anno)
+    return _dati(records, _metadata(rng, sesso, None, 1 + record // 25))
+
+
+def _metadata(rng, sesso, file, pagine):
+    return {
+        "file": file,
+        "codice_fiscale": codice_fiscale(rng, sesso),
+        "cognome": rng.choice(_COGNOMI),
+        "nome": rng.choice(_NOMI[sesso]),
+        "pagine": pagine,
+        "pagine_saltate": 0
+    }
+
+
+def _dati(records, metadata):
+    dati = {"regime_generale": [], "spettacolo": [], "metadata": metadata}
+    for sezione, record in records:
+        dati[sezione].append(record.a_dict())
+    return dati
+
+
+# Estratto conto PDF: griglia delle tabelle INPS (Helvetica, linee piene), con le
+# nove colonne lette da EstrattorePDF._processa_riga
+_COLONNE = [40, 95, 150, 270, 315, 380, 425, 465, 510, 555]
+INTESTAZIONE = ["Dal", "Al", "Tipo contribuzione", "Unita", "Retribuzione", "Contributi",
+                "Gruppo", "Qualifica", "Note"]
+INTESTAZIONE_SPETTACOLO = INTESTAZIONE[:3] + ["Giorni"] + INTESTAZIONE[4:]
+# Righe (su due linee nel caso peggiore) che stanno in una pagina A4 con due tabelle
+RIGHE_PER_PAGINA_MASSIME = 24
+
+
+def _tabella_pdf(comandi, y, intestazione, righe, colonne):
+    top = y
+    for riga in [intestazione, [""] * 9] + righe:
+        linee = 1
+        for i, cella in enumerate(riga):
+            for k, testo in enumerate(cella.split("\n") if cella else []):
+                comandi.append(f"BT /F1 7 Tf {colonne[i] + 2} {y - 10 - k * 8} Td ({testo}) Tj ET")
+                linee = max(linee, k + 1)
+        comandi.append(f"{colonne[0]} {y} m {colonne[-1]} {y} l S")
+        y -= 14 * linee
+    comandi.append(f"{colonne[0]} {y} m {colonne[-1]} {y} l S")
+    comandi.extend(f"{x} {top} m {x} {y} l S" for x in colonne)
+    return y
+
+
+def scrivi_pdf(path, pagine, colonne=_COLONNE):
+    """Scrive un PDF minimo; pagine: liste di (righe di testo, [(intestazione, righe)]); colonne: x delle verticali"""
+    oggetti = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    for testi, tabelle in pagine:
+        comandi = ["0.5 w"]
+        y = 800
+        for testo in testi:
+            comandi.append(f"BT /F1 10 Tf 40 {y} Td ({testo}) Tj ET")
+            y -= 16
+        for intestazione, righe in tabelle:
+            y = _tabella_pdf(comandi, y - 10, intestazione, righe, colonne) - 20
+        contenuto = "\n".join(comandi)
+        oggetti.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(oggetti) + 2} 0 R >>")
+        oggetti.append(f"<< /Length {len(contenuto)} >>\nstream\n{contenuto}\nendstream")
+    figli = " ".join(f"{n} 0 R" for n in range(4, len(oggetti) + 1, 2))
+    oggetti[1] = f"<< /Type /Pages /Kids [{figli}] /Count {len(pagine)} >>"
+
+    uscita = "%PDF-1.4\n"
+    posizioni = []
+    for n, oggetto in enumerate(oggetti, 1):
+        posizioni.append(len(uscita))
+        uscita += f"{n} 0 obj\n{oggetto}\nendobj\n"
+    xref = len(uscita)
+    uscita += f"xref\n0 {len(oggetti) + 1}\n0000000000 65535 f \n"
+    uscita += "".join(f"{p:010d} 00000 n \n" for p in posizioni)
+    uscita += f"trailer\n<< /Size {len(oggetti) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    with open(path, "w", encoding="latin-1") as f:
+        f.write(uscita)
+
+
+def _riga_pdf(sezione, record):
+    """Celle della riga di tabella di un record"""
+    if sezione == "regime_generale":
+        return [record.dal, record.al, record.tipo, "sett.", record.retribuzione or "",
+                str(record.settimane), "", "", record.note or ""]
+    return [record.dal, record.al, record.tipo, str(record.giorni), record.retribuzione or "", "",
+            str(record.gruppo) if record.gruppo else "", record.codice_qualifica or "", record.note or ""]
+
+
+def genera_pdf(path, seme=0, pagine=10, righe_per_pagina=20, anni=30, anno_inizio=1980,
+               quota_spettacolo=0.6, quota_disoccupazione=0.05, quota_cavallo_anno=0.1, sesso=None):
+    """
+    Scrive un estratto conto PDF sintetico con il layout delle tabelle INPS.
+
+    Ogni pagina ha una tabella del Regime Generale (unita' "sett.") e una
+    dello Spettacolo (intestazione "Giorni", colonne gruppo, qualifica e
+    note) con i record della pagina; la prima pagina ha anche l'intestazione
+    con nome e codice fiscale. Come negli estratti reali alcune celle vanno
+    su due linee (tipo "P.A.L.S." e alcuni codici qualifica).
+
+    Args:
+        path: File PDF da scrivere
+        seme: Seme del generatore casuale
+        pagine: Numero di pagine (almeno 1)
+        righe_per_pagina: Record per pagina (1-24)
+        anni, anno_inizio, quota_*, sesso: Come in genera_dati
+
+    Returns:
+        I dati che EstrattorePDF(path).estrai() deve restituire.
+    """
+    if pagine < 1:
+        raise ValueError(f"pagine deve essere almeno 1: {pagine}")
+    if not 1 <= righe_per_pagina <= RIGHE_PER_PAGINA_MASSIME:
+        raise ValueError(f"righe_per_pagina deve essere tra 1 e {RIGHE_PER_PAGINA_MASSIME}: {righe_per_pagina}")
+    if not 1 <= anni <= ANNI_MASSIMI:
+        raise ValueError(f"anni deve essere tra 1 e {ANNI_MASSIMI}: {anni}")
+
+    rng = random.Random(seme)
+    sesso = sesso or rng.choice("MF")
+    records = _genera_record(rng, anni, pagine * righe_per_pagina, anno_inizio, quota_spettacolo,
+                             quota_disoccupazione, quota_cavallo_anno)
+    metadata = _metadata(rng, sesso, path, pagine)
+
+    contenuto = []
+    for inizio in range(0, len(records), righe_per_pagina):
+        righe = {"regime_generale": [], "spettacolo": []}
+        for sezione, record in records[inizio:inizio + righe_per_pagina]:
+            if sezione == "regime_generale":
+                righe[sezione].append(_riga_pdf(sezione, record))
+                continue
+            record.tipo = record.tipo.replace("P.A.L.S. ", "P.A.L.S.\n")
+            if record.gruppo and rng.random() < 0.05:
+                record.note = rng.choice(("3", "O"))
+            riga = _riga_pdf(sezione, record)
+            if record.codice_qualifica and rng.random() < 0.1:
+                riga[7] = f"{riga[7][:2]}\n{riga[7][2:]}"  # L'estrattore ricompone il codice
+            righe[sezione].append(riga)
+
+        testi = []
+        if not inizio:
+            testi = ["INPS Estratto conto contributivo",
+                     f"Estratto conto di {metadata['cognome']} {metadata['nome']} {metadata['codice_fiscale']}"]
+        tabelle = [(intestazione, righe[sezione])
+                   for intestazione, sezione in ((INTESTAZIONE, "regime_generale"),
+                                                 (INTESTAZIONE_SPETTACOLO, "spettacolo"))
+                   if righe[sezione]]
+        contenuto.append((testi, tabelle))
+
+    scrivi_pdf(path, contenuto)
+    return _dati(records, metadata)
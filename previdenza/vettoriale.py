@@ -0,0 +1,382 @@
+"""
+Calcolo vettoriale dei contributi per molte carriere (NumPy)
+
+CalcolatoreVettoriale restituisce per ogni persona lo stesso risultato di
+CalcolatoreContributi.calcola(), ma lavora sui record di tante persone
+insieme. I record sono colonne NumPy (ColonneRecord), e i totali per persona
+e anno sono matrici persone x anni riempite con bincount e OR di maschere
+di mesi, senza un oggetto Python per record.
+
+Le regole sono quelle del calcolatore scalare, comprese le sue
+semplificazioni:
+- cap di 312 giorni reali
+- esclusione dei mesi con note "3"/"O"
+- ere dello spettacolo (ERE_SPETTACOLO)
+- completamento dell'ultimo anno
+- proiezione all'obiettivo
+
+Le persone sono elaborate a blocchi, per tenere limitata la memoria delle
+matrici.
+
+Richiede numpy, importato solo da questo modulo.
+"""
+
+import numpy as np
+
+from .calcolatore import ERE_SPETTACOLO, CalcolatoreContributi
+from .mesi import ANNO_INTERO
+from .record import compatta
+
+# Numero di mesi di ogni maschera a 12 bit
+_CONTA = np.array([bin(m).count("1") for m in range(ANNO_INTERO + 1)], dtype=np.int64)
+
+# ERE_SPETTACOLO in colonne: inizio come ordinale di mese, giorni/anno (indeterminato: -1 se non conta)
+_INIZIO_ERE = np.array([anno * 12 + mese - 1 for (anno, mese), *_ in ERE_SPETTACOLO], dtype=np.int64)
+_GIORNI_GRUPPO1 = np.array([era[1] for era in ERE_SPETTACOLO], dtype=np.int64)
+_GIORNI_ALTRI = np.array([era[2] for era in ERE_SPETTACOLO], dtype=np.int64)
+_GIORNI_INDET = np.array([-1 if era[3] is None else era[3] for era in ERE_SPETTACOLO], dtype=np.int64)
+
+# Ordinale di inizio del tempo indeterminato per chi non lo e' mai
+_MAI = np.iinfo(np.int64).max
+
+
+def ordinale(anno, mese):
+    """Ordinale di mese: anno * 12 + (mese - 1)"""
+    return anno * 12 + mese - 1
+
+
+class ColonneRecord:
+    """
+    Record contributivi di molte persone in colonne NumPy, un elemento per record.
+
+    Colonne:
+        persona: indice della persona (0 .. numero di persone - 1)
+        inizio, fine: ordinali di mese di dal/al (vedi ordinale())
+        spettacolo: True per i record dello Spettacolo (unita' giorni), False per il Regime Generale
+        quantita: settimane (Regime Generale) o giorni (Spettacolo, 0 se assenti)
+        gruppo: gruppo spettacolo (0 se assente)
+        disoccupazione: True per i record del Regime Generale con note "3"/"O"
+
+    I record dello Spettacolo di una persona vanno nell'ordine dell'estratto:
+    per ogni anno conta il gruppo dell'ultimo periodo.
+    """
+
+    def __init__(self, persona, inizio, fine, spettacolo, quantita, gruppo, disoccupazione):
+        self.persona = np.asarray(persona, dtype=np.int64)
+        self.inizio = np.asarray(inizio, dtype=np.int64)
+        self.fine = np.asarray(fine, dtype=np.int64)
+        self.spettacolo = np.asarray(spettacolo, dtype=bool)
+        self.quantita = np.asarray(quantita, dtype=np.int64)
+        self.gruppo = np.asarray(gruppo, dtype=np.int64)
+        self.disoccupazione = np.asarray(disoccupazione, dtype=bool)
+
+    def __len__(self):
+        return len(self.persona)
+
+    @classmethod
+    def da_dati(cls, elenco_dati):
+        """Colonne dai dati estratti di piu' persone (dizionari o record compatti), nell'ordine"""
+        colonne = ([], [], [], [], [], [], [])
+        persona, inizio, fine, spettacolo, quantita, gruppo, disoccupazione = colonne
+        for indice, dati in enumerate(elenco_dati):
+            for record in compatta("regime_generale", dati["regime_generale"]):
+                persona.append(indice)
+                inizio.append(ordinale(record.anno_dal, record.mese_dal))
+                fine.append(ordinale(record.anno_al, record.mese_al))
+                spettacolo.append(False)
+                quantita.append(record.settimane)
+                gruppo.append(0)
+                disoccupazione.append(record.note in ("3", "O"))
+            for record in compatta("spettacolo", dati["spettacolo"]):
+                persona.append(indice)
+                inizio.append(ordinale(record.anno_dal, record.mese_dal))
+                fine.append(ordinale(record.anno_al, record.mese_al))
+                spettacolo.append(True)
+                quantita.append(record.giorni or 0)
+                gruppo.append(record.gruppo or 0)
+                disoccupazione.append(False)
+        return cls(*colonne)
+
+    def seleziona(self, indici):
+        """Sottoinsieme dei record (indici o maschera booleana)"""
+        return ColonneRecord(self.persona[indici], self.inizio[indici], self.fine[indici],
+                             self.spettacolo[indici], self.quantita[indici], self.gruppo[indici],
+                             self.disoccupazione[indici])
+
+
+def _intervallo(mese_inizio, mese_fine):
+    """mesi.intervallo su array di mesi (1-12)"""
+    ampiezza = np.maximum(mese_fine - mese_inizio + 1, 0)
+    maschera = ((1 << ampiezza) - 1) << np.maximum(mese_inizio - 1, 0)
+    return np.where(mese_fine < mese_inizio, 0, maschera)
+
+
+def _per_anno(anno_inizio, mese_inizio, anno_fine, mese_fine, anni_intermedi=True):
+    """
+    mesi.per_anno su array di periodi: (indice del periodo, anno, maschera) per ogni anno toccato.
+
+    Con anni_intermedi=False restano solo il primo e l'ultimo anno, come per i
+    record spettacolo senza gruppo nel calcolatore scalare.
+    """
+    stesso_anno = anno_fine == anno_inizio
+    if anni_intermedi:
+        quanti = np.where(anno_fine > anno_inizio, anno_fine - anno_inizio + 1, np.where(stesso_anno, 1, 2))
+    else:
+        quanti = np.where(stesso_anno, 1, 2)
+    periodo = np.repeat(np.arange(len(quanti)), quanti)
+    passo = np.arange(len(periodo)) - np.repeat(np.cumsum(quanti) - quanti, quanti)
+
+    ai, mi, af, mf = anno_inizio[periodo], mese_inizio[periodo], anno_fine[periodo], mese_fine[periodo]
+    solo = quanti[periodo] == 1
+    ultimo = (passo == quanti[periodo] - 1) & ~solo
+    anno = np.where(ultimo, af, ai + passo)
+    maschera = np.where(solo, _intervallo(mi, mf),
+                        np.where(passo == 0, _intervallo(mi, 12),
+                                 np.where(ultimo, _intervallo(1, mf), ANNO_INTERO)))
+    return periodo, anno, maschera
+
+
+def _ultimi(chiavi):
+    """Chiavi distinte e indice della loro ultima occorrenza"""
+    distinte, primo = np.unique(chiavi[::-1], return_index=True)
+    return distinte, len(chiavi) - 1 - primo
+
+
+def _teorico_spettacolo(anni, maschere, gruppi, inizio_ti):
+    """CalcolatoreContributi._calcola_teorico_spettacolo_con_mesi su array (inizio_ti: ordinale)"""
+    totale = np.zeros(len(anni), dtype=np.int64)
+    gruppo1 = gruppi == 1
+    for bit in range(12):
+        mese = anni * 12 + bit
+        era = np.searchsorted(_INIZIO_ERE, mese, side="right") - 1
+        giorni = np.where(gruppo1, _GIORNI_GRUPPO1[era], _GIORNI_ALTRI[era])
+        indeterminato = (_GIORNI_INDET[era] >= 0) & (mese >= inizio_ti)
+        giorni = np.where(indeterminato, _GIORNI_INDET[era], giorni)
+        totale += giorni * ((maschere >> bit) & 1)
+    return np.rint(totale / 12).astype(np.int64)
+
+
+def _somma(celle, valori, dimensione):
+    """Somma dei valori per cella"""
+    return np.bincount(celle, weights=valori, minlength=dimensione).astype(np.int64)
+
+
+class CalcolatoreVettoriale:
+    """Calcola i contributi REALI e TEORICI di molte persone con NumPy"""
+
+    def __init__(self, colonne, sessi, tempo_indeterminato_da=None, blocco=4096):
+        """
+        Args:
+            colonne: ColonneRecord di tutte le persone
+            sessi: sesso ('M'/'F'/None) di ogni persona; la lunghezza e' il numero di persone
+            tempo_indeterminato_da: None, "sempre", "DD/MM/YYYY", oppure una sequenza con un valore per persona
+            blocco: persone elaborate insieme (limita la memoria delle matrici)
+        """
+        self.colonne = colonne
+        self.sessi = list(sessi)
+        if tempo_indeterminato_da is None or isinstance(tempo_indeterminato_da, str):
+            tempo_indeterminato_da = [tempo_indeterminato_da] * len(self.sessi)
+        elif len(tempo_indeterminato_da) != len(self.sessi):
+            raise ValueError("tempo_indeterminato_da: serve un valore per persona")
+        inizi = [CalcolatoreContributi._risolvi_inizio_ti(ti) for ti in tempo_indeterminato_da]
+        self.inizio_ti = np.array([_MAI if i is None else ordinale(*i) for i in inizi], dtype=np.int64)
+        self.obiettivo_mesi = np.array(
+            [CalcolatoreContributi.OBIETTIVO_DONNA if s == 'F' else CalcolatoreContributi.OBIETTIVO_UOMO
+             for s in self.sessi], dtype=np.int64)
+        self.blocco = blocco
+
+    def calcola(self):
+        """Risultati per persona, nello stesso formato di CalcolatoreContributi.calcola()"""
+        colonne = self.colonne
+        ordine = np.argsort(colonne.persona, kind="stable")  # Per persona, ordine dei record invariato
+        if not np.array_equal(ordine, np.arange(len(ordine))):
+            colonne = colonne.seleziona(ordine)
+
+        risultati = []
+        for inizio in range(0, len(self.sessi), self.blocco):
+            fine = min(inizio + self.blocco, len(self.sessi))
+            da, a = np.searchsorted(colonne.persona, (inizio, fine))
+            parte = colonne.seleziona(slice(da, a))
+            parte.persona = parte.persona - inizio
+            risultati.extend(self._calcola_blocco(parte, inizio, fine))
+        return risultati
+
+    def _calcola_blocco(self, colonne, primo, ultimo):
+        """Calcola le persone da primo a ultimo (esclusa); colonne.persona parte da 0"""
+        persone = ultimo - primo
+        inizio_ti = self.inizio_ti[primo:ultimo]
+        obiettivo = self.obiettivo_mesi[primo:ultimo]
+
+        anno_dal, mese_dal = np.divmod(colonne.inizio, 12)
+        anno_al, mese_al = np.divmod(colonne.fine, 12)
+        mese_dal += 1
+        mese_al += 1
+        vuoto = len(colonne) == 0
+        anno_zero = 0 if vuoto else int(min(anno_dal.min(), anno_al.min()))
+        anni = 1 if vuoto else int(max(anno_dal.max(), anno_al.max())) - anno_zero + 1
+        celle = persone * anni
+        persona = colonne.persona
+
+        def cella(p, anno):
+            return p * anni + (anno - anno_zero)
+
+        reale = np.zeros(celle, dtype=np.int64)
+        teorico = np.zeros(celle, dtype=np.int64)
+        mesi_anno = np.zeros(celle, dtype=np.int64)
+        con_reale = np.zeros(celle, dtype=bool)      # Anni presenti in "reale"
+        con_teorico = np.zeros(celle, dtype=bool)    # Anni presenti in "teorico" e "mesi"
+
+        # Regime Generale: reale = settimane * 6 sull'anno di inizio
+        generale = ~colonne.spettacolo
+        c = cella(persona[generale], anno_dal[generale])
+        reale += _somma(c, colonne.quantita[generale] * 6, celle)
+        con_reale[c] = True
+
+        # Teorico = mesi * 26, esclusi i record di disoccupazione
+        valido = generale & ~colonne.disoccupazione
+        c = cella(persona[valido], anno_dal[valido])
+        num_mesi = colonne.fine[valido] - colonne.inizio[valido] + 1
+        teorico += _somma(c, num_mesi * 26, celle)
+        mesi_anno += _somma(c, num_mesi, celle)
+        con_teorico[c] = True
+
+        # Mesi esclusi per disoccupazione (note "3"/"O")
+        esclusi = np.zeros(celle, dtype=np.int64)
+        sel = np.flatnonzero(generale & colonne.disoccupazione)
+        periodo, anno, maschera = _per_anno(anno_dal[sel], mese_dal[sel], anno_al[sel], mese_al[sel])
+        np.bitwise_or.at(esclusi, cella(persona[sel][periodo], anno), maschera)
+
+        # Spettacolo: reale = giorni sull'anno di inizio
+        sel = colonne.spettacolo & (colonne.quantita != 0)
+        c = cella(persona[sel], anno_dal[sel])
+        reale += _somma(c, colonne.quantita[sel], celle)
+        con_reale[c] = True
+
+        # Record con gruppo: mesi coperti e gruppo dell'ultimo periodo di ogni anno
+        mesi_con_gruppo = np.zeros(celle, dtype=np.int64)
+        gruppo_anno = np.zeros(celle, dtype=np.int64)
+        con_gruppo = np.zeros(celle, dtype=bool)
+        sel = np.flatnonzero(colonne.spettacolo & (colonne.gruppo != 0))
+        periodo, anno, maschera = _per_anno(anno_dal[sel], mese_dal[sel], anno_al[sel], mese_al[sel])
+        c = cella(persona[sel][periodo], anno)
+        np.bitwise_or.at(mesi_con_gruppo, c, maschera)
+        con_gruppo[c] = True
+        distinte, indici = _ultimi(c)
+        gruppo_anno[distinte] = colonne.gruppo[sel][periodo][indici]
+
+        # Ultimo regime e ultimo gruppo di ogni persona
+        persona_gruppo = persona[sel]
+        ha_gruppo = np.bincount(persona_gruppo, minlength=persone) > 0
+        regime_generale = ~ha_gruppo & (np.bincount(persona[generale], minlength=persone) > 0)
+        ultimo_gruppo = np.full(persone, 2, dtype=np.int64)  # "ultimo_gruppo or 2"
+        distinte, indici = _ultimi(persona_gruppo)
+        ultimo_gruppo[distinte] = colonne.gruppo[sel][indici]
+
+        # Record senza gruppo con giorni (es. Servizio Militare): primo e ultimo anno, giorni al primo
+        mesi_senza_gruppo = np.zeros(celle, dtype=np.int64)
+        sel = np.flatnonzero(colonne.spettacolo & (colonne.gruppo == 0) & (colonne.quantita != 0))
+        periodo, anno, maschera = _per_anno(anno_dal[sel], mese_dal[sel], anno_al[sel], mese_al[sel],
+                                            anni_intermedi=False)
+        np.bitwise_or.at(mesi_senza_gruppo, cella(persona[sel][periodo], anno), maschera)
+        giorni_senza_gruppo = _somma(cella(persona[sel], anno_dal[sel]), colonne.quantita[sel], celle)
+
+        # TEORICO spettacolo con gruppo: unisce i mesi senza gruppo dello stesso anno, toglie gli esclusi
+        c = np.flatnonzero(con_gruppo)
+        coperti = (mesi_con_gruppo[c] | mesi_senza_gruppo[c]) & ~esclusi[c]
+        mesi_senza_gruppo[c] = 0
+        num_mesi = _CONTA[coperti]
+        ok = num_mesi > 0
+        c, coperti, num_mesi = c[ok], coperti[ok], num_mesi[ok]
+        teorico[c] += _teorico_spettacolo(c % anni + anno_zero, coperti, gruppo_anno[c], inizio_ti[c // anni])
+        mesi_anno[c] += num_mesi
+        con_teorico[c] = True
+
+        # TEORICO senza gruppo rimasti: i giorni reali come teorici
+        num_mesi = _CONTA[mesi_senza_gruppo]
+        c = np.flatnonzero(num_mesi)
+        teorico[c] += giorni_senza_gruppo[c]
+        mesi_anno[c] += num_mesi[c]
+        con_teorico[c] = True
+
+        # Cap massimo annuo dei giorni reali
+        np.minimum(reale, 312, out=reale)
+
+        # Range degli anni
+        presenti = (con_reale | con_teorico).reshape(persone, anni)
+        if not presenti.any(axis=1).all():
+            vuota = primo + int(np.flatnonzero(~presenti.any(axis=1))[0])
+            raise ValueError(f"Persona {vuota}: nessun periodo contributivo")
+        primo_anno = presenti.argmax(axis=1)
+        ultimo_anno = anni - 1 - presenti[:, ::-1].argmax(axis=1)
+
+        # Completa l'ultimo anno a 12 mesi (meno gli esclusi)
+        tutte = np.arange(persone)
+        c = cella(tutte, ultimo_anno + anno_zero)
+        massimo = 12 - _CONTA[esclusi[c]]
+        sel = (mesi_anno[c] > 0) & (mesi_anno[c] < massimo)
+        c, massimo, p = c[sel], massimo[sel], tutte[sel]
+        mesi_anno[c] = massimo
+        teorico[c] = np.where(regime_generale[p], massimo * 26,
+                              _teorico_spettacolo(ultimo_anno[p] + anno_zero, ANNO_INTERO & ~esclusi[c],
+                                                  ultimo_gruppo[p], inizio_ti[p]))
+
+        # Estende fino all'obiettivo: anni successivi da 12 mesi, l'ultimo con i mesi rimanenti
+        mancanti = obiettivo - mesi_anno.reshape(persone, anni).sum(axis=1)
+        anni_in_piu = np.where(mancanti > 0, (mancanti + 11) // 12, 0)
+        larghezza = max(anni, int((ultimo_anno + anni_in_piu).max()) + 1)
+        if larghezza > anni:
+            def allarga(a):
+                nuova = np.zeros((persone, larghezza), dtype=a.dtype)
+                nuova[:, :anni] = a.reshape(persone, anni)
+                return nuova.ravel()
+            reale, teorico, mesi_anno = allarga(reale), allarga(teorico), allarga(mesi_anno)
+            con_reale, con_teorico = allarga(con_reale), allarga(con_teorico)
+            anni = larghezza
+
+        p = np.repeat(tutte, anni_in_piu)
+        passo = np.arange(len(p)) - np.repeat(np.cumsum(anni_in_piu) - anni_in_piu, anni_in_piu)
+        anno = ultimo_anno[p] + 1 + passo + anno_zero
+        mesi_estesi = np.minimum(12, mancanti[p] - 12 * passo)
+        c = cella(p, anno)
+        mesi_anno[c] = mesi_estesi
+        teorico[c] = np.where(regime_generale[p], mesi_estesi * 26,
+                              _teorico_spettacolo(anno, _intervallo(1, mesi_estesi), ultimo_gruppo[p], inizio_ti[p]))
+        reale[c] = 0
+        con_reale[c] = True
+        con_teorico[c] = True
+        anno_proiezione = [anno + 1 + anno_zero if in_piu else None
+                           for anno, in_piu in zip(ultimo_anno.tolist(), anni_in_piu.tolist())]
+        ultimo_anno = ultimo_anno + anni_in_piu
+
+        # Dizionari per persona
+        reale_per_persona = self._dizionari(con_reale, reale, persone, anni, anno_zero)
+        teorico_per_persona = self._dizionari(con_teorico, teorico, persone, anni, anno_zero)
+        mesi_per_persona = self._dizionari(con_teorico, mesi_anno, persone, anni, anno_zero)
+        anno_min = (primo_anno + anno_zero).tolist()
+        anno_max = (ultimo_anno + anno_zero).tolist()
+
+        risultati = []
+        for i in range(persone):
+            sesso = self.sessi[primo + i]
+            risultati.append({
+                "reale": reale_per_persona[i],
+                "teorico": teorico_per_persona[i],
+                "mesi": mesi_per_persona[i],
+                "anno_min": anno_min[i],
+                "anno_max": anno_max[i],
+                "anno_proiezione": anno_proiezione[i],
+                "sesso": sesso,
+                "obiettivo_mesi": int(obiettivo[i]),
+                "obiettivo_label": "41a 10m" if sesso == 'F' else "42a 10m"
+            })
+        return risultati
+
+    @staticmethod
+    def _dizionari(presenti, valori, persone, anni, anno_zero):
+        """Un dizionario {anno: valore} per persona, con le sole celle presenti"""
+        celle = np.flatnonzero(presenti)
+        limiti = np.searchsorted(celle, np.arange(persone + 1) * anni).tolist()
+        chiavi = (celle % anni + anno_zero).tolist()
+        valori = valori[celle].tolist()
+        return [dict(zip(chiavi[limiti[i]:limiti[i + 1]], valori[limiti[i]:limiti[i + 1]]))
+                for i in range(persone)]
@@ -0,0 +1,158 @@
+import os
+import tempfile
+import unittest
+
+from previdenza import core
+from previdenza.cache import CacheEstrazioni, CacheLayout, CacheRisultati
+from previdenza.calcolatore import CalcolatoreContributi
+from previdenza.record import compatta_dati
+
+
+class TestCacheEstrazioni(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cartella = os.path.join(self.tmp.name, "cache")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _scrivi_pdf(self, nome, contenuto):
+        path = os.path.join(self.tmp.name, nome)
+        with open(path, "wb") as f:
+            f.write(contenuto)
+        return path
+
+    def test_chiave_dipende_da_contenuto_e_versione(self):
+        cache = CacheEstrazioni(self.cartella)
+        a = self._scrivi_pdf("a.pdf", b"%PDF-uno")
+        b = self._scrivi_pdf("b.pdf", b"%PDF-uno")
+        c = self._scrivi_pdf("c.pdf", b"%PDF-due")
+
+        self.assertEqual(cache.chiave(a, "1"), cache.chiave(b, "1"))
+        self.assertNotEqual(cache.chiave(a, "1"), cache.chiave(c, "1"))
+        self.assertNotEqual(cache.chiave(a, "1"), cache.chiave(a, "2"))
+
+    def test_lettura_scrittura(self):
+        cache = CacheEstrazioni(self.cartella)
+        dati = {"regime_generale": [{"dal": "01/01/1990", "settimane": 52}], "spettacolo": []}
+
+        self.assertIsNone(cache.leggi("abc"))
+        cache.scrivi("abc", dati)
+        self.assertEqual(cache.leggi("abc"), dati)
+
+    def test_eliminazione_lru(self):
+        dati = {"regime_generale": [], "spettacolo": [], "metadata": {"nome": "x" * 200}}
+        cache = CacheEstrazioni(self.cartella, limite_byte=10 ** 9)
+        for i, chiave in enumerate(("vecchia", "media", "recente")):
+            cache.scrivi(chiave, dati)
+            os.utime(cache._percorso(chiave), (1000 + i, 1000 + i))
+
+        # Una lettura rende "vecchia" la voce usata piu' di recente
+        cache.leggi("vecchia")
+
+        dimensione = os.path.getsize(cache._percorso("media"))
+        cache.limite_byte = 2 * dimensione
+        cache._rispetta_limite()
+
+        self.assertIsNotNone(cache.leggi("vecchia"))
+        self.assertIsNone(cache.leggi("media"))
+        self.assertIsNotNone(cache.leggi("recente"))
+
+
+class TestCacheLayout(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cartella = os.path.join(self.tmp.name, "cache")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_modelli_persistenti_e_uniti(self):
+        primo = CacheLayout(self.cartella)
+        secondo = CacheLayout(self.cartella)
+        self.assertIsNone(primo.leggi("595x842|42|97"))
+        self.assertIsNone(secondo.leggi("842x595|42|97"))
+
+        primo.impara("595x842|42|97", [40.0, 95.0, 555.0])
+        secondo.impara("842x595|42|97", [40.0, 800.0])
+        primo.salva()
+        secondo.salva()
+
+        nuovo = CacheLayout(self.cartella)
+        self.assertEqual(nuovo.leggi("595x842|42|97"), [40.0, 95.0, 555.0])
+        self.assertEqual(nuovo.leggi("842x595|42|97"), [40.0, 800.0])
+
+    def test_svuota_non_tocca_i_modelli(self):
+        modelli = CacheLayout(self.cartella)
+        modelli.impara("595x842|42|97", [40.0, 555.0])
+        modelli.salva()
+        CacheEstrazioni(self.cartella).svuota()
+        self.assertEqual(CacheLayout(self.cartella).leggi("595x842|42|97"), [40.0, 555.0])
+
+
+class TestCacheRisultati(unittest.TestCase):
+    DATI = {
+        "regime_generale": [{"dal": "01/01/1990", "al": "31/12/1990", "settimane": 52, "unita": "settimane"}],
+        "spettacolo": [{"dal": "01/01/1998", "al": "31/12/1998", "giorni": 312, "gruppo": 1, "unita": "giorni"}],
+        "metadata": {"codice_fiscale": "RSSMRA80A01H501U"},
+    }
+
+    def _risultato(self, anni):
+        return {"reale": dict.fromkeys(range(anni), 1), "teorico": {}, "mesi": {}, "anno_min": 0}
+
+    def test_chiave_dai_soli_campi_di_calcolo(self):
+        chiave = CacheRisultati.chiave(self.DATI, "M", None)
+        altro_metadata = dict(self.DATI, metadata={"file": "altro.pdf"})
+        self.assertEqual(CacheRisultati.chiave(altro_metadata, "M", None), chiave)
+        self.assertEqual(CacheRisultati.chiave(compatta_dati(self.DATI), "M", None), chiave)
+        self.assertNotEqual(CacheRisultati.chiave(self.DATI, "F", None), chiave)
+        self.assertNotEqual(CacheRisultati.chiave(self.DATI, "M", "sempre"), chiave)
+        modificati = {"regime_generale": [dict(self.DATI["regime_generale"][0], note="3")],
+                      "spettacolo": self.DATI["spettacolo"]}
+        self.assertNotEqual(CacheRisultati.chiave(modificati, "M", None), chiave)
+
+    def test_lru_per_numero_di_voci(self):
+        cache = CacheRisultati(max_voci=2)
+        cache.scrivi("a", self._risultato(1))
+        cache.scrivi("b", self._risultato(1))
+        cache.leggi("a")  # "b" diventa la meno recente
+        cache.scrivi("c", self._risultato(1))
+        self.assertIsNone(cache.leggi("b"))
+        self.assertIsNotNone(cache.leggi("a"))
+        self.assertIsNotNone(cache.leggi("c"))
+        self.assertEqual((cache.successi, cache.mancati), (3, 1))
+
+    def test_lru_per_byte(self):
+        dimensione = CacheRisultati._dimensione(self._risultato(50))
+        cache = CacheRisultati(limite_byte=2 * dimensione)
+        for chiave in "abc":
+            cache.scrivi(chiave, self._risultato(50))
+        self.assertEqual(len(cache), 2)
+        self.assertLessEqual(cache.byte, cache.limite_byte)
+        self.assertIsNone(cache.leggi("a"))
+        # Una voce piu' grande dell'intero limite non entra
+        cache.scrivi("d", self._risultato(500))
+        self.assertIsNone(cache.leggi("d"))
+
+    def test_copia_indipendente(self):
+        cache = CacheRisultati()
+        risultato = self._risultato(3)
+        cache.scrivi("a", risultato)
+        risultato["reale"][0] = 99
+        letto = cache.leggi("a")
+        letto["reale"][1] = 99
+        self.assertEqual(cache.leggi("a")["reale"], {0: 1, 1: 1, 2: 1})
+
+    def test_calcola_dati(self):
+        core.CACHE_RISULTATI.svuota()
+        atteso = CalcolatoreContributi(self.DATI, sesso="F", tempo_indeterminato_da="sempre").calcola()
+        for _ in range(3):
+            self.assertEqual(core.calcola_dati(self.DATI, "F", "sempre"), atteso)
+        self.assertEqual(core.CACHE_RISULTATI.statistiche()["successi"], 2)
+        self.assertEqual(core.CACHE_RISULTATI.statistiche()["mancati"], 1)
+        self.assertEqual(core.calcola_dati(self.DATI, "F", "sempre", usa_cache=False), atteso)
+        self.assertEqual(core.CACHE_RISULTATI.statistiche()["mancati"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,9 @@
+import random
 import unittest
 
 from previdenza.calcolatore import CalcolatoreContributi
+from previdenza.record import RecordGenerale, RecordSpettacolo, compatta_dati, esporta_dati
+from previdenza.sintetico import genera_dati
 
 
 def _calcola_senza_estensione(dati, sesso="M"):
@@ -10,6 +13,11 @@ def _calcola_senza_estensione(dati, sesso="M"):
     return calcolatore.calcola()
 
 
+def _data_casuale(rng):
+    """None, "sempre" o una data di passaggio a tempo indeterminato tra il 1985 e il 2045"""
+    return rng.choice((None, "sempre", f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1985, 2045)}"))
+
+
 class TestRegimeGenerale(unittest.TestCase):
     def test_regime_generale_multi_anno(self):
         dati = {
@@ -320,3 +328,119 @@ class TestSpettacoloPost1997(unittest.TestCase):
         self.assertEqual(risultati["teorico"][1997], 282)
         # reale cappato a 312 (cap massimo annuo)
         self.assertEqual(risultati["reale"][1997], 312)
+
+    def test_tariffe_1997_con_tempo_indeterminato_da_data(self):
+        calcolatore = CalcolatoreContributi({"regime_generale": [], "spettacolo": []},
+                                            tempo_indeterminato_da="15/10/1997")
+        # Gen-lug: 260 (det); ago-set: 260 (det); ott-dic: 312 (indet)
+        self.assertEqual(calcolatore._calcola_teorico_spettacolo_con_mesi(1997, 0xFFF, 2),
+                         round((260 * 9 + 312 * 3) / 12))
+        # Prima del 1997 il contratto non conta
+        self.assertEqual(calcolatore._calcola_teorico_spettacolo_con_mesi(1992, 0xFFF, 1), 60)
+        self.assertEqual(calcolatore._calcola_teorico_spettacolo_con_mesi(1995, 0xFFF, 2), 260)
+        self.assertEqual(calcolatore._calcola_teorico_spettacolo_con_mesi(1998, 0b111, 1), 78)
+
+
+class TestRecordCompatti(unittest.TestCase):
+    DATI = {
+        "regime_generale": [
+            {"dal": "01/01/1990", "al": "31/12/1990", "tipo": "Lavoro dipendente",
+             "settimane": 52, "unita": "settimane", "retribuzione": "12.345,67"},
+            {"dal": "01/01/2007", "al": "30/06/2007", "tipo": "Disoccupazione",
+             "settimane": 5, "unita": "settimane", "note": "3"},
+        ],
+        "spettacolo": [
+            {"dal": "01/01/1996", "al": "31/12/1996", "tipo": "P.A.L.S. Obbligatoria",
+             "giorni": 312, "unita": "giorni", "gruppo": 1, "codice_qualifica": "113",
+             "retribuzione": "19.041,88"},
+            {"dal": "01/01/2007", "al": "31/12/2007", "tipo": "P.A.L.S. Obbligatoria",
+             "giorni": None, "unita": "giorni", "gruppo": 2},
+        ],
+        "metadata": {"codice_fiscale": "RSSMRA80A01H501U"},
+    }
+
+    def test_esportazione_uguale_ai_dizionari(self):
+        compatti = compatta_dati(self.DATI)
+        self.assertIsInstance(compatti["regime_generale"][0], RecordGenerale)
+        self.assertIsInstance(compatti["spettacolo"][0], RecordSpettacolo)
+        self.assertEqual(esporta_dati(compatti), self.DATI)
+
+    def test_date_lette_una_volta(self):
+        record = compatta_dati(self.DATI)["spettacolo"][0]
+        self.assertEqual((record.anno_dal, record.mese_dal, record.anno_al, record.mese_al),
+                         (1996, 1, 1996, 12))
+        # Il JSON conserva le stringhe originali
+        self.assertEqual(record.a_dict()["dal"], "01/01/1996")
+
+    def test_calcolo_identico_con_record_compatti(self):
+        for ti in (None, "sempre", "01/03/2007"):
+            with self.subTest(tempo_indeterminato_da=ti):
+                atteso = CalcolatoreContributi(self.DATI, sesso="F", tempo_indeterminato_da=ti).calcola()
+                compatti = compatta_dati(self.DATI)
+                risultato = CalcolatoreContributi(compatti, sesso="F", tempo_indeterminato_da=ti).calcola()
+                self.assertEqual(risultato, atteso)
+
+
+class TestScenariTempoIndeterminato(unittest.TestCase):
+    DATI = {
+        "regime_generale": [
+            {"dal": "01/01/1990", "al": "31/12/1991", "settimane": 104},
+            {"dal": "01/03/2002", "al": "31/05/2002", "settimane": 13, "note": "3"},
+        ],
+        "spettacolo": [
+            {"dal": "01/01/1995", "al": "30/06/1998", "giorni": 500, "gruppo": 2},
+            {"dal": "01/09/1998", "al": "31/12/2001", "giorni": 700, "gruppo": 1},
+            {"dal": "01/02/2002", "al": "30/09/2003", "giorni": 300, "gruppo": 2},
+            {"dal": "01/01/1996", "al": "31/03/1996", "giorni": 60},
+        ],
+    }
+
+    def test_uguale_ai_calcoli_completi(self):
+        date = [None, "sempre"] + [f"{giorno:02d}/{mese:02d}/{anno}" for anno in range(1994, 2050, 3)
+                                   for mese in range(1, 13, 2) for giorno in (1, 20)]
+        for ti in (None, "01/08/1997"):
+            with self.subTest(tempo_indeterminato_da=ti):
+                calcolatore = CalcolatoreContributi(self.DATI, sesso="F", tempo_indeterminato_da=ti)
+                righe = calcolatore.scenari_tempo_indeterminato(date)
+                for data, riga in zip(date, righe):
+                    completo = CalcolatoreContributi(self.DATI, sesso="F", tempo_indeterminato_da=data)
+                    risultati = completo.calcola()
+                    self.assertEqual(riga, {
+                        "tempo_indeterminato_da": data,
+                        "totale_teorico": sum(risultati["teorico"].values()),
+                        "totale_mesi": sum(risultati["mesi"].values()),
+                        "anno_obiettivo": completo.anno_obiettivo(),
+                    })
+
+    def test_aggiorna_uguale_a_calcolo_da_zero(self):
+        date = (None, "sempre", "01/08/1997", "15/03/1999", "01/01/2002", "01/07/2030")
+        calcolatore = CalcolatoreContributi(self.DATI, sesso="M")
+        calcolatore.calcola()
+        for data in date + date[::-1]:
+            with self.subTest(tempo_indeterminato_da=data):
+                atteso = CalcolatoreContributi(self.DATI, sesso="M", tempo_indeterminato_da=data).calcola()
+                self.assertEqual(calcolatore.aggiorna(data), atteso)
+
+    def test_aggiorna_su_carriere_casuali(self):
+        # 60 carriere sintetiche, 25 cambi di data ciascuna: 1500 confronti con un calcolo da zero
+        rng = random.Random(11)
+        for seme in range(60):
+            dati = genera_dati(seme, anni=rng.randint(1, 45), record=rng.randint(10, 400),
+                               anno_inizio=rng.randint(1975, 2000))
+            sesso = rng.choice(("M", "F", None))
+            calcolatore = CalcolatoreContributi(dati, sesso=sesso, tempo_indeterminato_da=_data_casuale(rng))
+            calcolatore.calcola()
+            for _ in range(25):
+                data = _data_casuale(rng)
+                with self.subTest(seme=seme, tempo_indeterminato_da=data):
+                    atteso = CalcolatoreContributi(dati, sesso=sesso, tempo_indeterminato_da=data).calcola()
+                    self.assertEqual(calcolatore.aggiorna(data), atteso)
+
+
+class TestStadi(unittest.TestCase):
+    def test_tempi_per_stadio(self):
+        dati = TestScenariTempoIndeterminato.DATI
+        tempi = {}
+        risultati = CalcolatoreContributi(dati, sesso="M").calcola(tempi=tempi)
+        self.assertEqual(list(tempi), [nome for nome, _ in CalcolatoreContributi.STADI])
+        self.assertEqual(risultati, CalcolatoreContributi(dati, sesso="M").calcola())
@@ -0,0 +1,244 @@
+import importlib.util
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from previdenza import core
+from previdenza.calcolatore import CalcolatoreContributi, decodifica_sesso_da_cf
+from previdenza.core import calcola_archivio, elabora_cartella, elabora_pdf, scenari_pdf
+from previdenza.estrattore import EstrattorePDF
+from previdenza.sintetico import genera_pdf
+
+RADICE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Il picco di memoria si misura con il modulo resource (assente su Windows)
+RESOURCE = importlib.util.find_spec("resource") is not None
+
+DATI = [
+    {
+        "regime_generale": [{"dal": "01/01/1990", "al": "31/12/1995", "settimane": 300}],
+        "spettacolo": [{"dal": "01/01/1998", "al": "31/12/2003", "giorni": 900, "gruppo": 2}],
+        "metadata": {"codice_fiscale": "RSSMRA80A41H501U", "cognome": "ROSSI", "nome": "MARIA"},
+    },
+    {
+        "regime_generale": [],
+        "spettacolo": [{"dal": "01/03/1985", "al": "30/06/1999", "giorni": 2000, "gruppo": 1}],
+        "metadata": {"codice_fiscale": "BNCLGU70A01H501U", "cognome": "BIANCHI", "nome": "LUIGI"},
+    },
+]
+
+
+class TestCalcolaArchivio(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _attesi(self, tempo_indeterminato_da):
+        attesi = []
+        for dati, sesso in zip(DATI, ("F", "M")):
+            risultati = CalcolatoreContributi(dati, sesso=sesso, tempo_indeterminato_da=tempo_indeterminato_da).calcola()
+            attesi.append({k: risultati[k] for k in ("reale", "teorico", "mesi")})
+        return attesi
+
+    def _confronta(self, righe, attesi):
+        self.assertEqual(len(righe), len(attesi))
+        for riga, atteso in zip(righe, attesi):
+            self.assertEqual({k: riga[k] for k in ("reale", "teorico", "mesi")}, atteso)
+            self.assertEqual(riga["totale_teorico"], sum(atteso["teorico"].values()))
+
+    def test_jsonl_in_ordine_con_errori(self):
+        path = os.path.join(self.tmp.name, "archivio.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for dati in DATI:
+                f.write(json.dumps(dati) + "\n")
+            f.write("\n{non json\n")
+
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                righe = list(calcola_archivio(path, workers=workers, tempo_indeterminato_da="sempre",
+                                              dimensione_lotto=1))
+                self._confronta(righe[:2], self._attesi("sempre"))
+                self.assertEqual(righe[0]["sorgente"], f"{path}:1")
+                self.assertEqual(righe[0]["sesso"], "F")
+                self.assertEqual(righe[2]["sorgente"], f"{path}:4")
+                self.assertIn("errore", righe[2])
+
+    def test_usa_calcola_dati(self):
+        # Stessa persona due volte: il secondo calcolo viene dalla cache dei risultati
+        path = os.path.join(self.tmp.name, "archivio.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write((json.dumps(DATI[0]) + "\n") * 2)
+        successi = core.CACHE_RISULTATI.successi
+        righe = list(calcola_archivio(path, workers=1))
+        self.assertEqual(righe[0]["teorico"], righe[1]["teorico"])
+        self.assertGreaterEqual(core.CACHE_RISULTATI.successi - successi, 1)
+
+    def test_cli_conta_gli_errori(self):
+        path = os.path.join(self.tmp.name, "archivio.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for dati in DATI:
+                f.write(json.dumps(dati) + "\n")
+            # Il testo "errore": dentro un valore non e' un errore
+            f.write(json.dumps({**DATI[1], "metadata": {"nome": '"errore": '}}) + "\n{non json\n")
+        output = os.path.join(self.tmp.name, "risultati.jsonl")
+
+        uscita = subprocess.run([sys.executable, "-m", "previdenza", "--calcola-json", path, "-o", output],
+                                cwd=RADICE, capture_output=True, text=True)
+        self.assertEqual(uscita.returncode, 1)
+        self.assertIn("Calcolati: 3   Errori: 1", uscita.stderr)
+        with open(output, encoding="utf-8") as f:
+            righe = [json.loads(r) for r in f]
+        self.assertEqual([("errore" in r) for r in righe], [False, False, False, True])
+
+    def test_cartella_di_json(self):
+        for dati in DATI:
+            nome = f"{dati['metadata']['cognome']} {dati['metadata']['nome']}.json"
+            with open(os.path.join(self.tmp.name, nome), "w", encoding="utf-8") as f:
+                json.dump(dati, f, indent=2)  # Come i JSON scritti dalla CLI
+        with open(os.path.join(self.tmp.name, "altro.xlsx"), "w") as f:
+            f.write("non letto")
+
+        righe = list(calcola_archivio(self.tmp.name, workers=1))
+        # Ordine dei file: BIANCHI, ROSSI
+        self._confronta(righe, self._attesi(None)[::-1])
+
+
+class TestRiepilogo(unittest.TestCase):
+    def test_obiettivo_raggiunto(self):
+        with tempfile.TemporaryDirectory() as cartella:
+            path = os.path.join(cartella, "persona.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(DATI[0], f)
+            riga = next(calcola_archivio(path, workers=1))
+        risultati = CalcolatoreContributi(DATI[0], sesso="F").calcola()
+        anno = risultati["anno_max"]
+        # Obiettivo nella proiezione: mese di calendario
+        self.assertEqual(riga["obiettivo_raggiunto"], f"{risultati['mesi'][anno]:02d}/{anno}")
+        # Obiettivo in un anno con contributi: solo l'anno
+        self.assertEqual(core._etichetta_raggiungimento((1990, None)), "1990")
+        self.assertIsNone(core._etichetta_raggiungimento(None))
+
+
+class TestScenariPdf(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pdf_path = os.path.join(self.tmp.name, "estratto.pdf")
+        genera_pdf(self.pdf_path, seme=3, pagine=2, righe_per_pagina=12, anno_inizio=1990)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_uguale_ai_calcoli_completi(self):
+        date = [None, "sempre", "01/03/2000"]
+        righe = scenari_pdf(self.pdf_path, date, usa_cache=False)
+        dati = EstrattorePDF(self.pdf_path).estrai()
+        sesso = decodifica_sesso_da_cf(dati["metadata"]["codice_fiscale"])
+        for data, riga in zip(date, righe):
+            with self.subTest(data=data):
+                risultati = CalcolatoreContributi(dati, sesso, data).calcola()
+                self.assertEqual(riga["tempo_indeterminato_da"], data)
+                self.assertEqual(riga["totale_teorico"], sum(risultati["teorico"].values()))
+
+    def test_cli(self):
+        uscita = subprocess.run([sys.executable, "-m", "previdenza", self.pdf_path, "--scenari-ti", "2000-2000",
+                                 "--no-cache"], cwd=RADICE, capture_output=True, text=True)
+        self.assertEqual(uscita.returncode, 0, uscita.stderr)
+        righe = uscita.stdout.strip().splitlines()
+        self.assertEqual(len(righe), 1 + 2 + 12)  # Intestazione, mai, sempre, 12 mesi
+        self.assertTrue(righe[-1].startswith("01/12/2000"))
+
+    def test_cli_rifiuta_cartella_e_ti(self):
+        for argomenti in ([self.tmp.name, "--scenari-ti"], [os.path.join(self.tmp.name, "*.pdf"), "--scenari-ti"],
+                          [self.pdf_path, "--scenari-ti", "-ti", "01/01/2000"]):
+            with self.subTest(argomenti=argomenti):
+                uscita = subprocess.run([sys.executable, "-m", "previdenza", *argomenti, "--no-cache"],
+                                        cwd=RADICE, capture_output=True, text=True)
+                self.assertEqual(uscita.returncode, 1)
+                self.assertTrue(uscita.stdout.startswith("Errore:"), uscita.stdout)
+                self.assertNotIn("Traceback", uscita.stderr)
+
+
+class TestElaboraPdf(unittest.TestCase):
+    def test_memoria_picco_solo_con_estrazione(self):
+        with tempfile.TemporaryDirectory() as cartella:
+            pdf_path = os.path.join(cartella, "estratto.pdf")
+            genera_pdf(pdf_path, seme=2, pagine=1, righe_per_pagina=6)
+            cache = os.path.join(cartella, "cache")
+            primo = elabora_pdf(pdf_path, salva_json=True, cartella_cache=cache)
+            secondo = elabora_pdf(pdf_path, cartella_cache=cache)
+            with open(primo["json_path"], encoding="utf-8") as f:
+                self.assertNotIn("memoria_picco_mb", json.load(f)["metadata"])
+        if RESOURCE:
+            self.assertGreater(primo["memoria_picco_mb"], 0)
+        # Dati dalla cache: nessuna misura di questa esecuzione
+        self.assertIsNone(secondo["memoria_picco_mb"])
+
+    def test_modelli_layout_solo_se_richiesti(self):
+        with tempfile.TemporaryDirectory() as cartella:
+            pdf_path = os.path.join(cartella, "estratto.pdf")
+            atteso = genera_pdf(pdf_path, seme=3, pagine=2, righe_per_pagina=6)
+            cache = os.path.join(cartella, "cache")
+            modelli = os.path.join(cache, "modelli.layout")
+            self.assertEqual(core.estrai_dati(pdf_path, cartella_cache=cache), atteso)
+            self.assertFalse(os.path.exists(modelli))
+            # Voce di cache separata: i dati senza modelli non vengono riusati
+            primo = elabora_pdf(pdf_path, cartella_cache=cache, modelli_layout=True)
+            if RESOURCE:
+                self.assertIsNotNone(primo["memoria_picco_mb"])
+            self.assertTrue(os.path.exists(modelli))
+            self.assertEqual(core.estrai_dati(pdf_path, cartella_cache=cache, modelli_layout=True), atteso)
+
+
+def _termina_su_rotto(pdf_path, *args, **kwargs):
+    """elabora_pdf che fa terminare il processo sui file "rotto*", come un worker ucciso per memoria"""
+    if os.path.basename(pdf_path).startswith("rotto"):
+        os._exit(1)
+    return _ELABORA_PDF(pdf_path, *args, **kwargs)
+
+
+_ELABORA_PDF = core.elabora_pdf
+
+
+class TestElaboraCartella(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for i in range(3):
+            genera_pdf(os.path.join(self.tmp.name, f"estratto{i}.pdf"), seme=i, pagine=1, righe_per_pagina=6)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _elabora(self):
+        risultati = elabora_cartella(self.tmp.name, workers=2, usa_cache=False)
+        return {os.path.basename(r["pdf_path"]): r for r in risultati}
+
+    def test_pdf_corrotto_non_ferma_gli_altri(self):
+        with open(os.path.join(self.tmp.name, "corrotto.pdf"), "wb") as f:
+            f.write(b"%PDF-1.4 non e' un PDF")
+        risultati = self._elabora()
+        self.assertEqual(set(risultati), {"corrotto.pdf", "estratto0.pdf", "estratto1.pdf", "estratto2.pdf"})
+        self.assertIn("errore", risultati["corrotto.pdf"])
+        for i in range(3):
+            self.assertNotIn("errore", risultati[f"estratto{i}.pdf"])
+            self.assertGreater(risultati[f"estratto{i}.pdf"]["totale_mesi"], 0)
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == "fork",
+                         "la sostituzione di elabora_pdf arriva ai worker solo con fork")
+    def test_worker_terminato_non_ferma_gli_altri(self):
+        genera_pdf(os.path.join(self.tmp.name, "rotto.pdf"), seme=9, pagine=1, righe_per_pagina=6)
+        with mock.patch.object(core, "elabora_pdf", _termina_su_rotto):
+            risultati = self._elabora()
+        self.assertEqual(set(risultati), {"estratto0.pdf", "estratto1.pdf", "estratto2.pdf", "rotto.pdf"})
+        self.assertIn("BrokenProcessPool", risultati["rotto.pdf"]["errore"])
+        for i in range(3):
+            self.assertNotIn("errore", risultati[f"estratto{i}.pdf"])
+
+
+if __name__ == "__main__":
+    unittest.main()
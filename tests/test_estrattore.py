@@ -0,0 +1,231 @@
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pdfplumber
+
+from previdenza.backend import apri_documento, ricostruisci_da_parole
+from previdenza.cache import CacheLayout
+from previdenza.core import sonda_cartella, sonda_pdf
+from previdenza.estrattore import EstrattorePDF
+from previdenza.sintetico import INTESTAZIONE, INTESTAZIONE_SPETTACOLO, genera_pdf, scrivi_pdf
+
+DATI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dati")
+# Il picco di memoria si misura con il modulo resource (assente su Windows)
+RESOURCE = importlib.util.find_spec("resource") is not None
+
+_GENERALE = [
+    ["01/01/1990", "31/12/1990", "Lavoro dipendente", "sett.", "12.345,67", "52", "", "", ""],
+    ["01/01/2007", "31/12/2007", "Disoccupazione", "sett.", "", "5", "", "", "3"],
+]
+_SPETTACOLO = [
+    ["01/01/1996", "31/12/1996", "P.A.L.S.\nObbligatoria", "312", "19.041,88", "", "1", "113", ""],
+    ["01/01/1997", "31/12/1997", "Servizio Militare", "", "1.624,77", "", "2", "20\n1", ""],
+]
+
+
+class TestClassificazioneRighe(unittest.TestCase):
+    def test_corpus_righe_campione(self):
+        # Record attesi catturati dall'implementazione precedente di _processa_riga
+        with open(os.path.join(DATI, "righe_campione.json"), encoding="utf-8") as f:
+            corpus = json.load(f)
+
+        estrattore = EstrattorePDF("corpus")
+        for voce in corpus:
+            with self.subTest(riga=voce["riga"]):
+                risultato = estrattore._processa_riga(voce["riga"], voce["intestazione"])
+                sezioni = {"regime_generale": [], "spettacolo": []}
+                if risultato:
+                    sezioni[risultato[0]].append(risultato[1])
+                self.assertEqual(sezioni["regime_generale"], voce["atteso"]["regime_generale"])
+                self.assertEqual(sezioni["spettacolo"], voce["atteso"]["spettacolo"])
+
+    def test_riga_corta_non_solleva_eccezioni(self):
+        estrattore = EstrattorePDF("corpus")
+        sezione, record = estrattore._processa_riga(["01/01/1990", "31/12/1990", "P.A.L.S."], "Giorni")
+        self.assertEqual(sezione, "spettacolo")
+        self.assertEqual(record["giorni"], None)
+
+
+class TestRicostruzioneDaParole(unittest.TestCase):
+    VERTICALI = [(x, 0, 90) for x in (0, 50, 100, 200)]
+    ORIZZONTALI = [(y, 0, 200) for y in (0, 20, 30, 60, 90)]
+
+    @staticmethod
+    def _parola(x0, top, testo):
+        return (x0, top, x0 + 5 * len(testo), top + 7, testo)
+
+    def test_celle_centrate_e_in_basso(self):
+        parole = [
+            self._parola(2, 5, "Dal"), self._parola(52, 5, "Al"), self._parola(102, 5, "Tipo"),
+            # Date centrate, tipo su tre linee, ultima linea in basso
+            self._parola(102, 32, "Lavoro"),
+            self._parola(2, 40, "01/01/1990"), self._parola(52, 40, "31/12/1990"), self._parola(102, 40, "dip."),
+            self._parola(102, 50, "a"), self._parola(112, 50, "termine"),
+            self._parola(2, 62, "01/01/1991"), self._parola(52, 70, "31/12/1991"), self._parola(102, 80, "Malattia"),
+        ]
+        self.assertEqual(ricostruisci_da_parole(parole, self.VERTICALI, self.ORIZZONTALI), [[
+            ["Dal", "Al", "Tipo"],
+            ["", "", ""],
+            ["01/01/1990", "31/12/1990", "Lavoro\ndip.\na termine"],
+            ["01/01/1991", "31/12/1991", "Malattia"],
+        ]])
+
+
+class TestBackend(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pdf_path = os.path.join(self.tmp.name, "estratto.pdf")
+        scrivi_pdf(self.pdf_path, [
+            (["INPS Estratto conto contributivo", "Estratto conto di ROSSI MARIO RSSMRA80A41H501U"],
+             [(INTESTAZIONE, _GENERALE)]),
+            (["Legenda e note"], []),
+            ([], [(INTESTAZIONE_SPETTACOLO, _SPETTACOLO * 5), (INTESTAZIONE, _GENERALE)]),
+        ])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _estrai(self, backend, **opzioni):
+        return EstrattorePDF(self.pdf_path, backend=backend, **opzioni).estrai()
+
+    def test_backend_producono_gli_stessi_dati(self):
+        atteso = self._estrai("pdfplumber")
+        self.assertEqual(len(atteso["regime_generale"]), 4)
+        self.assertEqual(len(atteso["spettacolo"]), 10)
+        self.assertEqual(atteso["metadata"]["cognome"], "ROSSI")
+        self.assertEqual(atteso["spettacolo"][0]["tipo"], "P.A.L.S.\nObbligatoria")
+        # La pagina "Legenda e note" non ha tabelle contributive: esclusa dalla pre-selezione
+        self.assertEqual(atteso["metadata"]["pagine"], 3)
+        self.assertEqual(atteso["metadata"]["pagine_saltate"], 1)
+
+        for backend in ("pdfium", "parole"):
+            with self.subTest(backend=backend):
+                self.assertEqual(self._estrai(backend), atteso)
+                self.assertEqual(self._estrai(backend, basso_consumo=True), atteso)
+
+    def test_estrazione_parallela_uguale_alla_seriale(self):
+        for backend in ("pdfplumber", "pdfium", "parole"):
+            with self.subTest(backend=backend):
+                self.assertEqual(self._estrai(backend, workers=3), self._estrai(backend))
+
+    def test_memoria_picco_fuori_dai_dati(self):
+        for workers in (1, 3):
+            with self.subTest(workers=workers):
+                estrattore = EstrattorePDF(self.pdf_path, workers=workers)
+                self.assertNotIn("memoria_picco_mb", estrattore.estrai()["metadata"])
+                if RESOURCE:
+                    self.assertGreater(estrattore.memoria_picco_mb, 0)
+
+    def test_sonda(self):
+        info = sonda_pdf(self.pdf_path)
+        self.assertEqual(info["codice_fiscale"], "RSSMRA80A41H501U")
+        self.assertEqual((info["cognome"], info["nome"]), ("ROSSI", "MARIO"))
+        self.assertEqual(info["sesso"], "F")
+        self.assertEqual(info["pagine"], 3)
+        self.assertEqual(info["tipo_documento"], "estratto_inps")
+
+    def test_sonda_senza_classi_interne_di_pdfplumber(self):
+        # Lettura diretta della pagina 0: pdfplumber.open non serve
+        with mock.patch.object(pdfplumber, "open", wraps=pdfplumber.open) as apri:
+            atteso = sonda_pdf(self.pdf_path)
+        apri.assert_not_called()
+        # Firme interne cambiate: stesso risultato con l'API pubblica
+        with mock.patch("pdfplumber.page.Page", side_effect=TypeError("firma diversa")):
+            self.assertEqual(sonda_pdf(self.pdf_path), atteso)
+
+    def test_sonda_file_non_pdf(self):
+        with open(os.path.join(self.tmp.name, "rotto.pdf"), "w", encoding="utf-8") as f:
+            f.write("non e' un PDF")
+        risultati = {os.path.basename(r["pdf_path"]): r for r in sonda_cartella(self.tmp.name, workers=1)}
+        self.assertEqual(risultati["estratto.pdf"]["pagine"], 3)
+        self.assertIn("errore", risultati["rotto.pdf"])
+        self.assertNotIn("codice_fiscale", risultati["rotto.pdf"])
+
+    def test_modelli_di_layout(self):
+        atteso = self._estrai("pdfplumber")
+        cartella = os.path.join(self.tmp.name, "cache")
+
+        # Prima esecuzione: griglia dal disegno, bordi salvati; seconda: bordi espliciti
+        self.assertEqual(self._estrai("pdfplumber", modelli_layout=CacheLayout(cartella)), atteso)
+        modelli = CacheLayout(cartella)
+        modello = modelli.leggi("595x842|42|97|152|272|317|382|427|467|512")
+        self.assertEqual(modello["bordi"], [40.0, 95.0, 150.0, 270.0, 315.0, 380.0, 425.0, 465.0, 510.0, 555.0])
+        self.assertEqual(modello["intestazioni"], [INTESTAZIONE, INTESTAZIONE_SPETTACOLO])
+        # Modello valido per tutte le pagine: nessuna griglia ricavata di nuovo dal disegno
+        with mock.patch.object(modelli, "impara", wraps=modelli.impara) as impara:
+            self.assertEqual(self._estrai("pdfplumber", modelli_layout=modelli), atteso)
+        impara.assert_not_called()
+
+    def test_modello_di_un_altra_griglia(self):
+        # Stesse colonne "Dal" e "Al", griglia diversa dopo: il modello della prima non vale per la seconda
+        cartella = os.path.join(self.tmp.name, "cache")
+        self._estrai("pdfplumber", modelli_layout=CacheLayout(cartella))
+        colonne = [40, 95, 150, 230, 290, 350, 400, 450, 500, 555]
+        scrivi_pdf(self.pdf_path, [(["INPS"], [(INTESTAZIONE_SPETTACOLO, _SPETTACOLO)])], colonne)
+        atteso = self._estrai("pdfplumber")
+        self.assertEqual(atteso["spettacolo"][0]["giorni"], 312)
+        self.assertEqual(self._estrai("pdfplumber", modelli_layout=CacheLayout(cartella)), atteso)
+
+        # Anche con un modello sbagliato sotto la stessa impronta la lettura ricade sul disegno
+        modelli = CacheLayout(cartella)
+        for impronta in list(modelli._leggi_file()):
+            modelli.impara(impronta, {"bordi": [40.0, 95.0, 150.0, 315.0, 555.0], "intestazioni": []})
+        self.assertEqual(self._estrai("pdfplumber", modelli_layout=modelli), atteso)
+
+    def test_ultima_riga_su_molte_linee(self):
+        # La riga dell'ultima data e' piu' alta di qualunque margine fisso sotto la data
+        alta = ["01/01/1991", "31/12/1991", "Lavoro\ndipendente\ncon\nnote\nsu\npiu'\nlinee", "sett.",
+                "12.345,67", "52", "", "", ""]
+        scrivi_pdf(self.pdf_path, [(["INPS"], [(INTESTAZIONE, _GENERALE[:1] + [alta])]), (["Legenda"], [])])
+        for backend in ("pdfplumber", "pdfium", "parole"):
+            with self.subTest(backend=backend):
+                generale = self._estrai(backend)["regime_generale"]
+                self.assertEqual([r["dal"] for r in generale], ["01/01/1990", "01/01/1991"])
+
+    def test_intestazione_piu_alta_di_un_margine_fisso(self):
+        # "Dal Al" in fondo a una riga di intestazione alta: "Giorni" sta 40 punti piu' su
+        scrivi_pdf(self.pdf_path, [(["INPS"], [(INTESTAZIONE_SPETTACOLO, _SPETTACOLO)])])
+        atteso = self._estrai("pdfplumber")["spettacolo"]
+        alta = ["\n\n\n\nDal", "\n\n\n\nAl"] + INTESTAZIONE_SPETTACOLO[2:]
+        scrivi_pdf(self.pdf_path, [(["INPS"], [(alta, _SPETTACOLO)])])
+        for backend in ("pdfplumber", "parole"):
+            with self.subTest(backend=backend):
+                self.assertEqual(self._estrai(backend)["spettacolo"], atteso)
+
+    def test_data_di_stampa_nell_intestazione(self):
+        scrivi_pdf(self.pdf_path, [(["INPS", "Stampato il 01/02/2024"], [(INTESTAZIONE, _GENERALE)])])
+        with apri_documento(self.pdf_path) as documento:
+            pagina = next(documento.pagine())
+            stampa = pagina.page.search("01/02/2024")[0]
+            tabella = min(e["top"] for e in pagina.page.edges if e["orientation"] == "v")
+            regione = pagina._regione_tabelle()
+        # La fascia parte dalla linea che apre la tabella, non dalla data di stampa
+        self.assertGreater(regione[1], stampa["bottom"])
+        self.assertLessEqual(regione[1], tabella)
+        self.assertEqual(len(self._estrai("pdfplumber")["regime_generale"]), 2)
+
+    def test_estratto_sintetico(self):
+        atteso = genera_pdf(self.pdf_path, seme=4, pagine=3, righe_per_pagina=24)
+        for backend in ("pdfplumber", "pdfium", "parole"):
+            with self.subTest(backend=backend):
+                self.assertEqual(self._estrai(backend), atteso)
+
+    def test_pagine_da_un_indice_fino_alla_fine(self):
+        for backend in ("pdfplumber", "pdfium", "parole"):
+            with self.subTest(backend=backend):
+                with apri_documento(self.pdf_path, backend) as documento:
+                    attesi = [pagina.testo_caratteri() for pagina in documento.pagine()][1:]
+                with apri_documento(self.pdf_path, backend, 1) as documento:
+                    self.assertEqual([pagina.testo_caratteri() for pagina in documento.pagine()], attesi)
+
+    def test_backend_sconosciuto(self):
+        with self.assertRaises(ValueError):
+            EstrattorePDF(self.pdf_path, backend="inesistente")
+
+
+if __name__ == "__main__":
+    unittest.main()
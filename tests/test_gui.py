@@ -0,0 +1,44 @@
+import importlib.util
+import os
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+from previdenza.core import elabora_pdf
+from previdenza.sintetico import genera_pdf
+
+# tkinter puo' mancare (Python senza Tk): la GUI non si importa
+TKINTER = importlib.util.find_spec("tkinter") is not None
+if TKINTER:
+    from previdenza import gui
+
+
+@unittest.skipUnless(TKINTER, "tkinter non installato")
+class TestRicalcoloGui(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pdf_path = os.path.join(self.tmp.name, "estratto.pdf")
+        genera_pdf(self.pdf_path, seme=5, pagine=2, righe_per_pagina=12, anno_inizio=1990)
+        # Solo lo stato usato da App._elabora, senza finestra
+        self.app = types.SimpleNamespace(pdf_path=self.pdf_path, var_cache=mock.Mock(get=lambda: False),
+                                         cartella_cache=None, _calcolo=None)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_cambio_data_senza_nuova_estrazione(self):
+        with mock.patch.object(gui, "estrai_dati", wraps=gui.estrai_dati) as estrai:
+            for data in (None, "01/03/2000", "sempre", None, "15/09/1997"):
+                with self.subTest(tempo_indeterminato_da=data):
+                    risultato = gui.App._elabora(self.app, data)
+                    atteso = elabora_pdf(self.pdf_path, data, usa_cache=False)
+                    # Solo elabora_pdf misura la memoria dell'estrazione
+                    risultato.pop("memoria_picco_mb")
+                    atteso.pop("memoria_picco_mb")
+                    self.assertEqual(risultato, atteso)
+        estrai.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+RADICE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULI_PESANTI = ("pdfplumber", "pdfminer", "openpyxl")
+
+
+def _moduli_caricati(codice):
+    """Esegue il codice in un nuovo interprete e restituisce i moduli pesanti caricati"""
+    controllo = f"import sys; {codice}; print(' '.join(m for m in {MODULI_PESANTI!r} if m in sys.modules))"
+    uscita = subprocess.run([sys.executable, "-c", controllo], cwd=RADICE,
+                            capture_output=True, text=True, check=True)
+    return uscita.stdout.split()
+
+
+class TestImportLeggeri(unittest.TestCase):
+    def test_calcolatore_senza_pdf_ne_excel(self):
+        codice = "from previdenza import CalcolatoreContributi, decodifica_sesso_da_cf"
+        self.assertEqual(_moduli_caricati(codice), [])
+
+    def test_core_senza_pdf_ne_excel(self):
+        self.assertEqual(_moduli_caricati("import previdenza.core, previdenza.cli"), [])
+
+    def test_calcolo_da_json_senza_pdf_ne_excel(self):
+        dati = {"regime_generale": [{"dal": "01/01/1990", "al": "31/12/1990", "settimane": 52}],
+                "spettacolo": [], "metadata": {}}
+        with tempfile.TemporaryDirectory() as cartella:
+            path = os.path.join(cartella, "archivio.jsonl")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(dati) + "\n")
+            codice = ("from previdenza.core import calcola_archivio; "
+                      f"assert 'totale_mesi' in next(calcola_archivio({path!r}, workers=1))")
+            self.assertEqual(_moduli_caricati(codice), [])
+
+    def test_export_pigri(self):
+        codice = "import previdenza; previdenza.EstrattorePDF"
+        self.assertEqual(_moduli_caricati(codice), ["pdfplumber", "pdfminer"])
+
+    def test_nome_inesistente(self):
+        import previdenza
+        with self.assertRaises(AttributeError):
+            previdenza.NonEsiste
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+from previdenza.calcolatore import CalcolatoreContributi
+from previdenza.indice import IndiceCumulativo, etichetta_mesi
+
+
+class TestIndiceCumulativo(unittest.TestCase):
+    DATI = {
+        "regime_generale": [
+            {"dal": "01/01/1990", "al": "31/12/1991", "settimane": 104},
+            {"dal": "01/03/1994", "al": "31/05/1994", "settimane": 13},
+        ],
+        "spettacolo": [
+            {"dal": "01/01/1996", "al": "30/06/1998", "giorni": 500, "gruppo": 2},
+            {"dal": "01/09/2001", "al": "31/12/2003", "giorni": 700, "gruppo": 1},
+        ],
+    }
+
+    def setUp(self):
+        self.risultati = CalcolatoreContributi(self.DATI, sesso="M").calcola()
+        self.indice = IndiceCumulativo(self.risultati)
+
+    def _somma(self, chiave, anno_da, anno_a):
+        return sum(v for anno, v in self.risultati[chiave].items() if anno_da <= anno <= anno_a)
+
+    def test_uguale_alle_somme_dirette(self):
+        for anno_da in range(1988, 2040, 3):
+            for anno_a in range(anno_da - 1, 2050, 5):
+                with self.subTest(anno_da=anno_da, anno_a=anno_a):
+                    self.assertEqual(self.indice.mesi_tra(anno_da, anno_a), self._somma("mesi", anno_da, anno_a))
+                    self.assertEqual(self.indice.giorni_tra(anno_da, anno_a),
+                                     self._somma("teorico", anno_da, anno_a))
+                    self.assertEqual(self.indice.giorni_tra(anno_da, anno_a, reali=True),
+                                     self._somma("reale", anno_da, anno_a))
+        self.assertEqual(self.indice.mesi_fino_a(1995), self._somma("mesi", 0, 1995))
+        self.assertEqual(self.indice.totale_teorico, sum(self.risultati["teorico"].values()))
+
+    def test_raggiungimento_obiettivo(self):
+        # Nella proiezione il mese e' di calendario: l'obiettivo cade nell'ultimo mese proiettato
+        anno, mese = self.indice.raggiungimento(self.risultati["obiettivo_mesi"])
+        self.assertEqual(anno, self.risultati["anno_max"])
+        self.assertGreaterEqual(anno, self.risultati["anno_proiezione"])
+        self.assertEqual(mese, self.risultati["mesi"][anno])
+        self.assertEqual(self.indice.mesi_fino_a(anno - 1) + mese, self.risultati["obiettivo_mesi"])
+        # Negli anni con contributi solo l'anno: il periodo 1990-1991 conta 24 mesi nel 1990
+        self.assertEqual(self.indice.raggiungimento(24), (1990, None))
+        self.assertEqual(self.indice.raggiungimento(25), (1994, None))
+        self.assertIsNone(self.indice.raggiungimento(self.indice.totale_mesi + 1))
+
+    def test_risultato_vuoto(self):
+        indice = IndiceCumulativo({"reale": {}, "teorico": {}, "mesi": {}, "anno_min": None, "anno_max": None})
+        self.assertEqual(indice.mesi_fino_a(2000), 0)
+        self.assertIsNone(indice.raggiungimento(1))
+
+    def test_etichetta(self):
+        self.assertEqual(etichetta_mesi(514), "42a 10m")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+
+from previdenza import mesi
+
+
+class TestMaschereMesi(unittest.TestCase):
+    def test_intervallo_uguale_a_insieme(self):
+        for inizio in range(1, 13):
+            for fine in range(0, 13):
+                with self.subTest(inizio=inizio, fine=fine):
+                    maschera = mesi.intervallo(inizio, fine)
+                    self.assertEqual([m for m in range(1, 13) if maschera >> (m - 1) & 1],
+                                     list(range(inizio, fine + 1)))
+                    self.assertEqual(mesi.conta(maschera), len(range(inizio, fine + 1)))
+
+    def test_periodo_su_piu_anni(self):
+        self.assertEqual(list(mesi.per_anno(2005, 11, 2005, 12)), [(2005, mesi.intervallo(11, 12))])
+        self.assertEqual(list(mesi.per_anno(2005, 11, 2007, 2)), [
+            (2005, mesi.intervallo(11, 12)),
+            (2006, mesi.ANNO_INTERO),
+            (2007, mesi.intervallo(1, 2)),
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
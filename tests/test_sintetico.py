@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+
+from previdenza.calcolatore import CalcolatoreContributi, decodifica_sesso_da_cf
+from previdenza.sintetico import genera_dati, genera_pdf
+
+
+class TestGeneraDati(unittest.TestCase):
+    def test_stesso_seme_stessi_dati(self):
+        self.assertEqual(genera_dati(7, anni=20), genera_dati(7, anni=20))
+        self.assertNotEqual(genera_dati(7, anni=20), genera_dati(8, anni=20))
+
+    def test_forma_dei_dati_estratti(self):
+        dati = genera_dati(1, anni=40, record=2000)
+        self.assertEqual(len(dati["regime_generale"]) + len(dati["spettacolo"]), 2000)
+        for r in dati["regime_generale"]:
+            self.assertLessEqual(set(r), {"dal", "al", "tipo", "settimane", "unita", "retribuzione",
+                                          "note"})
+        for r in dati["spettacolo"]:
+            self.assertLessEqual(set(r), {"dal", "al", "tipo", "giorni", "unita", "retribuzione", "gruppo",
+                                          "codice_qualifica", "note"})
+        self.assertEqual(set(dati["metadata"]), {"file", "codice_fiscale", "cognome", "nome", "pagine",
+                                                 "pagine_saltate"})
+
+    def test_casi_del_calcolatore(self):
+        dati = genera_dati(2, anni=30, record=1000)
+        spettacolo = dati["spettacolo"]
+        self.assertTrue(any(r["dal"][-4:] != r["al"][-4:] for r in dati["regime_generale"] + spettacolo))
+        self.assertTrue(any(r.get("note") in ("3", "O") for r in dati["regime_generale"]))
+        self.assertEqual({r.get("gruppo") for r in spettacolo}, {None, 1, 2})
+
+    def test_sesso_nel_codice_fiscale(self):
+        for sesso in ("M", "F"):
+            metadata = genera_dati(3, sesso=sesso)["metadata"]
+            self.assertEqual(decodifica_sesso_da_cf(metadata["codice_fiscale"]), sesso)
+
+    def test_limiti(self):
+        for parametri in ({"anni": 0}, {"anni": 61}, {"record": 9}, {"record": 10001}):
+            with self.subTest(**parametri), self.assertRaises(ValueError):
+                genera_dati(**parametri)
+
+    def test_calcolo(self):
+        dati = genera_dati(4, anni=60, record=10000, anno_inizio=1970)
+        risultati = CalcolatoreContributi(dati, tempo_indeterminato_da="01/08/1997").calcola()
+        self.assertEqual(risultati["anno_min"], 1970)
+        self.assertGreater(sum(risultati["mesi"].values()), 0)
+
+
+class TestGeneraPdf(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pdf_path = os.path.join(self.tmp.name, "estratto.pdf")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pagine_e_righe(self):
+        dati = genera_pdf(self.pdf_path, seme=1, pagine=5, righe_per_pagina=7)
+        self.assertEqual(len(dati["regime_generale"]) + len(dati["spettacolo"]), 35)
+        self.assertEqual(dati["metadata"]["pagine"], 5)
+        self.assertEqual(dati["metadata"]["file"], self.pdf_path)
+        with open(self.pdf_path, "rb") as f:
+            self.assertEqual(f.read().count(b"/Type /Page "), 5)
+
+    def test_celle_su_due_linee_e_note_spettacolo(self):
+        spettacolo = genera_pdf(self.pdf_path, seme=2, pagine=10, righe_per_pagina=24)["spettacolo"]
+        self.assertIn("P.A.L.S.\nObbligatoria", {r["tipo"] for r in spettacolo})
+        self.assertTrue(any(r.get("note") for r in spettacolo))
+
+    def test_limiti(self):
+        for parametri in ({"pagine": 0}, {"righe_per_pagina": 0}, {"righe_per_pagina": 25}):
+            with self.subTest(**parametri), self.assertRaises(ValueError):
+                genera_pdf(self.pdf_path, **parametri)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import importlib.util
+import random
+import unittest
+
+from previdenza.calcolatore import CalcolatoreContributi
+
+# numpy e' una dipendenza opzionale, richiesta solo da previdenza.vettoriale
+NUMPY = importlib.util.find_spec("numpy") is not None
+if NUMPY:
+    from previdenza.vettoriale import CalcolatoreVettoriale, ColonneRecord
+
+
+def _data(rng, anno, mese):
+    return f"{rng.randint(1, 28):02d}/{mese:02d}/{anno}"
+
+
+def _carriera(rng):
+    """Carriera casuale, con i casi limite del calcolatore scalare (date invertite, periodi su piu' anni)"""
+    base = rng.randint(1985, 2000)
+    generale = []
+    spettacolo = []
+    for _ in range(rng.randint(0, 8)):
+        anno = base + rng.randint(0, 12)
+        generale.append({
+            "dal": _data(rng, anno, rng.randint(1, 12)),
+            "al": _data(rng, anno + rng.choice((0, 0, 0, 1, 3, -1)), rng.randint(1, 12)),
+            "settimane": rng.randint(0, 52),
+            "note": rng.choice((None, "3", "O", "X")),
+        })
+    for _ in range(rng.randint(0, 10)):
+        anno = base + rng.randint(0, 12)
+        spettacolo.append({
+            "dal": _data(rng, anno, rng.randint(1, 12)),
+            "al": _data(rng, anno + rng.choice((0, 0, 0, 1, 3, -1)), rng.randint(1, 12)),
+            "giorni": rng.choice((None, 0, rng.randint(1, 400))),
+            "gruppo": rng.choice((None, 1, 2, 2, 3)),
+        })
+    return {"regime_generale": generale, "spettacolo": spettacolo}
+
+
+@unittest.skipUnless(NUMPY, "numpy non installato")
+class TestCalcolatoreVettoriale(unittest.TestCase):
+    def test_uguale_al_calcolatore_scalare(self):
+        rng = random.Random(3)
+        dati, sessi, tempi_indeterminato, attesi = [], [], [], []
+        while len(dati) < 600:
+            carriera = _carriera(rng)
+            if not carriera["regime_generale"] and not carriera["spettacolo"]:
+                continue
+            sesso = rng.choice(("M", "F", None))
+            ti = rng.choice((None, "sempre", "10/05/1997", "01/09/1997", "01/01/2001"))
+            try:
+                atteso = CalcolatoreContributi(carriera, sesso, ti).calcola()
+            except TypeError:
+                continue  # Nessun anno contributivo: il calcolatore scalare non gestisce il caso
+            dati.append(carriera)
+            sessi.append(sesso)
+            tempi_indeterminato.append(ti)
+            attesi.append(atteso)
+
+        # Blocchi piccoli per passare anche dalla suddivisione delle persone
+        risultati = CalcolatoreVettoriale(ColonneRecord.da_dati(dati), sessi, tempi_indeterminato,
+                                          blocco=97).calcola()
+        self.assertEqual(len(risultati), len(attesi))
+        for i, (risultato, atteso) in enumerate(zip(risultati, attesi)):
+            with self.subTest(carriera=i):
+                self.assertEqual(risultato, atteso)
+
+    def test_record_in_ordine_qualsiasi(self):
+        rng = random.Random(5)
+        dati = [_carriera(rng) for _ in range(20)]
+        dati = [d for d in dati if d["regime_generale"] or d["spettacolo"]]
+        colonne = ColonneRecord.da_dati(dati)
+        # Persone mescolate, ordine dei record di ogni persona invariato
+        mescolati = colonne.seleziona(sorted(range(len(colonne)), key=lambda i: (colonne.persona[i] % 3, i)))
+        sessi = ["F"] * len(dati)
+        self.assertEqual(CalcolatoreVettoriale(mescolati, sessi, "sempre").calcola(),
+                         CalcolatoreVettoriale(colonne, sessi, "sempre").calcola())
+
+    def test_persona_senza_periodi(self):
+        colonne = ColonneRecord.da_dati([{"regime_generale": [], "spettacolo": []}])
+        with self.assertRaises(ValueError):
+            CalcolatoreVettoriale(colonne, ["M"]).calcola()
+
+    def test_un_valore_di_tempo_indeterminato_per_persona(self):
+        colonne = ColonneRecord.da_dati([])
+        with self.assertRaises(ValueError):
+            CalcolatoreVettoriale(colonne, ["M", "F"], [None])
+
+
+if __name__ == "__main__":
+    unittest.main()